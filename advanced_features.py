@@ -6,6 +6,9 @@ from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout,
 from PySide6.QtCore import Qt
 import logging
 
+from query_executor import QueryExecutor
+from result_model import create_result_view
+
 
 class TextSearchDialog(QDialog):
     def __init__(self, db_manager, parent=None):
@@ -13,6 +16,7 @@ class TextSearchDialog(QDialog):
         self.db_manager = db_manager
         self.setWindowTitle("Поиск по тексту")
         self.setMinimumSize(600, 400)
+        self.executor = QueryExecutor(db_manager, self)
         self.setup_ui()
 
     def setup_ui(self):
@@ -69,7 +73,7 @@ class TextSearchDialog(QDialog):
         layout.addLayout(buttons_layout)
 
         # Результаты
-        self.result_table = QTableWidget()
+        self.result_table = create_result_view()
         layout.addWidget(self.result_table)
 
         self.setLayout(layout)
@@ -159,51 +163,44 @@ class TextSearchDialog(QDialog):
             QMessageBox.warning(self, "Ошибка", "Заполните все поля")
             return
 
-        try:
-            cursor = self.db_manager.connection.cursor()
-
-            if search_type == "LIKE":
-                sql = f"SELECT * FROM {table_name} WHERE {column_name} LIKE %s"
-                cursor.execute(sql, (f"%{pattern}%",))
-            elif search_type == "NOT LIKE":
-                sql = f"SELECT * FROM {table_name} WHERE {column_name} NOT LIKE %s"
-                cursor.execute(sql, (f"%{pattern}%",))
-            elif search_type == "POSIX - базовый":
-                sql = f"SELECT * FROM {table_name} WHERE {column_name} ~ %s"
-                cursor.execute(sql, (pattern,))
-            elif search_type == "POSIX - расширенный":
-                sql = f"SELECT * FROM {table_name} WHERE {column_name} ~* %s"
-                cursor.execute(sql, (pattern,))
-            elif search_type == "SIMILAR TO":
-                sql = f"SELECT * FROM {table_name} WHERE {column_name} SIMILAR TO %s"
-                cursor.execute(sql, (pattern,))
-            elif search_type == "NOT SIMILAR TO":
-                sql = f"SELECT * FROM {table_name} WHERE {column_name} NOT SIMILAR TO %s"
-                cursor.execute(sql, (pattern,))
-
-            result = cursor.fetchall()
-            columns = [desc[0] for desc in cursor.description]
-
-            self.result_table.setRowCount(len(result))
-            self.result_table.setColumnCount(len(columns))
-            self.result_table.setHorizontalHeaderLabels(columns)
-
-            for row_idx, row_data in enumerate(result):
-                for col_idx, cell_data in enumerate(row_data):
-                    item = QTableWidgetItem(str(cell_data) if cell_data is not None else "")
-                    self.result_table.setItem(row_idx, col_idx, item)
+        if search_type == "LIKE":
+            sql = f"SELECT * FROM {table_name} WHERE {column_name} LIKE %s"
+            params = (f"%{pattern}%",)
+        elif search_type == "NOT LIKE":
+            sql = f"SELECT * FROM {table_name} WHERE {column_name} NOT LIKE %s"
+            params = (f"%{pattern}%",)
+        elif search_type == "POSIX - базовый":
+            sql = f"SELECT * FROM {table_name} WHERE {column_name} ~ %s"
+            params = (pattern,)
+        elif search_type == "POSIX - расширенный":
+            sql = f"SELECT * FROM {table_name} WHERE {column_name} ~* %s"
+            params = (pattern,)
+        elif search_type == "SIMILAR TO":
+            sql = f"SELECT * FROM {table_name} WHERE {column_name} SIMILAR TO %s"
+            params = (pattern,)
+        elif search_type == "NOT SIMILAR TO":
+            sql = f"SELECT * FROM {table_name} WHERE {column_name} NOT SIMILAR TO %s"
+            params = (pattern,)
+        else:
+            return
 
-            cursor.close()
+        model = self.result_table.model()
+        model.clear()
+        self.search_btn.setEnabled(False)
+        self.executor.submit(sql, params, columns=model.set_columns, batch=model.append_rows,
+                             finished=self.on_search_finished, error=self.on_search_error)
 
-            if len(result) == 0:
-                QMessageBox.information(self, "Результат", "Ничего не найдено")
+    def on_search_finished(self, total: int):
+        self.search_btn.setEnabled(True)
+        if total == 0:
+            QMessageBox.information(self, "Результат", "Ничего не найдено")
 
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Ошибка поиска:\n{str(e)}")
+    def on_search_error(self, message: str):
+        self.search_btn.setEnabled(True)
+        QMessageBox.warning(self, "Ошибка", f"Ошибка поиска:\n{message}")
 
     def clear_results(self):
-        self.result_table.setRowCount(0)
-        self.result_table.setColumnCount(0)
+        self.result_table.model().clear()
         self.search_pattern.clear()
 
 
@@ -213,6 +210,8 @@ class StringFunctionsDialog(QDialog):
         self.db_manager = db_manager
         self.setWindowTitle("Функции работы со строками")
         self.setMinimumSize(700, 500)
+        self.executor = QueryExecutor(db_manager, self)
+        self._pending_update = None
         self.setup_ui()
 
     def setup_ui(self):
@@ -458,37 +457,37 @@ class StringFunctionsDialog(QDialog):
         if reply != QMessageBox.Yes:
             return
 
-        try:
-            function_sql = self.get_function_sql()
-            cursor = self.db_manager.connection.cursor()
-
-            update_sql = f"UPDATE {table_name} SET {column} = {function_sql} WHERE {column} IS NOT NULL"
-            cursor.execute(update_sql)
-            updated_count = cursor.rowcount
+        function_sql = self.get_function_sql()
+        update_sql = f"UPDATE {table_name} SET {column} = {function_sql} WHERE {column} IS NOT NULL"
 
-            self.db_manager.connection.commit()
+        # UPDATE по всей таблице выполняется в фоне на отдельном соединении
+        self._pending_update = (table_name, column, self.function_combo.currentText())
+        self.update_btn.setEnabled(False)
+        self.status_label.setText("Выполняется обновление...")
+        self.executor.submit(update_sql, commit=True,
+                             finished=self.on_update_finished, error=self.on_update_error)
 
-            cursor.close()
-
-            QMessageBox.information(
-                self,
-                "Обновление завершено",
-                f"Успешно обновлено строк: {updated_count}\n\n"
-                f"Таблица: {table_name}\n"
-                f"Столбец: {column}\n"
-                f"Операция: {self.function_combo.currentText()}"
-            )
+    def on_update_finished(self, updated_count: int):
+        table_name, column, operation = self._pending_update
+        self.update_btn.setEnabled(True)
+        QMessageBox.information(
+            self,
+            "Обновление завершено",
+            f"Успешно обновлено строк: {updated_count}\n\n"
+            f"Таблица: {table_name}\n"
+            f"Столбец: {column}\n"
+            f"Операция: {operation}"
+        )
 
-            self.status_label.setText(f"Обновлено строк: {updated_count}")
+        self.status_label.setText(f"Обновлено строк: {updated_count}")
 
-            self.preview_table.setRowCount(0)
+        self.preview_table.setRowCount(0)
 
-        except Exception as e:
-            if self.db_manager.connection:
-                self.db_manager.connection.rollback()
-            QMessageBox.warning(
-                self,
-                "Ошибка обновления",
-                f"Не удалось обновить данные:\n{str(e)}"
-            )
-            self.status_label.setText("Ошибка при обновлении данных")
\ No newline at end of file
+    def on_update_error(self, message: str):
+        self.update_btn.setEnabled(True)
+        QMessageBox.warning(
+            self,
+            "Ошибка обновления",
+            f"Не удалось обновить данные:\n{message}"
+        )
+        self.status_label.setText("Ошибка при обновлении данных")
\ No newline at end of file
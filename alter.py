@@ -6,6 +6,8 @@ from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout,
 from PySide6.QtCore import Qt
 import logging
 
+from result_model import create_result_view
+
 
 class TableMetadataDialog(QDialog):
     def __init__(self, db_manager, table_name, parent=None):
@@ -24,12 +26,12 @@ class TableMetadataDialog(QDialog):
         if not cols:
             layout.addWidget(QLabel("Нет колонок или не удалось получить список колонок."))
             return
+        try:
+            table_meta = self.db_manager.get_table_metadata(table_name) or {}
+        except Exception:
+            table_meta = {}
         for c in cols:
-            md = {}
-            try:
-                md = self.db_manager.get_column_metadata(table_name, c) or {}
-            except Exception:
-                md = {}
+            md = table_meta.get(c) or {}
             lines = [f"{table_name}.{c}"]
             lines.append(f"  type: {md.get('data_type')}, nullable: {md.get('is_nullable')}, default: {md.get('column_default')}")
             if md.get('is_primary'):
@@ -71,6 +73,10 @@ class AlterTableDialog(QDialog):
         self.table_meta_btn.clicked.connect(self.on_show_table_metadata)
         form.addRow(self.table_meta_btn)
 
+        self.index_advisor_btn = QPushButton("Советник индексов")
+        self.index_advisor_btn.clicked.connect(self.on_show_index_advisor)
+        form.addRow(self.index_advisor_btn)
+
         self.operation_combo = QComboBox()
         self.operation_combo.addItems([
             "Добавить столбец",
@@ -79,9 +85,12 @@ class AlterTableDialog(QDialog):
             "Переименовать столбец",
             "Изменить тип данных",
             "Добавить ограничение",
-            "Удалить ограничение"
+            "Удалить ограничение",
+            "Создать индекс",
+            "Удалить индекс"
         ])
         self.operation_combo.currentTextChanged.connect(self.update_params_form)
+        self.table_combo.currentTextChanged.connect(self.on_table_changed)
         form.addRow("Операция:", self.operation_combo)
 
         layout.addLayout(form)
@@ -236,20 +245,74 @@ class AlterTableDialog(QDialog):
             self.params_layout.addRow("Имя ограничения:", self.drop_constraint_le)
             hint_texts = []
             try:
-                cols = self.db_manager.get_columns(table) or []
-                for c in cols:
-                    md = self.db_manager.get_column_metadata(table, c) or {}
+                table_meta = self.db_manager.get_table_metadata(table) or {}
+                for md in table_meta.values():
                     for u in md.get('unique_constraints', []):
                         hint_texts.append(u.get('name'))
                     for ch in md.get('check_constraints', []):
                         hint_texts.append(ch.get('name'))
                     for fk in md.get('foreign_keys', []):
                         hint_texts.append(fk.get('name'))
+                # ограничение на несколько колонок встречается у каждой из них
+                hint_texts = list(dict.fromkeys(hint_texts))
             except Exception:
                 pass
             if hint_texts:
                 self.params_layout.addRow(QLabel("Примеры имён ограничений: " + ", ".join(hint_texts[:10])))
 
+        elif op == "Создать индекс":
+            cols = self.db_manager.get_columns(table) or []
+            self.index_method_cb = QComboBox()
+            self.index_method_cb.addItems(["btree", "hash", "gin", "gist", "brin"])
+            self.index_method_cb.setToolTip("hash — только равенство; gin — массивы, jsonb, полнотекстовый поиск; "
+                                            "gist — геометрия и диапазоны; brin — большие таблицы, упорядоченные по столбцу (даты)")
+            self.index_cols_list = QListWidget()
+            self.index_cols_list.setSelectionMode(QListWidget.MultiSelection)
+            self.index_cols_list.setMaximumHeight(110)
+            for c in cols:
+                self.index_cols_list.addItem(QListWidgetItem(c))
+            # порядок столбцов индекса — порядок щелчков; selectedItems() его не гарантирует
+            self.index_column_order = []
+            self.index_order_label = QLabel("Порядок: —")
+            self.index_cols_list.itemSelectionChanged.connect(self.on_index_columns_changed)
+            self.index_expr_te = QTextEdit()
+            self.index_expr_te.setPlaceholderText("lower(name)\ndate_trunc('day', date)")
+            self.index_expr_te.setMaximumHeight(60)
+            self.index_include_list = QListWidget()
+            self.index_include_list.setSelectionMode(QListWidget.MultiSelection)
+            self.index_include_list.setMaximumHeight(80)
+            for c in cols:
+                self.index_include_list.addItem(QListWidgetItem(c))
+            self.index_where_le = QLineEdit()
+            self.index_where_le.setPlaceholderText("например: amount > 0 (частичный индекс)")
+            self.index_unique_cb = QCheckBox("UNIQUE")
+            self.index_name_le = QLineEdit()
+            self.index_name_le.setPlaceholderText("idx_<таблица>_<столбцы> (опционально)")
+            self.index_concurrently_cb = QCheckBox("CONCURRENTLY (без блокировки записи в таблицу)")
+            self.index_concurrently_cb.setChecked(True)
+            self.params_layout.addRow("Метод:", self.index_method_cb)
+            self.params_layout.addRow("Столбцы (в порядке выбора):", self.index_cols_list)
+            self.params_layout.addRow("", self.index_order_label)
+            self.params_layout.addRow("Выражения (по одному в строке):", self.index_expr_te)
+            self.params_layout.addRow("INCLUDE:", self.index_include_list)
+            self.params_layout.addRow("WHERE:", self.index_where_le)
+            self.params_layout.addRow(self.index_unique_cb)
+            self.params_layout.addRow("Имя индекса:", self.index_name_le)
+            self.params_layout.addRow(self.index_concurrently_cb)
+            self._add_indexes_table(table)
+
+        elif op == "Удалить индекс":
+            self.drop_index_cb = QComboBox()
+            # индексы PRIMARY KEY / UNIQUE-ограничений удаляются вместе с ограничением
+            for idx in self.db_manager.get_table_indexes(table):
+                if not idx['constraint']:
+                    self.drop_index_cb.addItem(idx['name'])
+            self.drop_index_concurrently_cb = QCheckBox("CONCURRENTLY (без блокировки записи в таблицу)")
+            self.drop_index_concurrently_cb.setChecked(True)
+            self.params_layout.addRow("Индекс:", self.drop_index_cb)
+            self.params_layout.addRow(self.drop_index_concurrently_cb)
+            self._add_indexes_table(table)
+
     def _on_constraint_type_changed(self, typ):
         if typ == "NOT NULL":
             self.local_cols_list.setVisible(True)
@@ -290,6 +353,66 @@ class AlterTableDialog(QDialog):
         dlg = TableMetadataDialog(self.db_manager, table, parent=self)
         dlg.exec()
 
+    def on_show_index_advisor(self):
+        from index_advisor_dialog import IndexAdvisorDialog
+        IndexAdvisorDialog(self.db_manager, self).exec()
+
+    def preset_create_index(self, table, columns):
+        """Открыть операцию «Создать индекс» с выбранными таблицей и столбцами (из советника индексов)"""
+        self.table_combo.setCurrentText(table)
+        self.operation_combo.setCurrentText("Создать индекс")
+        self.update_params_form()
+        for column in columns:
+            for item in self.index_cols_list.findItems(column, Qt.MatchExactly):
+                item.setSelected(True)
+
+    def on_table_changed(self, table):
+        # списки столбцов и индексов в форме относятся к выбранной таблице
+        if table:
+            self.update_params_form()
+
+    def _add_indexes_table(self, table):
+        """Индексы таблицы с размером и числом сканирований из pg_stat_user_indexes"""
+        indexes = self.db_manager.get_table_indexes(table)
+        headers = ["Индекс", "Метод", "Размер", "Сканирований", "Прочитано", "Выбрано", "Определение"]
+        rows = []
+        for idx in indexes:
+            name = idx['name'] + ("" if idx['valid'] else " (INVALID)")
+            if idx['constraint']:
+                name += f" [{idx['constraint']}]"
+            rows.append((name, idx['method'], f"{idx['size'] / 1024:.0f} КБ", idx['idx_scan'],
+                         idx['tup_read'], idx['tup_fetch'], idx['definition']))
+        view = create_result_view(placeholder="Индексов нет")
+        view.model().set_result(rows, headers)
+        view.verticalHeader().setVisible(False)
+        view.resizeColumnsToContents()
+        view.horizontalHeader().setStretchLastSection(True)
+        view.setMinimumHeight(120)
+        self.params_layout.addRow(QLabel("Индексы таблицы (нулевое число сканирований — кандидат на удаление):"))
+        self.params_layout.addRow(view)
+
+    def on_index_columns_changed(self):
+        selected = {it.text() for it in self.index_cols_list.selectedItems()}
+        # снятые столбцы выпадают, новые добавляются в конец
+        order = [c for c in self.index_column_order if c in selected]
+        order += [self.index_cols_list.item(row).text() for row in range(self.index_cols_list.count())
+                  if self.index_cols_list.item(row).text() in selected - set(order)]
+        self.index_column_order = order
+        self.index_order_label.setText("Порядок: " + (", ".join(order) or "—"))
+
+    def _selected_index_columns(self):
+        return list(self.index_column_order)
+
+    def _index_options(self):
+        expressions = [line.strip() for line in self.index_expr_te.toPlainText().splitlines() if line.strip()]
+        return {
+            'method': self.index_method_cb.currentText(),
+            'expressions': expressions,
+            'include': [it.text() for it in self.index_include_list.selectedItems()],
+            'where': self.index_where_le.text().strip() or None,
+            'unique': self.index_unique_cb.isChecked(),
+        }
+
     def on_preview_clicked(self):
         op = self.operation_combo.currentText()
         table = self.table_combo.currentText()
@@ -312,6 +435,16 @@ class AlterTableDialog(QDialog):
                 s = f'Добавление ограничения ({self.constraint_type_cb.currentText()})'
             elif op == "Удалить ограничение":
                 s = f'ALTER TABLE "{table}" DROP CONSTRAINT "{self.drop_constraint_le.text()}" CASCADE'
+            elif op == "Создать индекс":
+                try:
+                    s = self.db_manager.create_index_sql(table, self._selected_index_columns(),
+                                                         self.index_name_le.text().strip() or None,
+                                                         self.index_concurrently_cb.isChecked(), **self._index_options())
+                except ValueError as e:
+                    s = str(e)
+            elif op == "Удалить индекс":
+                concurrently = "CONCURRENTLY " if self.drop_index_concurrently_cb.isChecked() else ""
+                s = f'DROP INDEX {concurrently}IF EXISTS "{self.drop_index_cb.currentText()}"'
         except Exception:
             s = "Не удалось сформировать пример."
         QMessageBox.information(self, "Пример SQL", s)
@@ -339,7 +472,7 @@ class AlterTableDialog(QDialog):
             if ok:
                 QMessageBox.information(self, "Успех", "Колонка добавлена.")
                 try:
-                    self.db_manager.mark_structure_changed()
+                    self.db_manager.mark_structure_changed(table)
                 except Exception:
                     pass
                 self.load_tables()
@@ -354,7 +487,7 @@ class AlterTableDialog(QDialog):
             if ok:
                 QMessageBox.information(self, "Успех", "Колонка удалена.")
                 try:
-                    self.db_manager.mark_structure_changed()
+                    self.db_manager.mark_structure_changed(table)
                 except Exception:
                     pass
                 self.load_tables()
@@ -369,7 +502,7 @@ class AlterTableDialog(QDialog):
             if ok:
                 QMessageBox.information(self, "Успех", "Таблица переименована.")
                 try:
-                    self.db_manager.mark_structure_changed()
+                    self.db_manager.mark_structure_changed(table)
                 except Exception:
                     pass
                 self.load_tables()
@@ -385,7 +518,7 @@ class AlterTableDialog(QDialog):
             if ok:
                 QMessageBox.information(self, "Успех", "Столбец переименован.")
                 try:
-                    self.db_manager.mark_structure_changed()
+                    self.db_manager.mark_structure_changed(table)
                 except Exception:
                     pass
                 self.load_tables()
@@ -420,7 +553,7 @@ class AlterTableDialog(QDialog):
             if ok:
                 QMessageBox.information(self, "Успех", "Тип столбца изменён.")
                 try:
-                    self.db_manager.mark_structure_changed()
+                    self.db_manager.mark_structure_changed(table)
                 except Exception:
                     pass
                 self.load_tables()
@@ -456,7 +589,7 @@ class AlterTableDialog(QDialog):
                     if ok2:
                         QMessageBox.information(self, "Успех", "Тип столбца изменён после обнуления значений.")
                         try:
-                            self.db_manager.mark_structure_changed()
+                            self.db_manager.mark_structure_changed(table)
                         except Exception:
                             pass
                         self.load_tables()
@@ -486,7 +619,7 @@ class AlterTableDialog(QDialog):
                 if success_all:
                     QMessageBox.information(self, "Успех", "NOT NULL применён к выбранным столбцам.")
                     try:
-                        self.db_manager.mark_structure_changed()
+                        self.db_manager.mark_structure_changed(table)
                     except Exception:
                         pass
                     self.load_tables()
@@ -505,7 +638,7 @@ class AlterTableDialog(QDialog):
                 if ok:
                     QMessageBox.information(self, "Успех", "UNIQUE добавлен.")
                     try:
-                        self.db_manager.mark_structure_changed()
+                        self.db_manager.mark_structure_changed(table)
                     except Exception:
                         pass
                     self.load_tables()
@@ -525,7 +658,7 @@ class AlterTableDialog(QDialog):
                 if ok:
                     QMessageBox.information(self, "Успех", "CHECK добавлен.")
                     try:
-                        self.db_manager.mark_structure_changed()
+                        self.db_manager.mark_structure_changed(table)
                     except Exception:
                         pass
                     self.load_tables()
@@ -549,7 +682,7 @@ class AlterTableDialog(QDialog):
                 if ok:
                     QMessageBox.information(self, "Успех", "FOREIGN KEY добавлен.")
                     try:
-                        self.db_manager.mark_structure_changed()
+                        self.db_manager.mark_structure_changed(table)
                     except Exception:
                         pass
                     self.load_tables()
@@ -572,7 +705,7 @@ class AlterTableDialog(QDialog):
                 if ok:
                     QMessageBox.information(self, "Успех", "DEFAULT установлен.")
                     try:
-                        self.db_manager.mark_structure_changed()
+                        self.db_manager.mark_structure_changed(table)
                     except Exception:
                         pass
                     self.load_tables()
@@ -591,11 +724,41 @@ class AlterTableDialog(QDialog):
             if ok:
                 QMessageBox.information(self, "Успех", "Ограничение удалено.")
                 try:
-                    self.db_manager.mark_structure_changed()
+                    self.db_manager.mark_structure_changed(table)
                 except Exception:
                     pass
                 self.load_tables()
                 self.update_params_form()
                 self.accept()
             else:
-                QMessageBox.warning(self, "Ошибка", "Не удалось удалить ограничение.")
\ No newline at end of file
+                QMessageBox.warning(self, "Ошибка", "Не удалось удалить ограничение.")
+
+        elif op == "Создать индекс":
+            cols = self._selected_index_columns()
+            options = self._index_options()
+            if not cols and not options['expressions']:
+                QMessageBox.warning(self, "Ошибка", "Выберите столбцы или введите выражение для индекса.")
+                return
+            name = self.index_name_le.text().strip() or None
+            ok, msg = self.db_manager.alter_create_index(table, cols, name=name,
+                                                         concurrently=self.index_concurrently_cb.isChecked(), **options)
+            if ok:
+                QMessageBox.information(self, "Успех", "Индекс создан.")
+                self.update_params_form()
+                self.accept()
+            else:
+                QMessageBox.warning(self, "Ошибка", f"Не удалось создать индекс: {msg}")
+
+        elif op == "Удалить индекс":
+            name = self.drop_index_cb.currentText()
+            if not name:
+                QMessageBox.warning(self, "Ошибка", "У таблицы нет индексов, которые можно удалить отдельно.")
+                return
+            ok, msg = self.db_manager.alter_drop_index(table, name,
+                                                       concurrently=self.drop_index_concurrently_cb.isChecked())
+            if ok:
+                QMessageBox.information(self, "Успех", "Индекс удалён.")
+                self.update_params_form()
+                self.accept()
+            else:
+                QMessageBox.warning(self, "Ошибка", f"Не удалось удалить индекс: {msg}")
@@ -0,0 +1,9 @@
+import os
+
+# журнал и накопленная статистика лежат рядом с программой, а не в текущем каталоге запуска
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def app_file(name: str) -> str:
+    """Путь к файлу приложения (app.log, index_usage.json, ...) в APP_DIR"""
+    return os.path.join(APP_DIR, name)
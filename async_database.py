@@ -0,0 +1,570 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import psycopg
+    from psycopg import sql as pg_sql
+    from psycopg.conninfo import make_conninfo
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:  # psycopg 3 не установлен — асинхронный режим недоступен
+    psycopg = None
+
+from database import (DatabaseManager, SUMMARY_TABLE, SUMMARY_ENABLED_SQL, TABLE_COLUMNS_SQL, TABLE_CONSTRAINTS_SQL,
+                      build_dashboard_stats, build_table_metadata, dashboard_stats_sql, keyset_page_sql,
+                      split_keyset_page, transaction_total_sql)
+
+
+def async_available() -> bool:
+    """Есть psycopg 3 и запущен цикл asyncio (qasync) — корутины можно планировать из слотов Qt"""
+    if psycopg is None:
+        return False
+    try:
+        return asyncio.get_event_loop_policy().get_event_loop().is_running()
+    except RuntimeError:
+        return False
+
+
+class AsyncDatabaseManager:
+    """Асинхронный вариант DatabaseManager на psycopg 3 и AsyncConnectionPool.
+
+    Публичные методы повторяют DatabaseManager, но являются корутинами, поэтому
+    независимые запросы (например, COUNT(*) по всем таблицам) выполняются параллельно
+    на разных соединениях пула без потоков. execute() возвращает SimpleNamespace
+    с columns, rows и rowcount вместо курсора: курсор не переживает возврат соединения в пул.
+    """
+
+    # проверки и экранирование общие с синхронным менеджером
+    is_valid_phone = DatabaseManager.is_valid_phone
+    is_valid_ru_letters = DatabaseManager.is_valid_ru_letters
+    is_valid_schedule = DatabaseManager.is_valid_schedule
+    _quote_ident = DatabaseManager._quote_ident
+
+    def __init__(self, connection_params: Optional[Dict] = None, min_size: int = 1, max_size: int = 10,
+                 sync_manager: Optional[DatabaseManager] = None):
+        if psycopg is None:
+            raise RuntimeError("Для AsyncDatabaseManager нужны пакеты psycopg и psycopg-pool")
+        self.connection_params = dict(connection_params or {})
+        # синхронный менеджер, чьи кэши схемы и результатов сбрасываются после записей этого менеджера
+        self.sync_manager = sync_manager
+        self.pool_min_size = min_size
+        self.pool_max_size = max_size
+        self.pool = None
+        self._pool_params = None
+        self._pool_lock = asyncio.Lock()
+
+    @classmethod
+    def from_manager(cls, db_manager: DatabaseManager) -> "AsyncDatabaseManager":
+        return cls(db_manager.get_connection_params(), db_manager.pool_minconn, db_manager.pool_maxconn,
+                   sync_manager=db_manager)
+
+    def set_connection_params(self, params: Dict):
+        """Новые параметры применяются при следующем обращении: пул будет пересоздан"""
+        self.connection_params.update(params)
+
+    def get_connection_params(self):
+        return self.connection_params.copy()
+
+    async def connect(self) -> bool:
+        async with self._pool_lock:
+            if self.pool is not None and self._pool_params == self.connection_params:
+                return True
+            await self._close_pool()
+            try:
+                params = self.get_connection_params()
+                db_pool = AsyncConnectionPool(make_conninfo(**params), min_size=self.pool_min_size,
+                                              max_size=self.pool_max_size, open=False)
+                await db_pool.open(wait=True)
+                self.pool, self._pool_params = db_pool, params
+                logging.info("Асинхронный пул соединений открыт")
+                return True
+            except Exception as e:
+                logging.error(f"Ошибка асинхронного подключения к БД: {str(e)}")
+                return False
+
+    async def disconnect(self):
+        async with self._pool_lock:
+            await self._close_pool()
+
+    async def _close_pool(self):
+        db_pool, self.pool, self._pool_params = self.pool, None, None
+        if db_pool is not None:
+            try:
+                await db_pool.close()
+            except Exception as e:
+                logging.error(f"Ошибка закрытия асинхронного пула: {str(e)}")
+
+    def is_connected(self) -> bool:
+        return self.pool is not None
+
+    @asynccontextmanager
+    async def connection(self, timeout: float = 30.0):
+        """Соединение пула на время блока: фиксация при успехе, откат при исключении"""
+        if not await self.connect():
+            raise psycopg.OperationalError("Нет подключения к БД")
+        async with self.pool.connection(timeout=timeout) as conn:
+            yield conn
+
+    async def _in_sync_manager(self, fn, *args, error_msg: str):
+        """Вызвать метод синхронного менеджера в пуле потоков: он может читать каталог
+        через psycopg2 (например, граф связей таблиц) и не должен блокировать цикл событий"""
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+        except Exception as e:
+            logging.error(f"{error_msg}: {str(e)}")
+
+    async def _note_committed(self, sql: str):
+        """Сбросить кэши синхронного менеджера по зафиксированной команде, как делает его execute()"""
+        if self.sync_manager is None:
+            return
+        await self._in_sync_manager(self.sync_manager._note_committed, sql,
+                                    error_msg="Ошибка сброса кэша после записи")
+
+    async def _note_structure_changed(self, table: Optional[str] = None):
+        if self.sync_manager is None:
+            return
+        await self._in_sync_manager(self.sync_manager.mark_structure_changed, table,
+                                    error_msg="Ошибка сброса кэша схемы")
+
+    async def _fetch_all(self, sql, params=None) -> List[Tuple]:
+        async with self.connection() as conn:
+            cur = await conn.execute(sql, params)
+            return await cur.fetchall()
+
+    async def _fetch_one(self, sql, params=None) -> Optional[Tuple]:
+        async with self.connection() as conn:
+            cur = await conn.execute(sql, params)
+            return await cur.fetchone()
+
+    async def _write(self, sql, params=None) -> int:
+        async with self.connection() as conn:
+            cur = await conn.execute(sql, params)
+            return cur.rowcount
+
+    async def execute(self, sql: str, params: Optional[Tuple] = None, commit: bool = True) -> Optional[SimpleNamespace]:
+        try:
+            async with self.connection() as conn:
+                cur = await conn.execute(sql, params)
+                columns = [d.name for d in cur.description] if cur.description else []
+                rows = await cur.fetchall() if cur.description else []
+                result = SimpleNamespace(columns=columns, rows=rows, rowcount=cur.rowcount)
+                if not commit:
+                    await conn.rollback()
+        except Exception as e:
+            logging.error(f"Ошибка выполнения запроса через AsyncDatabaseManager.execute: {e}\nSQL: {sql}")
+            return None
+        # пул фиксирует транзакцию на выходе из блока — кэш сбрасывается уже после фиксации
+        if commit:
+            await self._note_committed(sql)
+        return result
+
+    # --- Каталог ---
+    async def list_tables(self) -> List[str]:
+        try:
+            rows = await self._fetch_all("""
+                SELECT table_name
+                FROM information_schema.tables
+                WHERE table_schema = 'public' AND table_name <> %s
+                ORDER BY table_name
+            """, (SUMMARY_TABLE,))
+            return [r[0] for r in rows]
+        except Exception as e:
+            logging.error(f"Ошибка получения списка таблиц: {str(e)}")
+            return []
+
+    async def get_columns(self, table_name: str) -> List[str]:
+        try:
+            rows = await self._fetch_all("""
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_name = %s
+                ORDER BY ordinal_position
+            """, (table_name,))
+            return [r[0] for r in rows]
+        except Exception as e:
+            logging.error(f"Ошибка получения колонок для таблицы {table_name}: {str(e)}")
+            return []
+
+    async def get_table(self, table_name: str) -> Optional[SimpleNamespace]:
+        cols = await self.get_columns(table_name)
+        if not cols:
+            return None
+        return SimpleNamespace(name=table_name, columns=[SimpleNamespace(name=c) for c in cols])
+
+    async def get_table_metadata(self, table_name: str) -> Dict[str, Dict[str, Any]]:
+        try:
+            async with self.connection() as conn:
+                cur = await conn.execute(TABLE_COLUMNS_SQL, (table_name,))
+                columns = await cur.fetchall()
+                cur = await conn.execute(TABLE_CONSTRAINTS_SQL, (table_name,))
+                constraints = await cur.fetchall()
+        except Exception as e:
+            logging.exception(f"get_table_metadata error: {e}")
+            return {}
+        return build_table_metadata(table_name, columns, constraints)
+
+    async def get_column_metadata(self, table_name: str, column_name: str) -> Dict[str, Any]:
+        return (await self.get_table_metadata(table_name)).get(column_name, {})
+
+    async def get_primary_key(self, table_name: str) -> List[str]:
+        meta = await self.get_table_metadata(table_name)
+        return [col for col, m in meta.items() if m.get('is_primary')]
+
+    async def count_rows(self, table_name: str) -> Optional[int]:
+        try:
+            row = await self._fetch_one(f"SELECT COUNT(*) FROM {self._quote_ident(table_name)}")
+            return row[0]
+        except Exception as e:
+            logging.error(f"Ошибка подсчёта строк {table_name}: {str(e)}")
+            return None
+
+    async def count_rows_many(self, table_names: List[str]) -> Dict[str, Optional[int]]:
+        """COUNT(*) по нескольким таблицам одновременно, каждый на своём соединении пула"""
+        counts = await asyncio.gather(*(self.count_rows(t) for t in table_names))
+        return dict(zip(table_names, counts))
+
+    # --- Чтение данных ---
+    async def _select_all(self, sql: str, what: str) -> List[Tuple]:
+        try:
+            return await self._fetch_all(sql)
+        except Exception as e:
+            logging.error(f"Ошибка получения {what}: {str(e)}")
+            return []
+
+    async def get_points(self) -> List[Tuple]:
+        return await self._select_all("SELECT * FROM points ORDER BY point_id", "точек")
+
+    async def get_employees(self) -> List[Tuple]:
+        return await self._select_all("SELECT * FROM employees ORDER BY employee_id", "сотрудников")
+
+    async def get_products(self) -> List[Tuple]:
+        return await self._select_all("SELECT * FROM products ORDER BY product_id", "продуктов")
+
+    async def get_finances(self) -> List[Tuple]:
+        return await self._select_all("SELECT * FROM transactions ORDER BY transaction_id", "финансов")
+
+    async def fetch_page(self, table_name: str, after_key: Optional[Tuple] = None, limit: int = 100,
+                         order_by: Optional[List[str]] = None) -> Tuple[List[str], List[Tuple], Optional[Tuple]]:
+        """Страница строк по ключу, как DatabaseManager.fetch_page"""
+        try:
+            key_cols = list(order_by) if order_by else await self.get_primary_key(table_name)
+            if not key_cols:
+                logging.error(f"Постраничный просмотр {table_name}: нет первичного ключа и не задан order_by")
+                return [], [], None
+            sql, params = keyset_page_sql(self._quote_ident(table_name),
+                                          [self._quote_ident(c) for c in key_cols], after_key, limit)
+            async with self.connection() as conn:
+                cur = await conn.execute(sql, params)
+                rows = await cur.fetchall()
+                columns = [d.name for d in cur.description]
+            rows, next_key = split_keyset_page(columns, rows, key_cols, limit)
+            return columns, rows, next_key
+        except Exception as e:
+            logging.error(f"Ошибка получения страницы таблицы {table_name}: {str(e)}")
+            return [], [], None
+
+    async def _select_by_id(self, sql: str, row_id: int, what: str) -> Optional[Tuple]:
+        try:
+            return await self._fetch_one(sql, (row_id,))
+        except Exception as e:
+            logging.error(f"Ошибка получения {what}: {str(e)}")
+            return None
+
+    async def get_point_by_id(self, point_id: int) -> Optional[Tuple]:
+        return await self._select_by_id("SELECT * FROM points WHERE point_id = %s", point_id, "точки")
+
+    async def get_employee_by_id(self, employee_id: int) -> Optional[Tuple]:
+        return await self._select_by_id("SELECT * FROM employees WHERE employee_id = %s", employee_id, "сотрудника")
+
+    async def get_product_by_id(self, product_id: int) -> Optional[Tuple]:
+        return await self._select_by_id("SELECT * FROM products WHERE product_id = %s", product_id, "продукта")
+
+    async def get_transaction_by_id(self, transaction_id: int) -> Optional[Tuple]:
+        return await self._select_by_id("SELECT * FROM transactions WHERE transaction_id = %s", transaction_id,
+                                        "финансовой операции")
+
+    async def get_points_count(self) -> int:
+        return await self.count_rows('points') or 0
+
+    async def get_employees_count(self) -> int:
+        return await self.count_rows('employees') or 0
+
+    async def get_products_count(self) -> int:
+        return await self.count_rows('products') or 0
+
+    # --- Показатели главного окна ---
+    async def is_transaction_summary_enabled(self) -> bool:
+        try:
+            row = await self._fetch_one(SUMMARY_ENABLED_SQL)
+            return bool(row[0])
+        except Exception as e:
+            logging.error(f"Ошибка проверки сводки транзакций: {str(e)}")
+            return False
+
+    async def _transaction_total(self, tx_type: str, what: str) -> float:
+        try:
+            sql = transaction_total_sql(await self.is_transaction_summary_enabled())
+            row = await self._fetch_one(sql, (tx_type,))
+            return float(row[0] or 0.0)
+        except Exception as e:
+            logging.error(f"Ошибка получения {what}: {str(e)}")
+            return 0.0
+
+    async def get_total_revenue(self) -> float:
+        return await self._transaction_total('Доход', "общего дохода")
+
+    async def get_total_expenses(self) -> float:
+        return await self._transaction_total('Расход', "общих расходов")
+
+    async def get_dashboard_stats(self, estimate_counts: bool = False) -> Dict[str, Any]:
+        """Все показатели главного окна одним запросом, как DatabaseManager.get_dashboard_stats"""
+        sql = dashboard_stats_sql(estimate_counts, await self.is_transaction_summary_enabled())
+        row = None
+        try:
+            row = await self._fetch_one(sql)
+        except Exception as e:
+            logging.error(f"Ошибка получения статистики: {str(e)}")
+        return build_dashboard_stats(row, estimate_counts)
+
+    # --- Запись данных ---
+    def _check(self, check, invalid_msg: str, error_msg: str) -> bool:
+        """Проверки формата DatabaseManager; исключение в проверке (например, None) — тоже отказ"""
+        try:
+            ok = check()
+        except Exception as e:
+            logging.error(f"{error_msg}: {str(e)}")
+            return False
+        if not ok:
+            logging.error(invalid_msg)
+        return ok
+
+    async def _modify(self, sql: str, params: Tuple, done_msg: str, error_msg: str) -> bool:
+        try:
+            await self._write(sql, params)
+            await self._note_committed(sql)
+            logging.info(done_msg)
+            return True
+        except Exception as e:
+            logging.error(f"{error_msg}: {str(e)}")
+            return False
+
+    async def insert_point(self, address: str, phone_number: str = None) -> bool:
+        if not self._check(lambda: self.is_valid_phone(phone_number) and self.is_valid_ru_letters(address),
+                           "Неверный формат", "Ошибка добавления точки"):
+            return False
+        return await self._modify("INSERT INTO points (address, phone_number) VALUES (%s, %s)",
+                                  (address, phone_number), f"Добавлена точка: {address}", "Ошибка добавления точки")
+
+    async def insert_employee(self, full_name: str, position: str, salary: float, schedule: str, point_id: int) -> bool:
+        if not self._check(lambda: (self.is_valid_ru_letters(full_name) and self.is_valid_schedule(schedule)
+                                    and self.is_valid_ru_letters(position)),
+                           'Ошибка добавления сотрудника', 'Ошибка добавления сотрудника'):
+            return False
+        return await self._modify(
+            "INSERT INTO employees (full_name, position, salary, schedule, point_id) VALUES (%s, %s, %s, %s, %s)",
+            (full_name, position, salary, schedule, point_id),
+            f"Добавлен сотрудник: {full_name}", "Ошибка добавления сотрудника")
+
+    async def insert_product(self, name: str, category: str, cost_price: float, selling_price: float) -> bool:
+        if not self._check(lambda: self.is_valid_ru_letters(name) and self.is_valid_ru_letters(category),
+                           "Ошибка добавления продукта", "Ошибка добавления продукта"):
+            return False
+        return await self._modify(
+            "INSERT INTO products (name, category, cost_price, selling_price) VALUES (%s, %s, %s, %s)",
+            (name, category, cost_price, selling_price), f"Добавлен продукт: {name}", "Ошибка добавления продукта")
+
+    async def insert_transaction(self, point_id: int, type: str, amount: float, date: str, description: str = None) -> bool:
+        if not self._check(lambda: self.is_valid_ru_letters(description),
+                           f'Неверный формат:{description}', "Ошибка добавления операции"):
+            return False
+        return await self._modify(
+            "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (%s, %s, %s, %s, %s)",
+            (point_id, type, amount, date, description),
+            f"Добавлена операция: {type} на сумму {amount}", "Ошибка добавления операции")
+
+    async def update_point(self, point_id: int, address: str, phone_number: str = None) -> bool:
+        if not self._check(lambda: self.is_valid_phone(phone_number) and self.is_valid_ru_letters(address),
+                           "Неверный формат", "Ошибка обновления точки"):
+            return False
+        return await self._modify("UPDATE points SET address = %s, phone_number = %s WHERE point_id = %s",
+                                  (address, phone_number, point_id),
+                                  f"Обновлена точка ID: {point_id}", "Ошибка обновления точки")
+
+    async def update_employee(self, employee_id: int, full_name: str, position: str, salary: float, schedule: str, point_id: int) -> bool:
+        if not self._check(lambda: (self.is_valid_ru_letters(full_name) and self.is_valid_schedule(schedule)
+                                    and self.is_valid_ru_letters(position)),
+                           'Ошибка добавления сотрудника', 'Ошибка обновления сотрудника'):
+            return False
+        return await self._modify(
+            "UPDATE employees SET full_name = %s, position = %s, salary = %s, schedule = %s, point_id = %s WHERE employee_id = %s",
+            (full_name, position, salary, schedule, point_id, employee_id),
+            f"Обновлен сотрудник ID: {employee_id}", "Ошибка обновления сотрудника")
+
+    async def update_product(self, product_id: int, name: str, category: str, cost_price: float, selling_price: float) -> bool:
+        if not self._check(lambda: self.is_valid_ru_letters(name) and self.is_valid_ru_letters(category),
+                           "Ошибка добавления продукта", "Ошибка обновления продукта"):
+            return False
+        return await self._modify(
+            "UPDATE products SET name = %s, category = %s, cost_price = %s, selling_price = %s WHERE product_id = %s",
+            (name, category, cost_price, selling_price, product_id),
+            f"Обновлен продукт ID: {product_id}", "Ошибка обновления продукта")
+
+    async def update_transaction(self, transaction_id: int, point_id: int, type: str, amount: float, date: str, description: str = None) -> bool:
+        if not self._check(lambda: self.is_valid_ru_letters(description),
+                           f'Неверный формат:{description}', "Ошибка обновления финансовой операции"):
+            return False
+        return await self._modify(
+            "UPDATE transactions SET point_id = %s, type = %s, amount = %s, date = %s, description = %s WHERE transaction_id = %s",
+            (point_id, type, amount, date, description, transaction_id),
+            f"Обновлена финансовая операция ID: {transaction_id}", "Ошибка обновления финансовой операции")
+
+    async def delete_point(self, point_id: int) -> bool:
+        return await self._modify("DELETE FROM points WHERE point_id = %s", (point_id,),
+                                  f"Удалена точка ID: {point_id}", "Ошибка удаления точки")
+
+    async def delete_employee(self, employee_id: int) -> bool:
+        return await self._modify("DELETE FROM employees WHERE employee_id = %s", (employee_id,),
+                                  f"Удален сотрудник ID: {employee_id}", "Ошибка удаления сотрудника")
+
+    async def delete_product(self, product_id: int) -> bool:
+        return await self._modify("DELETE FROM products WHERE product_id = %s", (product_id,),
+                                  f"Удален продукт ID: {product_id}", "Ошибка удаления продукта")
+
+    async def delete_transaction(self, transaction_id: int) -> bool:
+        return await self._modify("DELETE FROM transactions WHERE transaction_id = %s", (transaction_id,),
+                                  f"Удалена финансовая операция ID: {transaction_id}",
+                                  "Ошибка удаления финансовой операции")
+
+    # --- Изменение структуры ---
+    async def _alter(self, statements: List[Any], error_name: str, table: Optional[str] = None) -> bool:
+        """Выполнить DDL одной транзакцией"""
+        try:
+            async with self.connection() as conn:
+                for statement in statements:
+                    await conn.execute(statement)
+            await self._note_structure_changed(table)
+            return True
+        except Exception as e:
+            logging.exception(f"{error_name} error: {e}")
+            return False
+
+    def _with_literal(self, prefix: str, value, suffix: str = "") -> Any:
+        # DDL не принимает серверные параметры — значение подставляется литералом на клиенте
+        return pg_sql.SQL("{} {}{}").format(pg_sql.SQL(prefix), pg_sql.Literal(value), pg_sql.SQL(suffix))
+
+    async def alter_add_column(self, table: str, column: str, data_type: str,
+                               nullable: bool = True, default: Optional[str] = None,
+                               unique: bool = False, constraint_name: Optional[str] = None) -> bool:
+        base = f"ALTER TABLE {self._quote_ident(table)} ADD COLUMN {self._quote_ident(column)} {data_type}"
+        not_null = "" if nullable else " NOT NULL"
+        if default is not None and default != "":
+            statements = [self._with_literal(base + " DEFAULT", default, not_null)]
+        else:
+            statements = [base + not_null]
+        if unique:
+            cname = constraint_name or f"uniq_{table}_{column}"
+            statements.append(f"ALTER TABLE {self._quote_ident(table)} ADD CONSTRAINT {self._quote_ident(cname)} "
+                              f"UNIQUE ({self._quote_ident(column)})")
+        return await self._alter(statements, "alter_add_column", table)
+
+    async def alter_drop_column(self, table: str, column: str, cascade: bool = True) -> bool:
+        sql = f"ALTER TABLE {self._quote_ident(table)} DROP COLUMN {self._quote_ident(column)}"
+        if cascade:
+            sql += " CASCADE"
+        return await self._alter([sql], "alter_drop_column", table)
+
+    async def alter_rename_table(self, old_name: str, new_name: str) -> bool:
+        return await self._alter([f"ALTER TABLE {self._quote_ident(old_name)} RENAME TO {self._quote_ident(new_name)}"],
+                                 "alter_rename_table")
+
+    async def alter_rename_column(self, table: str, old_col: str, new_col: str) -> bool:
+        return await self._alter(
+            [f"ALTER TABLE {self._quote_ident(table)} RENAME COLUMN {self._quote_ident(old_col)} TO {self._quote_ident(new_col)}"],
+            "alter_rename_column", table)
+
+    async def alter_add_constraint(self, table: str, constraint_type: str, details: Dict[str, Any]) -> bool:
+        table_sql = self._quote_ident(table)
+        if constraint_type == 'NOT NULL':
+            statement = f"ALTER TABLE {table_sql} ALTER COLUMN {self._quote_ident(details.get('column'))} SET NOT NULL"
+        elif constraint_type == 'DEFAULT':
+            statement = self._with_literal(
+                f"ALTER TABLE {table_sql} ALTER COLUMN {self._quote_ident(details.get('column'))} SET DEFAULT",
+                details.get('default'))
+        elif constraint_type == 'UNIQUE':
+            cols = details.get('columns', [])
+            cname = details.get('name') or f"uniq_{table}_{'_'.join(cols)}"
+            cols_list = ", ".join([self._quote_ident(c) for c in cols])
+            statement = f"ALTER TABLE {table_sql} ADD CONSTRAINT {self._quote_ident(cname)} UNIQUE ({cols_list})"
+        elif constraint_type == 'CHECK':
+            cname = details.get('name') or f"chk_{table}"
+            statement = f"ALTER TABLE {table_sql} ADD CONSTRAINT {self._quote_ident(cname)} CHECK ({details.get('expr')})"
+        elif constraint_type == 'FOREIGN KEY':
+            cols = details.get('columns', [])
+            cname = details.get('name') or f"fk_{table}_{'_'.join(cols)}"
+            cols_list = ", ".join([self._quote_ident(c) for c in cols])
+            ref_cols_list = ", ".join([self._quote_ident(c) for c in details.get('ref_columns', [])])
+            statement = (f"ALTER TABLE {table_sql} ADD CONSTRAINT {self._quote_ident(cname)} FOREIGN KEY ({cols_list}) "
+                         f"REFERENCES {self._quote_ident(details.get('ref_table'))} ({ref_cols_list})")
+        else:
+            logging.warning(f"Unknown constraint type: {constraint_type}")
+            return True
+        return await self._alter([statement], "alter_add_constraint", table)
+
+    async def alter_drop_constraint(self, table: str, constraint_name: str) -> bool:
+        return await self._alter(
+            [f"ALTER TABLE {self._quote_ident(table)} DROP CONSTRAINT {self._quote_ident(constraint_name)} CASCADE"],
+            "alter_drop_constraint", table)
+
+    async def clear_column_values(self, table: str, column: str) -> bool:
+        return await self._alter([f"UPDATE {self._quote_ident(table)} SET {self._quote_ident(column)} = NULL"],
+                                 "clear_column_values", table)
+
+    async def alter_change_type(self, table: str, column: str, new_type: str,
+                                new_not_null: Optional[bool] = None,
+                                new_default: Optional[str] = None,
+                                new_unique: Optional[bool] = None,
+                                new_fk: Optional[Dict[str, Any]] = None,
+                                drop_constraints_first: bool = True) -> Tuple[bool, str]:
+        meta = await self.get_column_metadata(table, column)
+        table_sql, column_sql = self._quote_ident(table), self._quote_ident(column)
+        try:
+            async with self.connection() as conn:
+                if drop_constraints_first:
+                    # best-effort, как в DatabaseManager: каждое снятие в своей точке сохранения
+                    drops = [f"ALTER TABLE {table_sql} DROP CONSTRAINT {self._quote_ident(c['name'])} CASCADE"
+                             for kind in ('foreign_keys', 'unique_constraints', 'check_constraints')
+                             for c in meta.get(kind, []) or []]
+                    if not meta.get('is_nullable', True):
+                        drops.append(f"ALTER TABLE {table_sql} ALTER COLUMN {column_sql} DROP NOT NULL")
+                    if meta.get('column_default') is not None:
+                        drops.append(f"ALTER TABLE {table_sql} ALTER COLUMN {column_sql} DROP DEFAULT")
+                    for statement in drops:
+                        try:
+                            async with conn.transaction():
+                                await conn.execute(statement)
+                        except psycopg.Error:
+                            logging.debug("Не удалось выполнить %s", statement)
+
+                await conn.execute(f"ALTER TABLE {table_sql} ALTER COLUMN {column_sql} TYPE {new_type} "
+                                   f"USING {column_sql}::{new_type}")
+
+                if new_default is not None:
+                    # new_default: готовый SQL-литерал, как и в синхронной версии
+                    await conn.execute(f"ALTER TABLE {table_sql} ALTER COLUMN {column_sql} SET DEFAULT {new_default}")
+                if new_not_null:
+                    await conn.execute(f"ALTER TABLE {table_sql} ALTER COLUMN {column_sql} SET NOT NULL")
+                if new_unique:
+                    cname = self._quote_ident(f"uniq_{table}_{column}")
+                    await conn.execute(f"ALTER TABLE {table_sql} ADD CONSTRAINT {cname} UNIQUE ({column_sql})")
+                if new_fk and new_fk.get('ref_table') and new_fk.get('ref_columns'):
+                    cname = self._quote_ident(new_fk.get('constraint_name') or f"fk_{table}_{column}")
+                    await conn.execute(
+                        f"ALTER TABLE {table_sql} ADD CONSTRAINT {cname} FOREIGN KEY ({column_sql}) "
+                        f"REFERENCES {self._quote_ident(new_fk['ref_table'])} ({self._quote_ident(new_fk['ref_columns'][0])})")
+            await self._note_structure_changed(table)
+            return True, ""
+        except Exception as e:
+            logging.exception("alter_change_type failed: %s", e)
+            return False, str(e)
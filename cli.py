@@ -0,0 +1,172 @@
+"""Консольный режим без графического интерфейса: python cli.py <команда> [параметры].
+
+Результат каждой команды печатается в stdout одним JSON-объектом; код выхода 0 — успех,
+1 — команда не выполнена, 2 — нет подключения к БД. Qt не импортируется, поэтому
+скрипт работает на сервере без дисплея, и несколько его копий могут идти параллельно.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+from database import DatabaseManager
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, (bytes, memoryview)):
+        return bytes(value).hex()
+    return str(value)
+
+
+def _emit(payload: dict) -> None:
+    json.dump(payload, sys.stdout, ensure_ascii=False, default=_json_default)
+    sys.stdout.write("\n")
+
+
+def cmd_recreate(db: DatabaseManager, args) -> dict:
+    return {'ok': db.recreate_tables()}
+
+
+def cmd_seed(db: DatabaseManager, args) -> dict:
+    return {'ok': db.insert_sample_data()}
+
+
+def cmd_stats(db: DatabaseManager, args) -> dict:
+    stats = db.get_dashboard_stats(estimate_counts=args.estimate)
+    return {'ok': True, 'stats': stats}
+
+
+def cmd_export(db: DatabaseManager, args) -> dict:
+    if args.sql:
+        result = db.export_query(args.sql, args.path, delimiter=args.delimiter)
+    else:
+        result = db.export_table(args.table, args.path, delimiter=args.delimiter)
+    return {'ok': result['error'] is None, **result}
+
+
+def cmd_import(db: DatabaseManager, args) -> dict:
+    result = db.import_csv(args.table, args.path, delimiter=args.delimiter, encoding=args.encoding,
+                           upsert=args.upsert)
+    return {'ok': not result['errors'], **result}
+
+
+def cmd_refresh_matviews(db: DatabaseManager, args) -> dict:
+    names = args.views or db.list_materialized_views()
+    refreshed, failed = [], []
+    for name in names:
+        (refreshed if db.refresh_materialized_view(name, args.concurrently) else failed).append(name)
+    return {'ok': not failed, 'refreshed': refreshed, 'failed': failed}
+
+
+def cmd_run_sql(db: DatabaseManager, args) -> dict:
+    if args.file:
+        with open(args.file, encoding='utf-8') as f:
+            sql = f.read()
+    else:
+        sql = args.sql
+    try:
+        with db.borrow_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql)
+            columns = [d[0] for d in cursor.description] if cursor.description else []
+            rows = cursor.fetchmany(args.max_rows) if cursor.description else []
+            rowcount = cursor.rowcount
+            cursor.close()
+            if args.rollback:
+                conn.rollback()
+            else:
+                conn.commit()
+        if not args.rollback:
+            db.note_write(sql)
+    except Exception as e:
+        return {'ok': False, 'error': str(e).strip()}
+    return {'ok': True, 'columns': columns, 'rows': [list(r) for r in rows], 'rowcount': rowcount,
+            'truncated': bool(columns) and rowcount > len(rows)}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Крошка Картошка — пакетный режим без интерфейса")
+    conn = parser.add_argument_group("подключение (по умолчанию — переменные PGHOST, PGPORT, ...)")
+    conn.add_argument("--host", default=os.environ.get("PGHOST"))
+    conn.add_argument("--port", default=os.environ.get("PGPORT"))
+    conn.add_argument("--dbname", default=os.environ.get("PGDATABASE"))
+    conn.add_argument("--user", default=os.environ.get("PGUSER"))
+    conn.add_argument("--password", default=os.environ.get("PGPASSWORD"))
+
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("recreate", help="пересоздать таблицы").set_defaults(handler=cmd_recreate)
+    sub.add_parser("seed", help="добавить тестовые данные").set_defaults(handler=cmd_seed)
+
+    p = sub.add_parser("stats", help="показатели главного окна")
+    p.add_argument("--estimate", action="store_true", help="число строк по статистике планировщика")
+    p.set_defaults(handler=cmd_stats)
+
+    p = sub.add_parser("export", help="выгрузить таблицу или запрос в CSV (.gz — со сжатием)")
+    source = p.add_mutually_exclusive_group(required=True)
+    source.add_argument("--table")
+    source.add_argument("--sql")
+    p.add_argument("path")
+    p.add_argument("--delimiter", default=",")
+    p.set_defaults(handler=cmd_export)
+
+    p = sub.add_parser("import", help="загрузить CSV/TSV в таблицу")
+    p.add_argument("table")
+    p.add_argument("path")
+    p.add_argument("--delimiter", default=",")
+    p.add_argument("--encoding", default="utf-8")
+    p.add_argument("--upsert", action="store_true", help="обновлять строки с тем же первичным ключом")
+    p.set_defaults(handler=cmd_import)
+
+    p = sub.add_parser("refresh-matviews", help="обновить материализованные представления")
+    p.add_argument("views", nargs="*", help="schema.view; по умолчанию — все")
+    p.add_argument("--concurrently", action="store_true")
+    p.set_defaults(handler=cmd_refresh_matviews)
+
+    p = sub.add_parser("run-sql", help="выполнить SQL и вывести результат")
+    text = p.add_mutually_exclusive_group(required=True)
+    text.add_argument("--sql")
+    text.add_argument("--file")
+    p.add_argument("--max-rows", type=int, default=1000)
+    p.add_argument("--rollback", action="store_true", help="откатить транзакцию вместо фиксации")
+    p.set_defaults(handler=cmd_run_sql)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    started = time.monotonic()
+
+    db = DatabaseManager()
+    db.setup_logging()
+    # одна команда — одно-два соединения; канал LISTEN для кэша схемы здесь не нужен
+    db.schema_listen_enabled = False
+    db.set_pool_size(1, 2)
+    params = {key: getattr(args, key) for key in ('host', 'port', 'dbname', 'user', 'password')
+              if getattr(args, key)}
+    db.set_connection_params(params)
+
+    if not db.connect():
+        _emit({'ok': False, 'command': args.command, 'error': "Нет подключения к БД"})
+        return 2
+    try:
+        result = args.handler(db, args)
+    finally:
+        db.disconnect()
+    result['command'] = args.command
+    result['elapsed_ms'] = round((time.monotonic() - started) * 1000, 1)
+    _emit(result)
+    return 0 if result.get('ok') else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,11 +3,15 @@ import logging
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
     QListWidget, QListWidgetItem, QLineEdit, QMessageBox,
-    QTextEdit, QTableWidget, QTableWidgetItem, QHeaderView
+    QTextEdit, QSpinBox
 )
 from PySide6.QtCore import Qt
 
-from select import AdvancedSelectDialog
+from export_dialog import export_query_to_file
+from plan_viewer import show_query_plan
+from query_executor import QueryExecutor
+from result_model import create_result_view
+from select_dialog import AdvancedSelectDialog
 
 
 class CteBuilderDialog(QDialog):
@@ -18,6 +22,7 @@ class CteBuilderDialog(QDialog):
         self.resize(1000, 700)
         self.ctes = []  
         self.main_sql = ""
+        self.executor = QueryExecutor(dbmanager, self)
         self.setup_ui()
 
     def setup_ui(self):
@@ -67,24 +72,47 @@ class CteBuilderDialog(QDialog):
         btn_exec_row = QHBoxLayout()
         self.btn_refresh_preview = QPushButton("Обновить текст SQL")
         self.btn_execute = QPushButton("Выполнить запрос")
+        self.btn_cancel = QPushButton("Отменить")
+        self.btn_cancel.setEnabled(False)
+        self.btn_export = QPushButton("Экспорт CSV")
+        self.btn_explain = QPushButton("Explain")
+        self.btn_explain.setToolTip("EXPLAIN ANALYZE: план с фактическим временем, изменения откатываются")
         self.btn_close = QPushButton("Закрыть")
+        self.timeout_spin = QSpinBox()
+        self.timeout_spin.setRange(0, 3600)
+        self.timeout_spin.setValue(60)
+        self.timeout_spin.setSuffix(" с")
+        self.timeout_spin.setSpecialValueText("без ограничения")
+        self.timeout_spin.setToolTip("statement_timeout для запросов этого окна")
 
         self.btn_refresh_preview.clicked.connect(self.update_preview)
         self.btn_execute.clicked.connect(self.execute_query)
+        self.btn_cancel.clicked.connect(self.cancel_query)
+        self.btn_export.clicked.connect(
+            lambda: export_query_to_file(self, self.dbmanager, self.build_full_sql(), "cte"))
+        self.btn_explain.clicked.connect(
+            lambda: show_query_plan(self, self.dbmanager, self.build_full_sql(), self.timeout_spin.value() * 1000))
         self.btn_close.clicked.connect(self.reject)
 
         btn_exec_row.addWidget(self.btn_refresh_preview)
         btn_exec_row.addWidget(self.btn_execute)
+        btn_exec_row.addWidget(self.btn_cancel)
+        btn_exec_row.addWidget(self.btn_export)
+        btn_exec_row.addWidget(self.btn_explain)
+        btn_exec_row.addWidget(QLabel("Таймаут:"))
+        btn_exec_row.addWidget(self.timeout_spin)
         btn_exec_row.addStretch()
         btn_exec_row.addWidget(self.btn_close)
         layout.addLayout(btn_exec_row)
 
-        layout.addWidget(QLabel("Результат:"))
+        result_row = QHBoxLayout()
+        result_row.addWidget(QLabel("Результат:"))
+        self.status_label = QLabel("")
+        result_row.addWidget(self.status_label)
+        result_row.addStretch()
+        layout.addLayout(result_row)
 
-        self.result_table = QTableWidget()
-        self.result_table.setColumnCount(0)
-        self.result_table.setRowCount(0)
-        self.result_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.result_table = create_result_view(stretch=True)
         layout.addWidget(self.result_table)
 
     def _get_builder_sql(self):
@@ -168,23 +196,43 @@ class CteBuilderDialog(QDialog):
         if not full_sql:
             QMessageBox.warning(self, "Ошибка", "Нужно задать основной SELECT.")
             return
-        try:
-            cur = self.dbmanager.executesql(full_sql)
-            if not cur:
-                return
-            rows = cur.fetchall()
-            desc = cur.description
-            cur.close()
-
-            columns = [d[0] for d in desc] if desc else []
-            self.result_table.setRowCount(len(rows))
-            self.result_table.setColumnCount(len(columns))
-            self.result_table.setHorizontalHeaderLabels(columns)
-
-            for i, row in enumerate(rows):
-                for j, val in enumerate(row):
-                    item = QTableWidgetItem("" if val is None else str(val))
-                    self.result_table.setItem(i, j, item)
-        except Exception as e:
-            logging.exception("CTE execute failed: %s", e)
-            QMessageBox.warning(self, "Ошибка", str(e))
+        model = self.result_table.model()
+        model.clear()
+        self.executor.statement_timeout_ms = self.timeout_spin.value() * 1000
+        self._set_query_running(True)
+        self.status_label.setStyleSheet("")
+        self.status_label.setText("Выполняется...")
+        self.executor.submit(full_sql, columns=model.set_columns, batch=model.append_rows,
+                             progress=self.on_query_progress, finished=self.on_query_finished,
+                             error=self.on_query_error, cancelled=self.on_query_cancelled)
+
+    def cancel_query(self):
+        self.btn_cancel.setEnabled(False)
+        self.status_label.setText("Отмена...")
+        self.executor.cancel_all()
+
+    def done(self, result):
+        # закрытие окна не должно оставлять запрос работать на сервере
+        self.executor.cancel_all()
+        super().done(result)
+
+    def _set_query_running(self, running: bool):
+        self.btn_execute.setEnabled(not running)
+        self.btn_cancel.setEnabled(running)
+
+    def on_query_progress(self, fetched: int):
+        self.status_label.setText(f"Выполняется... получено строк: {fetched}")
+
+    def on_query_finished(self, total: int):
+        self._set_query_running(False)
+        self.status_label.setText(f"Строк: {total}")
+
+    def on_query_cancelled(self):
+        self._set_query_running(False)
+        self.status_label.setText(f"Запрос отменён, получено строк: {self.result_table.model().loaded_count()}")
+
+    def on_query_error(self, message: str):
+        self._set_query_running(False)
+        logging.error("CTE execute failed: %s", message)
+        self.status_label.setStyleSheet("color: #c0392b;")
+        self.status_label.setText(f"Ошибка: {message.strip()}")
@@ -1,17 +1,536 @@
 from types import SimpleNamespace
 
 import psycopg2
+from psycopg2 import errors as pg_errors
+from psycopg2 import pool
+from psycopg2.extras import execute_batch, execute_values
+from psycopg2.extensions import (
+    TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INERROR, TRANSACTION_STATUS_UNKNOWN,
+    connection as PgConnection, cursor as PgCursor
+)
+import copy
+import csv
+import functools
+import gzip
+import itertools
+import json
 import logging
 import os
 import re
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from app_paths import app_file
+from query_stats import STATS
+from result_cache import ResultCache
 from typing import List, Tuple, Optional, Dict
 from string import ascii_letters
 import logging
 from typing import Dict, Any, List, Optional, Tuple
+
+DDL_RE = re.compile(r'^\s*(CREATE|ALTER|DROP|COMMENT)\b', re.IGNORECASE)
+READ_RE = re.compile(r'^\s*(SELECT|WITH|VALUES|TABLE)\b', re.IGNORECASE)
+WRITE_WORD_RE = re.compile(r'\b(INSERT|UPDATE|DELETE|MERGE|INTO)\b', re.IGNORECASE)
+# результат таких запросов меняется без записи в таблицы — в кэш не кладём
+VOLATILE_RE = re.compile(r'\b(now|random|nextval|setval|clock_timestamp|statement_timestamp|timeofday|'
+                         r'current_date|current_time|current_timestamp|localtime|localtimestamp|txid_current)\b',
+                         re.IGNORECASE)
+IDENT_RE = re.compile(r'"((?:[^"]|"")+)"|([A-Za-z_][\w$]*)')
+
+SUMMARY_TABLE = 'transaction_daily_totals'
+INDEX_METHODS = ('btree', 'hash', 'gin', 'gist', 'brin')
+# методы доступа, поддерживающие INCLUDE (gist — с PostgreSQL 12)
+INCLUDE_METHODS = ('btree', 'gist')
+REPORT_PERIODS = ('day', 'week', 'month')
+
+
+def retry_on_connection_loss(method):
+    """Повторить метод один раз, если соединение из пула оборвалось во время запроса"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        local = self._local
+        if getattr(local, 'retry_depth', 0):
+            return method(self, *args, **kwargs)
+        local.retry_depth = 1
+        try:
+            local.connection_lost = False
+            result = method(self, *args, **kwargs)
+            if local.connection_lost:
+                logging.warning(f"Соединение с БД потеряно, повтор {method.__name__}")
+                local.connection_lost = False
+                result = method(self, *args, **kwargs)
+            return result
+        finally:
+            local.retry_depth = 0
+    return wrapper
+
+
+# каталожные запросы метаданных таблицы; общие для DatabaseManager и AsyncDatabaseManager
+TABLE_COLUMNS_SQL = """
+SELECT
+  a.attname,
+  CASE
+    WHEN t.typelem <> 0 AND t.typlen = -1 THEN 'ARRAY'
+    WHEN tn.nspname = 'pg_catalog' THEN format_type(a.atttypid, NULL)
+    ELSE 'USER-DEFINED'
+  END AS data_type,
+  NOT a.attnotnull AS is_nullable,
+  pg_get_expr(d.adbin, d.adrelid) AS column_default,
+  t.typname AS udt_name,
+  (SELECT array_agg(e.enumlabel ORDER BY e.enumsortorder)
+     FROM pg_enum e WHERE e.enumtypid = t.oid) AS enum_values
+FROM pg_attribute a
+JOIN pg_class rel ON rel.oid = a.attrelid
+JOIN pg_namespace nsp ON nsp.oid = rel.relnamespace
+JOIN pg_type t ON t.oid = a.atttypid
+JOIN pg_namespace tn ON tn.oid = t.typnamespace
+LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+WHERE nsp.nspname = 'public' AND rel.relname = %s
+  AND a.attnum > 0 AND NOT a.attisdropped
+ORDER BY a.attnum
+"""
+
+TABLE_CONSTRAINTS_SQL = """
+SELECT
+  con.conname,
+  con.contype,
+  (SELECT array_agg(a.attname ORDER BY k.ord)
+     FROM unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+     JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum) AS columns,
+  fr.relname AS ref_table,
+  (SELECT array_agg(a.attname ORDER BY k.ord)
+     FROM unnest(con.confkey) WITH ORDINALITY AS k(attnum, ord)
+     JOIN pg_attribute a ON a.attrelid = con.confrelid AND a.attnum = k.attnum) AS ref_columns,
+  pg_get_constraintdef(con.oid) AS definition
+FROM pg_constraint con
+JOIN pg_class rel ON rel.oid = con.conrelid
+JOIN pg_namespace nsp ON nsp.oid = rel.relnamespace
+LEFT JOIN pg_class fr ON fr.oid = con.confrelid
+WHERE nsp.nspname = 'public' AND rel.relname = %s
+  AND con.contype IN ('p', 'u', 'c', 'f')
+ORDER BY con.conname
+"""
+
+
+def build_table_metadata(table_name: str, columns: List[Tuple], constraints: List[Tuple]) -> Dict[str, Dict[str, Any]]:
+    """Собрать meta колонок (колонка -> meta) из строк TABLE_COLUMNS_SQL и TABLE_CONSTRAINTS_SQL"""
+    result = {}
+    for name, data_type, is_nullable, default, udt_name, enum_values in columns:
+        result[name] = {
+            'table': table_name,
+            'column': name,
+            'data_type': data_type,
+            'is_nullable': is_nullable,
+            'column_default': default,
+            'udt_name': udt_name,  # внутреннее имя типа (важно для enum)
+            'is_primary': False,
+            'unique_constraints': [],
+            'check_constraints': [],
+            'foreign_keys': [],
+            'enum_values': list(enum_values or []),
+        }
+
+    for cname, contype, cols, ref_table, ref_cols, definition in constraints:
+        cols = list(cols or [])
+        for col in cols:
+            meta = result.get(col)
+            if meta is None:
+                continue
+            if contype == 'p':
+                meta['is_primary'] = True
+            elif contype == 'u':
+                meta['unique_constraints'].append({'name': cname, 'columns': cols})
+            elif contype == 'c':
+                meta['check_constraints'].append({'name': cname, 'expr': definition})
+            elif contype == 'f':
+                meta['foreign_keys'].append({'name': cname, 'columns': cols, 'ref_table': ref_table,
+                                             'ref_columns': list(ref_cols or [])})
+    return result
+
+
+# SQL, общий с AsyncDatabaseManager
+SUMMARY_ENABLED_SQL = f"""
+SELECT to_regclass('public.{SUMMARY_TABLE}') IS NOT NULL
+   AND EXISTS(SELECT 1 FROM pg_trigger
+              WHERE tgrelid = to_regclass('public.transactions')
+                AND tgname = 'krk_tx_totals_ins')
+"""
+
+
+def transaction_total_sql(summary_enabled: bool) -> str:
+    """Сумма операций одного типа (параметр — 'Доход' или 'Расход')"""
+    if summary_enabled:
+        return f"SELECT SUM(total_amount) FROM {SUMMARY_TABLE} WHERE type = %s"
+    return "SELECT SUM(amount) FROM transactions WHERE type = %s"
+
+
+def dashboard_stats_sql(estimate_counts: bool, summary_enabled: bool) -> str:
+    """Один запрос со всеми показателями главного окна, строку разбирает build_dashboard_stats"""
+    def count_expr(table: str) -> str:
+        if estimate_counts:
+            return f"(SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = 'public.{table}'::regclass)"
+        return f"(SELECT COUNT(*) FROM {table})"
+
+    if summary_enabled:
+        totals_sql = f"""
+            SELECT COALESCE(SUM(tx_count), 0) AS cnt,
+                   COALESCE(SUM(total_amount) FILTER (WHERE type = 'Доход'), 0) AS revenue,
+                   COALESCE(SUM(total_amount) FILTER (WHERE type = 'Расход'), 0) AS expenses
+            FROM {SUMMARY_TABLE}
+        """
+    else:
+        totals_sql = f"""
+            SELECT {'NULL::bigint' if estimate_counts else 'COUNT(*)'} AS cnt,
+                   COALESCE(SUM(amount) FILTER (WHERE type = 'Доход'), 0) AS revenue,
+                   COALESCE(SUM(amount) FILTER (WHERE type = 'Расход'), 0) AS expenses
+            FROM transactions
+        """
+
+    return f"""
+        SELECT {count_expr('points')},
+               {count_expr('employees')},
+               {count_expr('products')},
+               {count_expr('transactions') if estimate_counts and not summary_enabled else 't.cnt'},
+               t.revenue,
+               t.expenses,
+               EXISTS(SELECT 1 FROM points),
+               EXISTS(SELECT 1 FROM employees),
+               EXISTS(SELECT 1 FROM products),
+               EXISTS(SELECT 1 FROM transactions)
+        FROM ({totals_sql}) AS t
+    """
+
+
+def build_dashboard_stats(row: Optional[Tuple], estimate_counts: bool) -> Dict[str, Any]:
+    """Показатели из строки dashboard_stats_sql; без строки — нули"""
+    stats = {
+        'points_count': 0,
+        'employees_count': 0,
+        'products_count': 0,
+        'transactions_count': 0,
+        'total_revenue': 0.0,
+        'total_expenses': 0.0,
+        'data_exists': {'points': False, 'employees': False, 'products': False, 'transactions': False},
+        'estimated': estimate_counts,
+    }
+    if row is not None:
+        (stats['points_count'], stats['employees_count'], stats['products_count'],
+         stats['transactions_count']) = (int(v or 0) for v in row[:4])
+        stats['total_revenue'] = float(row[4])
+        stats['total_expenses'] = float(row[5])
+        stats['data_exists'] = dict(zip(('points', 'employees', 'products', 'transactions'), row[6:10]))
+    return stats
+
+
+def keyset_page_sql(table_sql: str, key_sqls: List[str], after_key: Optional[Tuple],
+                    limit: int) -> Tuple[str, List[Any]]:
+    """Запрос страницы по ключу для fetch_page; имена уже экранированы"""
+    key_sql = ", ".join(key_sqls)
+    sql = f"SELECT * FROM {table_sql}"
+    params: List[Any] = []
+    if after_key is not None:
+        placeholders = ", ".join(["%s"] * len(key_sqls))
+        sql += f" WHERE ({key_sql}) > ({placeholders})"
+        params.extend(after_key)
+    # одна лишняя строка показывает, есть ли следующая страница
+    sql += f" ORDER BY {key_sql} LIMIT %s"
+    params.append(limit + 1)
+    return sql, params
+
+
+def split_keyset_page(columns: List[str], rows: List[Tuple], key_cols: List[str],
+                      limit: int) -> Tuple[List[Tuple], Optional[Tuple]]:
+    """Отрезать лишнюю строку keyset_page_sql и вернуть (строки, ключ следующей страницы или None)"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    positions = [columns.index(c) for c in key_cols]
+    return rows, tuple(rows[-1][i] for i in positions)
+
+
+_prepared_ids = itertools.count(1)
+_PLACEHOLDER_RE = re.compile(r'%(s|%)')
+
+
+def _to_positional(sql: str) -> str:
+    """%s -> $1, $2, ... для PREPARE; %% -> %"""
+    numbers = itertools.count(1)
+    return _PLACEHOLDER_RE.sub(lambda m: f"${next(numbers)}" if m.group(1) == 's' else '%', sql)
+
+
+class InstrumentedCursor(PgCursor):
+    """Курсор всех соединений менеджера: длительность и строки каждой команды попадают в query_stats.STATS"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # текст, под которым записать следующую команду (для EXECUTE подготовленного запроса)
+        self.statement_label = None
+        self._stats_key = None
+
+    def _record(self, query, params, started: float):
+        label, self.statement_label = self.statement_label, None
+        if label is None and hasattr(query, 'as_string'):
+            query = query.as_string(self.connection)
+        rows = self.rowcount if self.rowcount >= 0 else None
+        self._stats_key = STATS.record(label or query, params, (time.perf_counter() - started) * 1000, rows)
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            self._record(query, vars, started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            self._record(query, None, started)
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            self._record(sql, None, started)
+
+    # у серверного курсора (QueryWorker._stream_rows) строки приходят после execute — досчитываем их при чтении
+    def fetchone(self):
+        row = super().fetchone()
+        if self.name and row is not None:
+            STATS.add_rows(self._stats_key, 1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany() if size is None else super().fetchmany(size)
+        if self.name:
+            STATS.add_rows(self._stats_key, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        if self.name:
+            STATS.add_rows(self._stats_key, len(rows))
+        return rows
+
+
+class PreparedConnection(PgConnection):
+    """Соединение пула с реестром подготовленных запросов: текст SQL -> имя PREPARE (в порядке LRU)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = OrderedDict()
+        self.prepared_generation = 0
+
+
+class WriteTrackingConnection(PgConnection):
+    """Основное соединение DatabaseManager: кэш сбрасывается по командам execute() после commit(), а не до него"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pending_writes = []
+        self.on_commit = None
+
+    def commit(self):
+        super().commit()
+        writes, self.pending_writes = self.pending_writes, []
+        if self.on_commit is not None:
+            for sql in writes:
+                self.on_commit(sql)
+
+    def rollback(self):
+        # откаченные команды ничего не изменили — сбрасывать нечего
+        self.pending_writes = []
+        super().rollback()
+
+
+def _plan_relations(node: Dict[str, Any]) -> set:
+    """Имена таблиц, которые читают узлы плана EXPLAIN (FORMAT JSON)"""
+    names = {node['Relation Name']} if 'Relation Name' in node else set()
+    for child in node.get('Plans', ()):
+        names |= _plan_relations(child)
+    return names
+
+
+class TablePager:
+    """Чтение таблицы порциями без открытой транзакции между порциями.
+
+    Каждая порция — отдельный короткий запрос на соединении из пула: по первичному ключу
+    (keyset, fetch_page), у таблицы без ключа — по ctid (с PostgreSQL 14 это TID Range Scan),
+    и только у представлений — LIMIT/OFFSET. Снимок и блокировки не держатся,
+    пока вкладка открыта, поэтому ALTER и VACUUM не ждут закрытия окна.
+    Источник для ResultTableModel: fetch_batch(), exhausted, fetched, columns, count_total(), close().
+    """
+
+    def __init__(self, db_manager, table_name: str, batch_size: int = 500):
+        self.db_manager = db_manager
+        self.table_name = table_name
+        self.batch_size = batch_size
+        self.fetched = 0
+        self.exhausted = False
+        self.columns = []
+        self._key = db_manager.get_primary_key(table_name)
+        self._after = None
+        # у представлений нет ctid — для них остаётся LIMIT/OFFSET
+        self._by_ctid = not self._key
+        # порции читаются в разных снимках: собранную таблицу можно кэшировать,
+        # только если с первой порции в неё не писали (cache_result(since=generation))
+        self.generation = db_manager.result_generation()
+
+    def fetch_batch(self, size: Optional[int] = None) -> List[Tuple]:
+        if self.exhausted:
+            return []
+        size = size or self.batch_size
+        if self._key:
+            columns, rows, self._after = self.db_manager.fetch_page(self.table_name, self._after, size)
+            last = self._after is None
+        else:
+            columns, rows = self._fetch_ctid(size) if self._by_ctid else (None, None)
+            if rows is None:
+                columns, rows = self._fetch_offset(size)
+            last = len(rows) < size
+        if columns:
+            self.columns = columns
+        self.fetched += len(rows)
+        self.exhausted = last
+        return rows
+
+    def _fetch_ctid(self, size: int) -> Tuple[Optional[List[str]], Optional[List[Tuple]]]:
+        """Порция по физическому адресу строки; (None, None) — у отношения нет ctid"""
+        sql = (f"SELECT ctid, * FROM {self.db_manager._quote_ident(self.table_name)} "
+               f"WHERE ctid > %s::tid ORDER BY ctid LIMIT %s")
+        try:
+            with self.db_manager.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, (self._after or '(0,0)', size))
+                columns = [d[0] for d in cursor.description][1:]
+                rows = cursor.fetchall()
+                conn.rollback()
+                cursor.close()
+        except pg_errors.UndefinedColumn:
+            self._by_ctid = False
+            return None, None
+        except Exception as e:
+            logging.error(f"Ошибка чтения таблицы {self.table_name}: {str(e)}")
+            return [], []
+        if rows:
+            self._after = rows[-1][0]
+        return columns, [row[1:] for row in rows]
+
+    def _fetch_offset(self, size: int) -> Tuple[List[str], List[Tuple]]:
+        sql = f"SELECT * FROM {self.db_manager._quote_ident(self.table_name)} LIMIT %s OFFSET %s"
+        try:
+            with self.db_manager.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, (size, self.fetched))
+                columns = [d[0] for d in cursor.description]
+                rows = cursor.fetchall()
+                conn.rollback()
+                cursor.close()
+            return columns, rows
+        except Exception as e:
+            logging.error(f"Ошибка чтения таблицы {self.table_name}: {str(e)}")
+            return [], []
+
+    def count_total(self) -> Optional[int]:
+        return self.db_manager.count_table_rows(self.table_name)
+
+    def close(self):
+        self.exhausted = True
+
+
+class _ProgressReader:
+    """Файл для copy_expert, сообщающий о прочитанных байтах"""
+
+    def __init__(self, f, total: int, callback=None):
+        self.f = f
+        self.total = total
+        self.done = 0
+        self.callback = callback
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.f.read(size)
+        self.done += len(data)
+        if self.callback is not None:
+            self.callback(self.done, self.total)
+        return data
+
+    def readline(self, size: int = -1) -> bytes:
+        data = self.f.readline(size)
+        self.done += len(data)
+        return data
+
+
+class _ProgressWriter:
+    """Файл для copy_expert(... TO STDOUT), сообщающий о записанных байтах"""
+
+    def __init__(self, f, callback=None):
+        self.f = f
+        self.done = 0
+        self.callback = callback
+
+    def write(self, data) -> int:
+        written = self.f.write(data)
+        self.done += len(data)
+        if self.callback is not None:
+            self.callback(self.done)
+        return written
+
+
+def _check_csv_value(value: str, meta: Dict[str, Any]) -> Optional[str]:
+    """Проверить значение из CSV по типу колонки; None — значение подходит"""
+    data_type = meta.get('data_type') or ''
+    try:
+        if data_type in ('integer', 'bigint', 'smallint'):
+            int(value)
+        elif data_type in ('numeric', 'real', 'double precision') or data_type.startswith('numeric'):
+            Decimal(value)
+        elif data_type == 'date':
+            date.fromisoformat(value)
+        elif data_type.startswith('timestamp'):
+            datetime.fromisoformat(value)
+        elif data_type == 'boolean':
+            if value.strip().lower() not in ('t', 'f', 'true', 'false', '1', '0', 'y', 'n', 'yes', 'no', 'on', 'off'):
+                return f"'{value}' не является логическим значением"
+        elif meta.get('enum_values') and value not in meta['enum_values']:
+            return f"'{value}' не входит в {', '.join(meta['enum_values'])}"
+    except (ValueError, InvalidOperation):
+        return f"'{value}' не соответствует типу {data_type}"
+    return None
+
+
 class DatabaseManager:
     def __init__(self):
         self.connection = None
+        self.pool = None
+        # ThreadedConnectionPool держит открытыми не больше minconn свободных соединений, остальные
+        # закрывает в putconn — вместе с их подготовленными запросами. 4 покрывают обычную нагрузку
+        # окна (поток данных, фоновый запрос, счётчики) ценой четырёх соединений сразу при connect()
+        self.pool_minconn = 4
+        self.pool_maxconn = 10
+        self._pool_slots = None
+        self._pool_lock = threading.Lock()
+        # сколько соединений выдано из каждого пула: старый пул закрывается, когда вернут последнее
+        self._pool_borrowed = {}
+        self._connect_lock = threading.Lock()
+        self._local = threading.local()
+        self.schema_cache_ttl = 300.0
+        self.schema_listen_enabled = True
+        self._schema_cache = {}
+        self._schema_lock = threading.Lock()
+        self._schema_listener = None
+        # сколько PREPARE держать на одном соединении пула; 0 — не подготавливать
+        self.prepared_cache_size = 64
+        self._prepared_generation = 0
+        # кэш результатов чтения выключен по умолчанию: включается через set_result_cache_enabled
+        self.result_cache_enabled = False
+        self.result_cache = ResultCache()
+        # статистика запросов общая для процесса; порог медленного запроса — query_stats.slow_ms
+        self.query_stats = STATS
         self.connection_params = {
             'dbname': 'postgres',
             'user': 'postgres',
@@ -20,11 +539,11 @@ class DatabaseManager:
             'port': '5432'
         }
         self.structure_changed = False
-        self.setup_logging()
 
     def setup_logging(self):
+        """Журнал в app.log для запуска без main.py (окно настраивает логирование само)"""
         logging.basicConfig(
-            filename='app.log',
+            filename=app_file('app.log'),
             level=logging.INFO,
             format='%(asctime)s - %(levelname)s - %(message)s',
             encoding='utf-8'
@@ -36,299 +555,478 @@ class DatabaseManager:
     def get_connection_params(self):
         return self.connection_params.copy()
 
+    def set_pool_size(self, minconn: int, maxconn: int):
+        """Задать размеры пула; применяются при следующем connect()"""
+        self.pool_minconn = max(1, int(minconn))
+        self.pool_maxconn = max(self.pool_minconn, int(maxconn))
+
     def connect(self) -> bool:
+        with self._connect_lock:
+            return self._connect()
+
+    def _connect(self) -> bool:
+        new_pool = connection = None
         try:
-            self.connection = psycopg2.connect(**self.connection_params)
-            logging.info("Успешное подключение к БД")
-            return True
+            new_pool = pool.ThreadedConnectionPool(self.pool_minconn, self.pool_maxconn,
+                                                   connection_factory=PreparedConnection,
+                                                   cursor_factory=InstrumentedCursor,
+                                                   **self.connection_params)
+            connection = psycopg2.connect(connection_factory=WriteTrackingConnection,
+                                          cursor_factory=InstrumentedCursor, **self.connection_params)
+            connection.on_commit = self._note_committed
         except Exception as e:
             logging.error(f"Ошибка подключения к БД: {str(e)}")
+            if new_pool is not None:
+                new_pool.closeall()
             return False
+        # сначала пул, потом self.connection: is_connected() становится True, когда пул уже готов
+        self.close_pool()
+        with self._pool_lock:
+            self.pool = new_pool
+            self._pool_slots = threading.BoundedSemaphore(self.pool_maxconn)
+        old_connection, self.connection = self.connection, connection
+        if old_connection is not None and not old_connection.closed:
+            old_connection.close()
+        self.invalidate_schema_cache()
+        if self.schema_listen_enabled:
+            self.start_schema_listener()
+        logging.info("Успешное подключение к БД")
+        return True
+
+    def _ensure_pool(self) -> bool:
+        """Подключиться, если пула ещё нет; параллельные вызовы ждут одно подключение"""
+        if self.pool is not None:
+            return True
+        with self._connect_lock:
+            return self.pool is not None or self._connect()
+
+    def close_pool(self):
+        """Снять текущий пул; выданные из него соединения работают до возврата, затем пул закрывается"""
+        with self._pool_lock:
+            db_pool, self.pool, self._pool_slots = self.pool, None, None
+            idle = db_pool is not None and not self._pool_borrowed.get(db_pool)
+        if idle:
+            self._close_retired_pool(db_pool)
+
+    def _close_retired_pool(self, db_pool):
+        try:
+            db_pool.closeall()
+        except Exception as e:
+            logging.error(f"Ошибка закрытия пула соединений: {str(e)}")
 
     def disconnect(self):
+        self.stop_schema_listener()
+        self.close_pool()
         if self.connection:
             self.connection.close()
             self.connection = None
             logging.info("Отключение от БД")
 
-    def is_connected(self) -> bool:
-        if self.connection:
+    def _is_healthy(self, conn) -> bool:
+        return not conn.closed and conn.info.transaction_status != TRANSACTION_STATUS_UNKNOWN
+
+    @contextmanager
+    def borrow_connection(self, timeout: float = 30.0):
+        """Взять соединение из пула на время блока with и вернуть его обратно"""
+        if not self._ensure_pool():
+            raise psycopg2.OperationalError("Нет подключения к БД")
+        with self._pool_lock:
+            db_pool, slots = self.pool, self._pool_slots
+            if db_pool is not None:
+                self._pool_borrowed[db_pool] = self._pool_borrowed.get(db_pool, 0) + 1
+        if db_pool is None:
+            raise psycopg2.OperationalError("Нет подключения к БД")
+        conn = None
+        acquired = False
+        try:
+            # ThreadedConnectionPool при исчерпании сразу бросает PoolError, поэтому ждём свободный слот
+            if not slots.acquire(timeout=timeout):
+                raise pool.PoolError("Пул соединений исчерпан")
+            acquired = True
+            conn = db_pool.getconn()
+            if not self._is_healthy(conn):
+                db_pool.putconn(conn, close=True)
+                conn = db_pool.getconn()
             try:
-                cursor = self.connection.cursor()
-                cursor.execute("SELECT 1")
-                cursor.close()
-                return True
+                yield conn
             except Exception as e:
-                logging.error(f"Ошибка проверки подключения: {str(e)}")
-                self.connection = None
-                return False
-        return False
-
-    def recreate_tables(self) -> bool:
+                if conn.closed:
+                    if isinstance(e, psycopg2.OperationalError):
+                        self._local.connection_lost = True
+                else:
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        pass
+                raise
+        finally:
+            if conn is not None:
+                try:
+                    # незакрытая транзакция откатывается самим пулом в putconn
+                    db_pool.putconn(conn, close=bool(conn.closed))
+                except Exception as e:
+                    logging.debug(f"Не удалось вернуть соединение в пул: {str(e)}")
+            if acquired:
+                slots.release()
+            self._release_pool(db_pool)
+
+    def _release_pool(self, db_pool):
+        with self._pool_lock:
+            left = self._pool_borrowed.get(db_pool, 1) - 1
+            if left:
+                self._pool_borrowed[db_pool] = left
+            else:
+                self._pool_borrowed.pop(db_pool, None)
+            retired = not left and db_pool is not self.pool
+        # пул сняли при переподключении, пока соединение было выдано, — закрываем после возврата последнего
+        if retired:
+            self._close_retired_pool(db_pool)
+
+    def _execute_prepared(self, conn, cursor, sql: str, params: Tuple = ()):
+        """Выполнить частый параметризованный запрос через PREPARE/EXECUTE.
+
+        Разбор и план запроса сервер делает один раз на соединение; новое соединение
+        (после обрыва или переподключения) приходит с пустым реестром и готовит запрос заново.
+        """
+        if not isinstance(conn, PreparedConnection) or not self.prepared_cache_size:
+            cursor.execute(sql, params)
+            return
+        fresh_transaction = conn.info.transaction_status == TRANSACTION_STATUS_IDLE
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
+            self._run_prepared(conn, cursor, sql, params)
+        except (pg_errors.InvalidSqlStatementName, pg_errors.FeatureNotSupported) as e:
+            # сервер забыл имя (DISCARD ALL) или план устарел после чужого DDL
+            if not fresh_transaction:
+                raise
+            logging.warning(f"Подготовленный запрос устарел, подготовка заново: {str(e)}")
+            conn.rollback()
+            cursor.execute("DEALLOCATE ALL")
+            conn.prepared.clear()
+            self._run_prepared(conn, cursor, sql, params)
+
+    def _run_prepared(self, conn, cursor, sql: str, params: Tuple):
+        registry = conn.prepared
+        if conn.prepared_generation != self._prepared_generation:
+            # после нашего DDL старые планы могут вернуть другой набор колонок
+            if registry:
+                cursor.execute("DEALLOCATE ALL")
+                registry.clear()
+            conn.prepared_generation = self._prepared_generation
+        name = registry.get(sql)
+        if name is None:
+            name = f"krk_ps_{next(_prepared_ids)}"
+            cursor.execute(f"PREPARE {name} AS {_to_positional(sql)}")
+            registry[sql] = name
+            while len(registry) > self.prepared_cache_size:
+                _, evicted = registry.popitem(last=False)
+                cursor.execute(f"DEALLOCATE {evicted}")
+        else:
+            registry.move_to_end(sql)
+        if isinstance(cursor, InstrumentedCursor):
+            cursor.statement_label = sql
+        if params:
+            cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cursor.execute(f"EXECUTE {name}")
 
-            cursor = self.connection.cursor()
+    def is_connected(self) -> bool:
+        """Проверка без обращения к серверу: обрыв обнаруживается первым реальным запросом"""
+        return self.connection is not None and self._is_healthy(self.connection)
 
+    def recreate_tables(self) -> bool:
+        try:
             tables = self.list_tables()
-
-            for table in tables:
-                cursor.execute(f"DROP TABLE IF EXISTS {table} CASCADE")
-
-            cursor.execute("DROP TYPE IF EXISTS transaction_type CASCADE")
-            cursor.execute("CREATE TYPE transaction_type AS ENUM ('Доход', 'Расход')")
-
-            scripts = [
-                """
-                CREATE TABLE points (
-                    point_id SERIAL PRIMARY KEY,
-                    address VARCHAR(200) NOT NULL CHECK (length(address) >= 5 AND address ~ '^[А-Яа-я0-9\\s\\.,-]+$'),
-                    phone_number CHAR(11) CHECK (
-                        phone_number IS NULL OR 
-                        (
-                            length(phone_number) = 11 AND
-                            phone_number ~ '^8\\d{10}$'
-                        )
-                    ),
-                    manager_id INTEGER NULL
-                )
-                """,
-                """
-                CREATE TABLE employees (
-                    employee_id SERIAL PRIMARY KEY,
-                    full_name VARCHAR(150) NOT NULL CHECK (
-                        length(full_name) >= 5 AND 
-                        full_name ~ '^[A-Za-zА-Яа-я\\s\\-]+$' AND
-                        full_name ~ '\\s'  -- должен содержать пробел (имя и фамилия)
-                    ),
-                    position VARCHAR(100) NOT NULL CHECK (length(position) >= 2),
-                    salary DECIMAL(10, 2) NOT NULL CHECK (salary >= 0),
-                    schedule VARCHAR(50) NOT NULL CHECK (length(schedule) >= 2),
-                    point_id INTEGER NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (point_id) REFERENCES points(point_id) ON DELETE CASCADE
-                )
-                """,
-                """
-                ALTER TABLE points
-                ADD CONSTRAINT fk_points_manager
-                FOREIGN KEY (manager_id) REFERENCES employees(employee_id)
-                """,
-                """
-                CREATE TABLE products (
-                    product_id SERIAL PRIMARY KEY,
-                    name VARCHAR(100) NOT NULL CHECK (length(name) >= 2),
-                    category VARCHAR(50) NOT NULL CHECK (length(category) >= 2),
-                    cost_price DECIMAL(10, 2) NOT NULL CHECK (cost_price >= 0),
-                    selling_price DECIMAL(10, 2) NOT NULL CHECK (selling_price >= 0 AND selling_price >= cost_price),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-                """,
-                """
-                CREATE TABLE transactions (
-                    transaction_id SERIAL PRIMARY KEY,
-                    point_id INTEGER NOT NULL,
-                    type transaction_type NOT NULL,
-                    amount DECIMAL(12, 2) NOT NULL CHECK (amount >= 0),
-                    date DATE NOT NULL CHECK (date >= '2000-01-01' AND date <= CURRENT_DATE + INTERVAL '1 year'),
-                    description TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (point_id) REFERENCES points(point_id) ON DELETE CASCADE
-                )
-                """
-            ]
-
-            for script in scripts:
-                cursor.execute(script)
-
-            self.connection.commit()
-            cursor.close()
-            logging.info("Таблицы успешно пересозданы")
+            # сводки нет в list_tables(), но её тоже нужно пересоздать
+            had_summary = self._relation_exists(SUMMARY_TABLE)
+            if had_summary:
+                tables.append(SUMMARY_TABLE)
+
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+
+                for table in tables:
+                    cursor.execute(f"DROP TABLE IF EXISTS {table} CASCADE")
+
+                cursor.execute("DROP TYPE IF EXISTS transaction_type CASCADE")
+                cursor.execute("CREATE TYPE transaction_type AS ENUM ('Доход', 'Расход')")
+
+                scripts = [
+                    """
+                    CREATE TABLE points (
+                        point_id SERIAL PRIMARY KEY,
+                        address VARCHAR(200) NOT NULL CHECK (length(address) >= 5 AND address ~ '^[А-Яа-я0-9\\s\\.,-]+$'),
+                        phone_number CHAR(11) CHECK (
+                            phone_number IS NULL OR 
+                            (
+                                length(phone_number) = 11 AND
+                                phone_number ~ '^8\\d{10}$'
+                            )
+                        ),
+                        manager_id INTEGER NULL
+                    )
+                    """,
+                    """
+                    CREATE TABLE employees (
+                        employee_id SERIAL PRIMARY KEY,
+                        full_name VARCHAR(150) NOT NULL CHECK (
+                            length(full_name) >= 5 AND 
+                            full_name ~ '^[A-Za-zА-Яа-я\\s\\-]+$' AND
+                            full_name ~ '\\s'  -- должен содержать пробел (имя и фамилия)
+                        ),
+                        position VARCHAR(100) NOT NULL CHECK (length(position) >= 2),
+                        salary DECIMAL(10, 2) NOT NULL CHECK (salary >= 0),
+                        schedule VARCHAR(50) NOT NULL CHECK (length(schedule) >= 2),
+                        point_id INTEGER NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        FOREIGN KEY (point_id) REFERENCES points(point_id) ON DELETE CASCADE
+                    )
+                    """,
+                    """
+                    ALTER TABLE points
+                    ADD CONSTRAINT fk_points_manager
+                    FOREIGN KEY (manager_id) REFERENCES employees(employee_id)
+                    """,
+                    """
+                    CREATE TABLE products (
+                        product_id SERIAL PRIMARY KEY,
+                        name VARCHAR(100) NOT NULL CHECK (length(name) >= 2),
+                        category VARCHAR(50) NOT NULL CHECK (length(category) >= 2),
+                        cost_price DECIMAL(10, 2) NOT NULL CHECK (cost_price >= 0),
+                        selling_price DECIMAL(10, 2) NOT NULL CHECK (selling_price >= 0 AND selling_price >= cost_price),
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                    """,
+                    """
+                    CREATE TABLE transactions (
+                        transaction_id SERIAL PRIMARY KEY,
+                        point_id INTEGER NOT NULL,
+                        type transaction_type NOT NULL,
+                        amount DECIMAL(12, 2) NOT NULL CHECK (amount >= 0),
+                        date DATE NOT NULL CHECK (date >= '2000-01-01' AND date <= CURRENT_DATE + INTERVAL '1 year'),
+                        description TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        FOREIGN KEY (point_id) REFERENCES points(point_id) ON DELETE CASCADE
+                    )
+                    """
+                ]
+
+                for script in scripts:
+                    cursor.execute(script)
+
+                conn.commit()
+                cursor.close()
+                logging.info("Таблицы успешно пересозданы")
+            self.mark_structure_changed()
+            self.install_schema_change_trigger()
+            if had_summary:
+                self.enable_transaction_summary()
             return True
 
         except Exception as e:
             logging.error(f"Ошибка пересоздания таблиц: {str(e)}")
-            if self.connection:
-                self.connection.rollback()
             return False
 
     def insert_sample_data(self) -> bool:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
-
-            cursor = self.connection.cursor()
-
-            sample_data = [
-
-                "INSERT INTO points (address, phone_number) VALUES ('ул. Главная, 1', '84951112233')",
-                "INSERT INTO points (address, phone_number) VALUES ('пр. Мира, 45', '84952223344')",
-                "INSERT INTO points (address, phone_number) VALUES ('ул. Рабочая, 12', '84953334455')",
-
-                # Сотрудники
-                "INSERT INTO employees (full_name, position, salary, schedule, point_id) VALUES ('Иванов Иван Иванович', 'администратор', 50000.00, '5/2', 1)",
-                "INSERT INTO employees (full_name, position, salary, schedule, point_id) VALUES ('Петрова Мария Сергеевна', 'кассир', 35000.00, '2/2', 1)",
-                "INSERT INTO employees (full_name, position, salary, schedule, point_id) VALUES ('Сидоров Алексей Петрович', 'повар', 45000.00, '2/2', 1)",
-                "INSERT INTO employees (full_name, position, salary, schedule, point_id) VALUES ('Кузнецова Елена Викторовна', 'кассир', 32000.00, '5/2', 2)",
-                "INSERT INTO employees (full_name, position, salary, schedule, point_id) VALUES ('Васильев Дмитрий Олегович', 'повар', 42000.00, '2/2', 2)",
-                "INSERT INTO employees (full_name, position, salary, schedule, point_id) VALUES ('Николаева Ольга Игоревна', 'администратор', 48000.00, '5/2', 3)",
-                "INSERT INTO employees (full_name, position, salary, schedule, point_id) VALUES ('Смирнов Артем Александрович', 'повар', 43000.00, '2/2', 3)",
-                "INSERT INTO employees (full_name, position, salary, schedule, point_id) VALUES ('Федорова Анна Дмитриевна', 'кассир', 33000.00, '5/2', 3)",
-
-                # Назначение менеджеров
-                "UPDATE points SET manager_id = 1 WHERE point_id = 1",
-                "UPDATE points SET manager_id = 6 WHERE point_id = 3",
-
-                # Продукты
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Крошка Картошка с растительным маслом', 'основной картофель', 35.00, 189.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Крошка Картошка с сыром', 'основной картофель', 45.00, 219.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Крошка Картошка со сливочным маслом', 'основной картофель', 38.00, 199.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Крошка Картошка с укропом и растительным маслом', 'основной картофель', 40.00, 209.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Печёный МЭШ Классический', 'основной картофель', 30.00, 159.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Печёный Мэш Классический (большой)', 'основной картофель', 50.00, 229.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Наполнитель \"Брынзовый с укропом\"', 'наполнители', 25.00, 89.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Наполнитель \"Крабовое мясо с майонезом\"', 'наполнители', 28.00, 99.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Наполнитель \"Сосиски в горчичном соусе\"', 'наполнители', 30.00, 109.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Наполнитель \"Сырный с ветчиной\"', 'наполнители', 32.00, 119.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Наполнитель \"Закусочный с грибами\"', 'наполнители', 29.00, 104.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Наполнитель \"Мясное ассорти\"', 'наполнители', 35.00, 129.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Наполнитель \"Красная рыбка\"', 'наполнители', 40.00, 149.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Наполнитель \"Цыпленок с жареными грибами\"', 'наполнители', 33.00, 124.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Борщ', 'супы', 45.00, 159.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Куриная лапша', 'супы', 40.00, 149.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Гороховый суп', 'супы', 42.00, 154.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Сливочная уха по-фински', 'супы', 50.00, 179.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Пирожное Картошка', 'десерты', 20.00, 89.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Пирожное картошка \"Орех в карамели\"', 'десерты', 25.00, 109.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Пирожное картошка Кокос', 'десерты', 23.00, 99.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Пирожное \"Чиакейк маракуйя-облепиха\"', 'десерты', 35.00, 149.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Морс Ягодный 0.5л', 'напитки', 15.00, 129.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Напиток «Добрый Pulpy» 0.45л', 'напитки', 18.00, 139.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Сок Добрый 0.3л', 'напитки', 12.00, 99.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Квас 0.4л', 'напитки', 10.00, 89.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Чай черный', 'напитки', 5.00, 79.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Чай зеленый', 'напитки', 5.00, 79.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Кофе американо', 'напитки', 8.00, 119.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Сметана', 'добавки', 8.00, 49.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Кетчуп', 'соусы', 6.00, 39.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Майонез', 'соусы', 6.00, 39.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Горчица', 'соусы', 5.00, 29.00)",
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES ('Сырный соус', 'соусы', 10.00, 59.00)",
-
-                # Точка 1
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (1, 'Доход', 42350.00, '2024-01-15', 'Выручка за понедельник')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (1, 'Доход', 48700.00, '2024-01-16', 'Выручка за вторник')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (1, 'Доход', 53200.00, '2024-01-17', 'Выручка за среду')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (1, 'Доход', 59800.00, '2024-01-18', 'Выручка за четверг')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (1, 'Доход', 72300.00, '2024-01-19', 'Выручка за пятницу')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (1, 'Доход', 84500.00, '2024-01-20', 'Выручка за субботу')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (1, 'Доход', 71200.00, '2024-01-21', 'Выручка за воскресенье')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (1, 'Расход', 45000.00, '2024-01-15', 'Зарплата сотрудникам')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (1, 'Расход', 28500.00, '2024-01-15', 'Закупка продуктов')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (1, 'Расход', 15000.00, '2024-01-15', 'Аренда и коммунальные услуги')",
-
-                # Точка 2
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (2, 'Доход', 31200.00, '2024-01-15', 'Выручка за понедельник')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (2, 'Доход', 35600.00, '2024-01-16', 'Выручка за вторник')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (2, 'Доход', 39800.00, '2024-01-17', 'Выручка за среду')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (2, 'Доход', 44500.00, '2024-01-18', 'Выручка за четверг')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (2, 'Доход', 52300.00, '2024-01-19', 'Выручка за пятницу')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (2, 'Доход', 61200.00, '2024-01-20', 'Выручка за субботу')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (2, 'Доход', 48700.00, '2024-01-21', 'Выручка за воскресенье')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (2, 'Расход', 32000.00, '2024-01-15', 'Зарплата сотрудникам')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (2, 'Расход', 19800.00, '2024-01-15', 'Закупка продуктов')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (2, 'Расход', 12000.00, '2024-01-15', 'Аренда и коммунальные услуги')",
-
-                # Точка 3
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (3, 'Доход', 25800.00, '2024-01-15', 'Выручка за понедельник')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (3, 'Доход', 29400.00, '2024-01-16', 'Выручка за вторник')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (3, 'Доход', 33200.00, '2024-01-17', 'Выручка за среду')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (3, 'Доход', 37800.00, '2024-01-18', 'Выручка за четверг')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (3, 'Доход', 44500.00, '2024-01-19', 'Выручка за пятницу')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (3, 'Доход', 52300.00, '2024-01-20', 'Выручка за субботу')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (3, 'Доход', 41200.00, '2024-01-21', 'Выручка за воскресенье')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (3, 'Расход', 38000.00, '2024-01-15', 'Зарплата сотрудникам')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (3, 'Расход', 22400.00, '2024-01-15', 'Закупка продуктов')",
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (3, 'Расход', 18000.00, '2024-01-15', 'Аренда и коммунальные услуги')"
-            ]
-
-            for query in sample_data:
-                cursor.execute(query)
-
-            # Назначаем менеджеров для точек
-            cursor.execute("UPDATE points SET manager_id = 1 WHERE point_id = 1")
-            cursor.execute("UPDATE points SET manager_id = 6 WHERE point_id = 3")
-
-            self.connection.commit()
-            cursor.close()
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+
+                sample_points = [
+                    ('ул. Главная, 1', '84951112233'),
+                    ('пр. Мира, 45', '84952223344'),
+                    ('ул. Рабочая, 12', '84953334455'),
+                ]
+
+                sample_employees = [
+                    ('Иванов Иван Иванович', 'администратор', 50000.00, '5/2', 1),
+                    ('Петрова Мария Сергеевна', 'кассир', 35000.00, '2/2', 1),
+                    ('Сидоров Алексей Петрович', 'повар', 45000.00, '2/2', 1),
+                    ('Кузнецова Елена Викторовна', 'кассир', 32000.00, '5/2', 2),
+                    ('Васильев Дмитрий Олегович', 'повар', 42000.00, '2/2', 2),
+                    ('Николаева Ольга Игоревна', 'администратор', 48000.00, '5/2', 3),
+                    ('Смирнов Артем Александрович', 'повар', 43000.00, '2/2', 3),
+                    ('Федорова Анна Дмитриевна', 'кассир', 33000.00, '5/2', 3),
+                ]
+
+                sample_products = [
+                    ('Крошка Картошка с растительным маслом', 'основной картофель', 35.00, 189.00),
+                    ('Крошка Картошка с сыром', 'основной картофель', 45.00, 219.00),
+                    ('Крошка Картошка со сливочным маслом', 'основной картофель', 38.00, 199.00),
+                    ('Крошка Картошка с укропом и растительным маслом', 'основной картофель', 40.00, 209.00),
+                    ('Печёный МЭШ Классический', 'основной картофель', 30.00, 159.00),
+                    ('Печёный Мэш Классический (большой)', 'основной картофель', 50.00, 229.00),
+                    ('Наполнитель "Брынзовый с укропом"', 'наполнители', 25.00, 89.00),
+                    ('Наполнитель "Крабовое мясо с майонезом"', 'наполнители', 28.00, 99.00),
+                    ('Наполнитель "Сосиски в горчичном соусе"', 'наполнители', 30.00, 109.00),
+                    ('Наполнитель "Сырный с ветчиной"', 'наполнители', 32.00, 119.00),
+                    ('Наполнитель "Закусочный с грибами"', 'наполнители', 29.00, 104.00),
+                    ('Наполнитель "Мясное ассорти"', 'наполнители', 35.00, 129.00),
+                    ('Наполнитель "Красная рыбка"', 'наполнители', 40.00, 149.00),
+                    ('Наполнитель "Цыпленок с жареными грибами"', 'наполнители', 33.00, 124.00),
+                    ('Борщ', 'супы', 45.00, 159.00),
+                    ('Куриная лапша', 'супы', 40.00, 149.00),
+                    ('Гороховый суп', 'супы', 42.00, 154.00),
+                    ('Сливочная уха по-фински', 'супы', 50.00, 179.00),
+                    ('Пирожное Картошка', 'десерты', 20.00, 89.00),
+                    ('Пирожное картошка "Орех в карамели"', 'десерты', 25.00, 109.00),
+                    ('Пирожное картошка Кокос', 'десерты', 23.00, 99.00),
+                    ('Пирожное "Чиакейк маракуйя-облепиха"', 'десерты', 35.00, 149.00),
+                    ('Морс Ягодный 0.5л', 'напитки', 15.00, 129.00),
+                    ('Напиток «Добрый Pulpy» 0.45л', 'напитки', 18.00, 139.00),
+                    ('Сок Добрый 0.3л', 'напитки', 12.00, 99.00),
+                    ('Квас 0.4л', 'напитки', 10.00, 89.00),
+                    ('Чай черный', 'напитки', 5.00, 79.00),
+                    ('Чай зеленый', 'напитки', 5.00, 79.00),
+                    ('Кофе американо', 'напитки', 8.00, 119.00),
+                    ('Сметана', 'добавки', 8.00, 49.00),
+                    ('Кетчуп', 'соусы', 6.00, 39.00),
+                    ('Майонез', 'соусы', 6.00, 39.00),
+                    ('Горчица', 'соусы', 5.00, 29.00),
+                    ('Сырный соус', 'соусы', 10.00, 59.00),
+                ]
+
+                sample_transactions = [
+                    (1, 'Доход', 42350.00, '2024-01-15', 'Выручка за понедельник'),
+                    (1, 'Доход', 48700.00, '2024-01-16', 'Выручка за вторник'),
+                    (1, 'Доход', 53200.00, '2024-01-17', 'Выручка за среду'),
+                    (1, 'Доход', 59800.00, '2024-01-18', 'Выручка за четверг'),
+                    (1, 'Доход', 72300.00, '2024-01-19', 'Выручка за пятницу'),
+                    (1, 'Доход', 84500.00, '2024-01-20', 'Выручка за субботу'),
+                    (1, 'Доход', 71200.00, '2024-01-21', 'Выручка за воскресенье'),
+                    (1, 'Расход', 45000.00, '2024-01-15', 'Зарплата сотрудникам'),
+                    (1, 'Расход', 28500.00, '2024-01-15', 'Закупка продуктов'),
+                    (1, 'Расход', 15000.00, '2024-01-15', 'Аренда и коммунальные услуги'),
+                    (2, 'Доход', 31200.00, '2024-01-15', 'Выручка за понедельник'),
+                    (2, 'Доход', 35600.00, '2024-01-16', 'Выручка за вторник'),
+                    (2, 'Доход', 39800.00, '2024-01-17', 'Выручка за среду'),
+                    (2, 'Доход', 44500.00, '2024-01-18', 'Выручка за четверг'),
+                    (2, 'Доход', 52300.00, '2024-01-19', 'Выручка за пятницу'),
+                    (2, 'Доход', 61200.00, '2024-01-20', 'Выручка за субботу'),
+                    (2, 'Доход', 48700.00, '2024-01-21', 'Выручка за воскресенье'),
+                    (2, 'Расход', 32000.00, '2024-01-15', 'Зарплата сотрудникам'),
+                    (2, 'Расход', 19800.00, '2024-01-15', 'Закупка продуктов'),
+                    (2, 'Расход', 12000.00, '2024-01-15', 'Аренда и коммунальные услуги'),
+                    (3, 'Доход', 25800.00, '2024-01-15', 'Выручка за понедельник'),
+                    (3, 'Доход', 29400.00, '2024-01-16', 'Выручка за вторник'),
+                    (3, 'Доход', 33200.00, '2024-01-17', 'Выручка за среду'),
+                    (3, 'Доход', 37800.00, '2024-01-18', 'Выручка за четверг'),
+                    (3, 'Доход', 44500.00, '2024-01-19', 'Выручка за пятницу'),
+                    (3, 'Доход', 52300.00, '2024-01-20', 'Выручка за субботу'),
+                    (3, 'Доход', 41200.00, '2024-01-21', 'Выручка за воскресенье'),
+                    (3, 'Расход', 38000.00, '2024-01-15', 'Зарплата сотрудникам'),
+                    (3, 'Расход', 22400.00, '2024-01-15', 'Закупка продуктов'),
+                    (3, 'Расход', 18000.00, '2024-01-15', 'Аренда и коммунальные услуги'),
+                ]
+
+                # каждая таблица — один многострочный INSERT
+                execute_values(cursor, "INSERT INTO points (address, phone_number) VALUES %s", sample_points)
+                execute_values(cursor, "INSERT INTO employees (full_name, position, salary, schedule, point_id) VALUES %s",
+                               sample_employees)
+
+                # Назначаем менеджеров для точек
+                cursor.execute("UPDATE points SET manager_id = 1 WHERE point_id = 1")
+                cursor.execute("UPDATE points SET manager_id = 6 WHERE point_id = 3")
+
+                execute_values(cursor, "INSERT INTO products (name, category, cost_price, selling_price) VALUES %s",
+                               sample_products)
+                execute_values(cursor, "INSERT INTO transactions (point_id, type, amount, date, description) VALUES %s",
+                               sample_transactions)
+
+                conn.commit()
+                cursor.close()
+            self.invalidate_result_cache()
             logging.info("Тестовые данные добавлены")
             return True
 
         except Exception as e:
             logging.error(f"Ошибка добавления тестовых данных: {str(e)}")
-            if self.connection:
-                self.connection.rollback()
             return False
 
+    @retry_on_connection_loss
     def get_points(self) -> List[Tuple]:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return []
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT * FROM points ORDER BY point_id")
-            result = cursor.fetchall()
-            cursor.close()
-            return result
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM points ORDER BY point_id")
+                result = cursor.fetchall()
+                cursor.close()
+                return result
         except Exception as e:
             logging.error(f"Ошибка получения точек: {str(e)}")
             return []
 
+    @retry_on_connection_loss
     def get_employees(self) -> List[Tuple]:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return []
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT * FROM employees ORDER BY employee_id")
-            result = cursor.fetchall()
-            cursor.close()
-            return result
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM employees ORDER BY employee_id")
+                result = cursor.fetchall()
+                cursor.close()
+                return result
         except Exception as e:
             logging.error(f"Ошибка получения сотрудников: {str(e)}")
             return []
 
+    @retry_on_connection_loss
     def get_products(self) -> List[Tuple]:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return []
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT * FROM products ORDER BY product_id")
-            result = cursor.fetchall()
-            cursor.close()
-            return result
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM products ORDER BY product_id")
+                result = cursor.fetchall()
+                cursor.close()
+                return result
         except Exception as e:
             logging.error(f"Ошибка получения продуктов: {str(e)}")
             return []
 
+    @retry_on_connection_loss
     def get_finances(self) -> List[Tuple]:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return []
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT * FROM transactions ORDER BY transaction_id")
-            result = cursor.fetchall()
-            cursor.close()
-            return result
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM transactions ORDER BY transaction_id")
+                result = cursor.fetchall()
+                cursor.close()
+                return result
         except Exception as e:
             logging.error(f"Ошибка получения финансов: {str(e)}")
             return []
 
+    def get_primary_key(self, table_name: str) -> List[str]:
+        meta = self.get_table_metadata(table_name)
+        return [col for col, m in meta.items() if m.get('is_primary')]
+
+    @retry_on_connection_loss
+    def fetch_page(self, table_name: str, after_key: Optional[Tuple] = None, limit: int = 100,
+                   order_by: Optional[List[str]] = None) -> Tuple[List[str], List[Tuple], Optional[Tuple]]:
+        """Страница строк по ключу (keyset): WHERE (ключ) > after_key ORDER BY ключ LIMIT limit.
+
+        order_by должен быть уникальным и NOT NULL, по умолчанию — первичный ключ.
+        Возвращает (колонки, строки, ключ для следующей страницы или None, если страница последняя).
+        """
+        try:
+            key_cols = list(order_by) if order_by else self.get_primary_key(table_name)
+            if not key_cols:
+                logging.error(f"Постраничный просмотр {table_name}: нет первичного ключа и не задан order_by")
+                return [], [], None
+
+            sql, params = keyset_page_sql(self._quote_ident(table_name),
+                                          [self._quote_ident(c) for c in key_cols], after_key, limit)
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, tuple(params))
+                rows = cursor.fetchall()
+                columns = [d[0] for d in cursor.description]
+                cursor.close()
+
+            rows, next_key = split_keyset_page(columns, rows, key_cols, limit)
+            return columns, rows, next_key
+        except Exception as e:
+            logging.error(f"Ошибка получения страницы таблицы {table_name}: {str(e)}")
+            return [], [], None
+
     def is_valid_phone(self, phone_number):
         pattern = r'^(\+7|7|8)?[\s\-]?\(?[489][0-9]{2}\)?[\s\-]?[0-9]{3}[\s\-]?[0-9]{2}[\s\-]?[0-9]{2}$'
         return bool(re.match(pattern, phone_number))
@@ -348,244 +1046,783 @@ class DatabaseManager:
             if not self.is_valid_phone(phone_number) or not self.is_valid_ru_letters(address):
                 logging.error("Неверный формат")
                 return False
-            if not self.is_connected():
-                if not self.connect():
-                    return False
-            
-            cursor = self.connection.cursor()
-            cursor.execute(
-                "INSERT INTO points (address, phone_number) VALUES (%s, %s)",
-                (address, phone_number)
-            )
-            self.connection.commit()
-            cursor.close()
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO points (address, phone_number) VALUES (%s, %s)",
+                    (address, phone_number)
+                )
+                conn.commit()
+                cursor.close()
+            self.invalidate_result_cache(['points'])
             logging.info(f"Добавлена точка: {address}")
             return True
         except Exception as e:
             logging.error(f"Ошибка добавления точки: {str(e)}")
-            if self.connection:
-                self.connection.rollback()
             return False
 
     def insert_employee(self, full_name: str, position: str, salary: float, schedule: str, point_id: int) -> bool:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
             if not self.is_valid_ru_letters(full_name) or not self.is_valid_schedule(schedule) or not self.is_valid_ru_letters(position):
                 logging.error('Ошибка добавления сотрудника')
                 return False
-            cursor = self.connection.cursor()
-            cursor.execute(
-                "INSERT INTO employees (full_name, position, salary, schedule, point_id) VALUES (%s, %s, %s, %s, %s)",
-                (full_name, position, salary, schedule, point_id)
-            )
-            self.connection.commit()
-            cursor.close()
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO employees (full_name, position, salary, schedule, point_id) VALUES (%s, %s, %s, %s, %s)",
+                    (full_name, position, salary, schedule, point_id)
+                )
+                conn.commit()
+                cursor.close()
+            self.invalidate_result_cache(['employees'])
             logging.info(f"Добавлен сотрудник: {full_name}")
             return True
         except Exception as e:
             logging.error(f"Ошибка добавления сотрудника: {str(e)}")
-            if self.connection:
-                self.connection.rollback()
             return False
 
     def insert_product(self, name: str, category: str, cost_price: float, selling_price: float) -> bool:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
             if not self.is_valid_ru_letters(name) or not self.is_valid_ru_letters(category):
                 logging.error("Ошибка добавления продукта")
                 return False
-            cursor = self.connection.cursor()
-            cursor.execute(
-                "INSERT INTO products (name, category, cost_price, selling_price) VALUES (%s, %s, %s, %s)",
-                (name, category, cost_price, selling_price)
-            )
-            self.connection.commit()
-            cursor.close()
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO products (name, category, cost_price, selling_price) VALUES (%s, %s, %s, %s)",
+                    (name, category, cost_price, selling_price)
+                )
+                conn.commit()
+                cursor.close()
+            self.invalidate_result_cache(['products'])
             logging.info(f"Добавлен продукт: {name}")
             return True
         except Exception as e:
             logging.error(f"Ошибка добавления продукта: {str(e)}")
-            if self.connection:
-                self.connection.rollback()
             return False
 
     def insert_transaction(self, point_id: int, type: str, amount: float, date: str, description: str = None) -> bool:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
             if not self.is_valid_ru_letters(description):
                 logging.error(f'Неверный формат:{description}')
                 return False
-            cursor = self.connection.cursor()
-            cursor.execute(
-                "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (%s, %s, %s, %s, %s)",
-                (point_id, type, amount, date, description)
-            )
-            self.connection.commit()
-            cursor.close()
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO transactions (point_id, type, amount, date, description) VALUES (%s, %s, %s, %s, %s)",
+                    (point_id, type, amount, date, description)
+                )
+                conn.commit()
+                cursor.close()
+            self.invalidate_result_cache(['transactions'])
             logging.info(f"Добавлена операция: {type} на сумму {amount}")
             return True
         except Exception as e:
             logging.error(f"Ошибка добавления операции: {str(e)}")
-            if self.connection:
-                self.connection.rollback()
             return False
 
+    # --- Пакетная вставка: страница строк — один запрос, все страницы — одна транзакция ---
+    def bulk_insert(self, table_name: str, columns: List[str], rows: List[Tuple],
+                    page_size: int = 1000, skip_errors: bool = True) -> Dict[str, Any]:
+        """INSERT ... VALUES (...), (...) через execute_values.
+
+        Возвращает {'affected': n, 'errors': [(индекс строки, текст ошибки), ...]}, n — вставленные строки.
+        skip_errors=False — первая же отклонённая страница откатывает всю вставку без построчного
+        повтора; в errors тогда одна запись с индексом первой строки этой страницы.
+        """
+        cols_sql = ", ".join(self._quote_ident(c) for c in columns)
+        head = f"INSERT INTO {self._quote_ident(table_name)} ({cols_sql}) VALUES "
+        row_sql = head + "(" + ", ".join(["%s"] * len(columns)) + ")"
+
+        def run_page(cursor, page):
+            execute_values(cursor, head + "%s", page, page_size=len(page))
+
+        return self._bulk_apply(table_name, rows, page_size, skip_errors, run_page, row_sql)
+
+    def bulk_execute(self, sql: str, rows: List[Tuple], page_size: int = 100,
+                     skip_errors: bool = True) -> Dict[str, Any]:
+        """Один и тот же оператор (UPDATE/DELETE/INSERT с %s) для множества строк через execute_batch.
+
+        Результат как у bulk_insert; affected — число наборов параметров, выполненных без ошибки.
+        """
+
+        def run_page(cursor, page):
+            execute_batch(cursor, sql, page, page_size=len(page))
+
+        return self._bulk_apply(None, rows, page_size, skip_errors, run_page, sql)
+
+    def _bulk_apply(self, table_name: Optional[str], rows: List[Tuple], page_size: int,
+                    skip_errors: bool, run_page, row_sql: str) -> Dict[str, Any]:
+        result = {'affected': 0, 'errors': []}
+        rows = list(rows)
+        if not rows:
+            return result
+        try:
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                for start in range(0, len(rows), page_size):
+                    page = rows[start:start + page_size]
+                    cursor.execute("SAVEPOINT krk_bulk_page")
+                    try:
+                        run_page(cursor, page)
+                        cursor.execute("RELEASE SAVEPOINT krk_bulk_page")
+                        result['affected'] += len(page)
+                        continue
+                    except psycopg2.Error as e:
+                        if not skip_errors:
+                            # всё равно откатываем всё — искать виновную строку построчно незачем
+                            conn.rollback()
+                            cursor.close()
+                            result['affected'] = 0
+                            result['errors'].append((start, str(e).strip()))
+                            return result
+                        cursor.execute("ROLLBACK TO SAVEPOINT krk_bulk_page")
+
+                    # страница отклонена — повторяем её построчно, чтобы найти виновные строки
+                    for offset, row in enumerate(page):
+                        cursor.execute("SAVEPOINT krk_bulk_row")
+                        try:
+                            cursor.execute(row_sql, row)
+                            cursor.execute("RELEASE SAVEPOINT krk_bulk_row")
+                            result['affected'] += 1
+                        except psycopg2.Error as e:
+                            cursor.execute("ROLLBACK TO SAVEPOINT krk_bulk_row")
+                            result['errors'].append((start + offset, str(e).strip()))
+
+                conn.commit()
+                cursor.close()
+            self.note_write(row_sql)
+            if table_name:
+                logging.info(f"Пакетная вставка в {table_name}: {result['affected']} строк, ошибок: {len(result['errors'])}")
+        except Exception as e:
+            logging.error(f"Ошибка пакетной вставки: {str(e)}")
+            result['affected'] = 0
+            result['errors'].append((None, str(e)))
+        return result
+
+    def _bulk_insert_validated(self, table_name: str, columns: List[str], rows: List[Tuple],
+                               is_valid, page_size: int) -> Dict[str, Any]:
+        """Отсеять строки, не прошедшие проверки insert_*, и вставить остальные одним пакетом"""
+        good, good_index, errors = [], [], []
+        for i, row in enumerate(rows):
+            try:
+                ok = is_valid(row)
+            except Exception:
+                ok = False
+            if ok:
+                good.append(tuple(row))
+                good_index.append(i)
+            else:
+                errors.append((i, "Неверный формат"))
+        result = self.bulk_insert(table_name, columns, good, page_size)
+        # индексы ошибок вставки — в нумерации исходного списка
+        result['errors'] = sorted(errors + [(good_index[i] if i is not None else None, msg)
+                                            for i, msg in result['errors']],
+                                  key=lambda err: -1 if err[0] is None else err[0])
+        return result
+
+    def insert_points(self, rows: List[Tuple], page_size: int = 1000) -> Dict[str, Any]:
+        """rows: (address, phone_number)"""
+        return self._bulk_insert_validated(
+            'points', ['address', 'phone_number'], rows,
+            lambda r: self.is_valid_phone(r[1]) and self.is_valid_ru_letters(r[0]), page_size)
+
+    def insert_employees(self, rows: List[Tuple], page_size: int = 1000) -> Dict[str, Any]:
+        """rows: (full_name, position, salary, schedule, point_id)"""
+        return self._bulk_insert_validated(
+            'employees', ['full_name', 'position', 'salary', 'schedule', 'point_id'], rows,
+            lambda r: (self.is_valid_ru_letters(r[0]) and self.is_valid_schedule(r[3])
+                       and self.is_valid_ru_letters(r[1])), page_size)
+
+    def insert_products(self, rows: List[Tuple], page_size: int = 1000) -> Dict[str, Any]:
+        """rows: (name, category, cost_price, selling_price)"""
+        return self._bulk_insert_validated(
+            'products', ['name', 'category', 'cost_price', 'selling_price'], rows,
+            lambda r: self.is_valid_ru_letters(r[0]) and self.is_valid_ru_letters(r[1]), page_size)
+
+    def insert_transactions(self, rows: List[Tuple], page_size: int = 1000) -> Dict[str, Any]:
+        """rows: (point_id, type, amount, date, description)"""
+        return self._bulk_insert_validated(
+            'transactions', ['point_id', 'type', 'amount', 'date', 'description'], rows,
+            lambda r: self.is_valid_ru_letters(r[4]), page_size)
+
+    # --- Экспорт через COPY TO STDOUT: строки идут сразу в файл, память не зависит от объёма ---
+    def export_query(self, sql: str, path: str, params: Optional[Tuple] = None, compress: Optional[bool] = None,
+                     delimiter: str = ',', progress=None) -> Dict[str, Any]:
+        """Выгрузить результат SELECT в CSV (с заголовком); compress=None — gzip, если путь оканчивается на .gz.
+
+        progress(записано_байт) вызывается по мере записи.
+        Возвращает {'rows': число строк, 'bytes': размер файла, 'error': текст или None}.
+        """
+        result = {'rows': 0, 'bytes': 0, 'error': None}
+        if compress is None:
+            compress = path.lower().endswith('.gz')
+        query = sql.strip().rstrip(';')
+        try:
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                if params:
+                    query = cursor.mogrify(query, params).decode()
+                options = cursor.mogrify("FORMAT csv, HEADER true, DELIMITER %s", (delimiter,)).decode()
+                opener = gzip.open if compress else open
+                with opener(path, 'wb') as f:
+                    writer = _ProgressWriter(f, progress)
+                    cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH ({options})", writer)
+                result['rows'] = cursor.rowcount
+                result['bytes'] = os.path.getsize(path)
+                # только чтение — транзакцию не фиксируем
+                conn.rollback()
+                cursor.close()
+            logging.info(f"Экспорт в {path}: {result['rows']} строк")
+        except Exception as e:
+            logging.error(f"Ошибка экспорта в {path}: {str(e)}")
+            result['error'] = str(e).strip()
+        return result
+
+    def list_materialized_views(self) -> List[str]:
+        """Материализованные представления пользовательских схем в виде schema.name"""
+        try:
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT schemaname, matviewname FROM pg_matviews
+                    WHERE schemaname NOT IN ('pg_catalog', 'information_schema')
+                    ORDER BY 1, 2
+                """)
+                rows = cursor.fetchall()
+                cursor.close()
+            return [f"{schema}.{name}" for schema, name in rows]
+        except Exception as e:
+            logging.error(f"Ошибка получения материализованных представлений: {str(e)}")
+            return []
+
+    def refresh_materialized_view(self, name: str, concurrently: bool = False) -> bool:
+        """REFRESH MATERIALIZED VIEW; name — view или schema.view"""
+        target = ".".join(self._quote_ident(part) for part in name.split(".", 1))
+        sql = f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrently else ''}{target}"
+        try:
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql)
+                conn.commit()
+                cursor.close()
+            self.note_write(sql)
+            logging.info(f"Обновлено представление {name}")
+            return True
+        except Exception as e:
+            logging.error(f"Ошибка обновления представления {name}: {str(e)}")
+            return False
+
+    def explain_analyze(self, sql: str, params: Optional[Tuple] = None,
+                        statement_timeout_ms: int = 0) -> Dict[str, Any]:
+        """EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) в транзакции, которая всегда откатывается.
+
+        Возвращает {'plan': корневой объект плана, 'tables': {таблица: (reltuples, relpages)},
+        'error': текст или None}; tables — размеры таблиц из узлов плана по pg_class.
+        """
+        result = {'plan': None, 'tables': {}, 'error': None}
+        query = sql.strip().rstrip(';')
+        try:
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    if statement_timeout_ms:
+                        cursor.execute("SET LOCAL statement_timeout = %s", (int(statement_timeout_ms),))
+                    # ANALYZE действительно выполняет запрос — изменения данных откатываются ниже
+                    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}", params)
+                    explained = cursor.fetchone()[0]
+                    if isinstance(explained, str):
+                        explained = json.loads(explained)
+                    result['plan'] = explained[0]
+                    relations = sorted(_plan_relations(result['plan']['Plan']))
+                    if relations:
+                        cursor.execute("""
+                            SELECT relname, max(greatest(reltuples, 0))::bigint, max(relpages)
+                            FROM pg_class
+                            WHERE relkind IN ('r', 'm', 'p') AND relname = ANY(%s)
+                            GROUP BY relname
+                        """, (relations,))
+                        result['tables'] = {name: (rows, pages) for name, rows, pages in cursor.fetchall()}
+                finally:
+                    conn.rollback()
+                    cursor.close()
+        except Exception as e:
+            logging.error(f"Ошибка EXPLAIN ANALYZE: {str(e)}")
+            result['error'] = str(e).strip()
+        return result
+
+    def export_table(self, table_name: str, path: str, **options) -> Dict[str, Any]:
+        return self.export_query(f"SELECT * FROM {self._quote_ident(table_name)}", path, **options)
+
+    # --- Импорт CSV через COPY ---
+    def import_csv(self, table_name: str, path: str, delimiter: str = ',', encoding: str = 'utf-8',
+                   column_map: Optional[Dict[str, str]] = None, upsert: bool = False,
+                   conflict_columns: Optional[List[str]] = None, progress=None,
+                   chunk_size: int = 1 << 20, validate_rows: int = 1000) -> Dict[str, Any]:
+        """Загрузить CSV/TSV (первая строка — заголовок) в таблицу через COPY FROM STDIN.
+
+        Колонки файла сопоставляются с колонками таблицы по имени (или через column_map),
+        первые validate_rows строк проверяются по типам колонок до начала загрузки.
+        upsert=True — загрузка во временную таблицу и INSERT ... ON CONFLICT (conflict_columns,
+        по умолчанию первичный ключ) DO UPDATE; при повторе ключа в файле побеждает последняя строка.
+        progress(прочитано_байт, всего_байт) вызывается по мере чтения файла.
+        Возвращает {'rows': число загруженных строк, 'errors': [текст, ...]}.
+        """
+        result = {'rows': 0, 'errors': []}
+        errors = result['errors']
+
+        # заголовок и выборка строк для проверки типов
+        try:
+            with open(path, newline='', encoding=encoding) as f:
+                reader = csv.reader(f, delimiter=delimiter)
+                header = next(reader, [])
+                sample = [row for _, row in zip(range(validate_rows), reader)]
+        except Exception as e:
+            errors.append(f"Не удалось прочитать файл: {str(e)}")
+            return result
+        if not header:
+            errors.append("Файл пуст или не содержит заголовка")
+            return result
+
+        table_meta = self.get_table_metadata(table_name)
+        if not table_meta:
+            errors.append(f"Таблица {table_name} не найдена")
+            return result
+        by_lower = {c.lower(): c for c in self.get_columns(table_name)}
+        columns = []
+        for name in header:
+            target = (column_map or {}).get(name) or by_lower.get(name.strip().lower())
+            if target not in table_meta:
+                errors.append(f"Колонка файла '{name}' отсутствует в таблице {table_name}")
+            columns.append(target)
+        for col, meta in table_meta.items():
+            if col not in columns and not meta['is_nullable'] and meta['column_default'] is None:
+                errors.append(f"В файле нет обязательной колонки '{col}'")
+        if errors:
+            return result
+
+        for line_no, row in enumerate(sample, start=2):
+            if len(row) != len(columns):
+                errors.append(f"Строка {line_no}: ожидалось {len(columns)} значений, получено {len(row)}")
+                continue
+            for col, value in zip(columns, row):
+                meta = table_meta[col]
+                if value == '':
+                    if not meta['is_nullable']:
+                        errors.append(f"Строка {line_no}: пустое значение в обязательной колонке '{col}'")
+                    continue
+                problem = _check_csv_value(value, meta)
+                if problem:
+                    errors.append(f"Строка {line_no}, колонка '{col}': {problem}")
+        if errors:
+            return result
+
+        if upsert:
+            conflict_columns = conflict_columns or self.get_primary_key(table_name)
+            missing = [c for c in conflict_columns if c not in columns]
+            if not conflict_columns or missing:
+                errors.append("Для загрузки с обновлением в файле должны быть колонки ключа: "
+                              + ", ".join(missing or ["(нет первичного ключа)"]))
+                return result
+
+        pg_encoding = {'utf-8': 'UTF8', 'utf8': 'UTF8', 'cp1251': 'WIN1251',
+                       'windows-1251': 'WIN1251'}.get(encoding.lower(), encoding)
+        cols_sql = ", ".join(self._quote_ident(c) for c in columns)
+        table_sql = self._quote_ident(table_name)
+        try:
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                options = cursor.mogrify("FORMAT csv, HEADER true, DELIMITER %s, ENCODING %s",
+                                         (delimiter, pg_encoding)).decode()
+                target = table_sql
+                if upsert:
+                    # типы колонок без ограничений: проверки и ключи сработают при переносе в таблицу
+                    cursor.execute(f"CREATE TEMP TABLE krk_import_stage ON COMMIT DROP AS "
+                                   f"SELECT {cols_sql} FROM {table_sql} WITH NO DATA")
+                    cursor.execute("ALTER TABLE krk_import_stage ADD COLUMN krk_line BIGSERIAL")
+                    target = "krk_import_stage"
+
+                total = os.path.getsize(path)
+                with open(path, 'rb') as f:
+                    cursor.copy_expert(f"COPY {target} ({cols_sql}) FROM STDIN WITH ({options})",
+                                       _ProgressReader(f, total, progress), size=chunk_size)
+                result['rows'] = cursor.rowcount
+
+                if upsert:
+                    key_sql = ", ".join(self._quote_ident(c) for c in conflict_columns)
+                    updates = [c for c in columns if c not in conflict_columns]
+                    if updates:
+                        action = "DO UPDATE SET " + ", ".join(
+                            f"{self._quote_ident(c)} = EXCLUDED.{self._quote_ident(c)}" for c in updates)
+                    else:
+                        action = "DO NOTHING"
+                    cursor.execute(f"""
+                        INSERT INTO {table_sql} ({cols_sql})
+                        SELECT DISTINCT ON ({key_sql}) {cols_sql}
+                        FROM krk_import_stage
+                        ORDER BY {key_sql}, krk_line DESC
+                        ON CONFLICT ({key_sql}) {action}
+                    """)
+                    result['rows'] = cursor.rowcount
+
+                conn.commit()
+                cursor.close()
+            self.invalidate_result_cache([table_name])
+            logging.info(f"Импорт {path} в {table_name}: {result['rows']} строк")
+        except Exception as e:
+            logging.error(f"Ошибка импорта CSV в {table_name}: {str(e)}")
+            result['rows'] = 0
+            errors.append(str(e).strip())
+        return result
+
     def delete_point(self, point_id: int) -> bool:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
-            
-            cursor = self.connection.cursor()
-            cursor.execute("DELETE FROM points WHERE point_id = %s", (point_id,))
-            self.connection.commit()
-            cursor.close()
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                self._execute_prepared(conn, cursor, "DELETE FROM points WHERE point_id = %s", (point_id,))
+                conn.commit()
+                cursor.close()
+            self.invalidate_result_cache(['points'])
             logging.info(f"Удалена точка ID: {point_id}")
             return True
         except Exception as e:
             logging.error(f"Ошибка удаления точки: {str(e)}")
-            if self.connection:
-                self.connection.rollback()
             return False
 
     def delete_employee(self, employee_id: int) -> bool:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
-            
-            cursor = self.connection.cursor()
-            cursor.execute("DELETE FROM employees WHERE employee_id = %s", (employee_id,))
-            self.connection.commit()
-            cursor.close()
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                self._execute_prepared(conn, cursor, "DELETE FROM employees WHERE employee_id = %s", (employee_id,))
+                conn.commit()
+                cursor.close()
+            self.invalidate_result_cache(['employees'])
             logging.info(f"Удален сотрудник ID: {employee_id}")
             return True
         except Exception as e:
             logging.error(f"Ошибка удаления сотрудника: {str(e)}")
-            if self.connection:
-                self.connection.rollback()
             return False
 
     def delete_product(self, product_id: int) -> bool:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
-            
-            cursor = self.connection.cursor()
-            cursor.execute("DELETE FROM products WHERE product_id = %s", (product_id,))
-            self.connection.commit()
-            cursor.close()
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                self._execute_prepared(conn, cursor, "DELETE FROM products WHERE product_id = %s", (product_id,))
+                conn.commit()
+                cursor.close()
+            self.invalidate_result_cache(['products'])
             logging.info(f"Удален продукт ID: {product_id}")
             return True
         except Exception as e:
             logging.error(f"Ошибка удаления продукта: {str(e)}")
-            if self.connection:
-                self.connection.rollback()
             return False
 
     def delete_transaction(self, transaction_id: int) -> bool:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
-            
-            cursor = self.connection.cursor()
-            cursor.execute("DELETE FROM transactions WHERE transaction_id = %s", (transaction_id,))
-            self.connection.commit()
-            cursor.close()
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                self._execute_prepared(conn, cursor, "DELETE FROM transactions WHERE transaction_id = %s", (transaction_id,))
+                conn.commit()
+                cursor.close()
+            self.invalidate_result_cache(['transactions'])
             logging.info(f"Удалена финансовая операция ID: {transaction_id}")
             return True
         except Exception as e:
             logging.error(f"Ошибка удаления финансовой операции: {str(e)}")
-            if self.connection:
-                self.connection.rollback()
             return False
 
+    @retry_on_connection_loss
     def get_points_count(self) -> int:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return 0
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT COUNT(*) FROM points")
-            result = cursor.fetchone()[0]
-            cursor.close()
-            return result
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COUNT(*) FROM points")
+                result = cursor.fetchone()[0]
+                cursor.close()
+                return result
         except Exception as e:
             logging.error(f"Ошибка получения количества точек: {str(e)}")
             return 0
 
+    @retry_on_connection_loss
     def get_employees_count(self) -> int:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return 0
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT COUNT(*) FROM employees")
-            result = cursor.fetchone()[0]
-            cursor.close()
-            return result
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COUNT(*) FROM employees")
+                result = cursor.fetchone()[0]
+                cursor.close()
+                return result
         except Exception as e:
             logging.error(f"Ошибка получения количества сотрудников: {str(e)}")
             return 0
 
+    @retry_on_connection_loss
     def get_products_count(self) -> int:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return 0
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT COUNT(*) FROM products")
-            result = cursor.fetchone()[0]
-            cursor.close()
-            return result
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COUNT(*) FROM products")
+                result = cursor.fetchone()[0]
+                cursor.close()
+                return result
         except Exception as e:
             logging.error(f"Ошибка получения количества продуктов: {str(e)}")
             return 0
 
+    @retry_on_connection_loss
     def get_total_revenue(self) -> float:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return 0.0
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT SUM(amount) FROM transactions WHERE type = 'Доход'")
-            result = cursor.fetchone()[0] or 0.0
-            cursor.close()
-            return float(result)
+            sql = transaction_total_sql(self.is_transaction_summary_enabled())
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, ('Доход',))
+                result = cursor.fetchone()[0] or 0.0
+                cursor.close()
+                return float(result)
         except Exception as e:
             logging.error(f"Ошибка получения общего дохода: {str(e)}")
             return 0.0
 
+    @retry_on_connection_loss
     def get_total_expenses(self) -> float:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return 0.0
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT SUM(amount) FROM transactions WHERE type = 'Расход'")
-            result = cursor.fetchone()[0] or 0.0
-            cursor.close()
-            return float(result)
+            sql = transaction_total_sql(self.is_transaction_summary_enabled())
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, ('Расход',))
+                result = cursor.fetchone()[0] or 0.0
+                cursor.close()
+                return float(result)
         except Exception as e:
             logging.error(f"Ошибка получения общих расходов: {str(e)}")
             return 0.0
 
+    @retry_on_connection_loss
+    def get_dashboard_stats(self, estimate_counts: bool = False) -> Dict[str, Any]:
+        """Все показатели главного окна одним запросом.
+
+        estimate_counts=True берёт число строк из pg_class.reltuples (оценка после
+        последнего ANALYZE) вместо COUNT(*) — для очень больших таблиц.
+        Доходы, расходы и число транзакций при включённой сводке (enable_transaction_summary)
+        читаются из неё — точно и без чтения transactions. Без сводки суммы требуют полного
+        чтения transactions, и estimate_counts этого не отменяет: оценка заменяет только счётчики.
+        """
+        sql = dashboard_stats_sql(estimate_counts, self.is_transaction_summary_enabled())
+        row = None
+        try:
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql)
+                row = cursor.fetchone()
+                cursor.close()
+        except Exception as e:
+            logging.error(f"Ошибка получения статистики: {str(e)}")
+        return build_dashboard_stats(row, estimate_counts)
+
+    # --- Сводка по транзакциям: точка × день × тип, поддерживается триггерами ---
+    def is_transaction_summary_enabled(self) -> bool:
+        enabled = self._schema_cache_get('transactions', 'summary_enabled')
+        if enabled is not None:
+            return enabled
+        try:
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(SUMMARY_ENABLED_SQL)
+                enabled = bool(cursor.fetchone()[0])
+                cursor.close()
+        except Exception as e:
+            logging.error(f"Ошибка проверки сводки транзакций: {str(e)}")
+            return False
+        self._schema_cache_put('transactions', 'summary_enabled', enabled)
+        return enabled
+
+    def enable_transaction_summary(self) -> bool:
+        """Создать сводную таблицу, заполнить её из transactions и повесить триггеры"""
+        try:
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {SUMMARY_TABLE} (
+                        point_id INTEGER NOT NULL,
+                        date DATE NOT NULL,
+                        type transaction_type NOT NULL,
+                        total_amount NUMERIC(16, 2) NOT NULL DEFAULT 0,
+                        tx_count BIGINT NOT NULL DEFAULT 0,
+                        PRIMARY KEY (point_id, date, type)
+                    )
+                """)
+                # триггеры уровня оператора с переходными таблицами: массовая загрузка
+                # обновляет сводку одним INSERT ... GROUP BY, а не построчно
+                cursor.execute(f"""
+                    CREATE OR REPLACE FUNCTION krk_transaction_totals_apply() RETURNS trigger
+                    LANGUAGE plpgsql AS $$
+                    BEGIN
+                        IF TG_OP = 'TRUNCATE' THEN
+                            TRUNCATE {SUMMARY_TABLE};
+                            RETURN NULL;
+                        END IF;
+                        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                            INSERT INTO {SUMMARY_TABLE} AS s (point_id, date, type, total_amount, tx_count)
+                            SELECT point_id, date, type, -SUM(amount), -COUNT(*)
+                            FROM old_rows GROUP BY point_id, date, type
+                            ON CONFLICT (point_id, date, type) DO UPDATE
+                                SET total_amount = s.total_amount + EXCLUDED.total_amount,
+                                    tx_count = s.tx_count + EXCLUDED.tx_count;
+                        END IF;
+                        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                            INSERT INTO {SUMMARY_TABLE} AS s (point_id, date, type, total_amount, tx_count)
+                            SELECT point_id, date, type, SUM(amount), COUNT(*)
+                            FROM new_rows GROUP BY point_id, date, type
+                            ON CONFLICT (point_id, date, type) DO UPDATE
+                                SET total_amount = s.total_amount + EXCLUDED.total_amount,
+                                    tx_count = s.tx_count + EXCLUDED.tx_count;
+                        END IF;
+                        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                            DELETE FROM {SUMMARY_TABLE} s
+                            USING (SELECT DISTINCT point_id, date, type FROM old_rows) o
+                            WHERE s.point_id = o.point_id AND s.date = o.date AND s.type = o.type
+                              AND s.tx_count = 0;
+                        END IF;
+                        RETURN NULL;
+                    END
+                    $$
+                """)
+                for name in ('krk_tx_totals_ins', 'krk_tx_totals_upd', 'krk_tx_totals_del', 'krk_tx_totals_trunc'):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {name} ON transactions")
+                cursor.execute("""
+                    CREATE TRIGGER krk_tx_totals_ins AFTER INSERT ON transactions
+                    REFERENCING NEW TABLE AS new_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION krk_transaction_totals_apply()
+                """)
+                cursor.execute("""
+                    CREATE TRIGGER krk_tx_totals_upd AFTER UPDATE ON transactions
+                    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION krk_transaction_totals_apply()
+                """)
+                cursor.execute("""
+                    CREATE TRIGGER krk_tx_totals_del AFTER DELETE ON transactions
+                    REFERENCING OLD TABLE AS old_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION krk_transaction_totals_apply()
+                """)
+                cursor.execute("""
+                    CREATE TRIGGER krk_tx_totals_trunc AFTER TRUNCATE ON transactions
+                    FOR EACH STATEMENT EXECUTE FUNCTION krk_transaction_totals_apply()
+                """)
+                # пересчёт под блокировкой, чтобы не потерять строки, вставленные во время заполнения
+                cursor.execute("LOCK TABLE transactions IN SHARE ROW EXCLUSIVE MODE")
+                cursor.execute(f"TRUNCATE {SUMMARY_TABLE}")
+                cursor.execute(f"""
+                    INSERT INTO {SUMMARY_TABLE} (point_id, date, type, total_amount, tx_count)
+                    SELECT point_id, date, type, SUM(amount), COUNT(*)
+                    FROM transactions GROUP BY point_id, date, type
+                """)
+                conn.commit()
+                cursor.close()
+            self.mark_structure_changed()
+            logging.info("Сводка по транзакциям включена")
+            return True
+        except Exception as e:
+            logging.error(f"Ошибка включения сводки транзакций: {str(e)}")
+            return False
+
+    def disable_transaction_summary(self) -> bool:
+        try:
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                for name in ('krk_tx_totals_ins', 'krk_tx_totals_upd', 'krk_tx_totals_del', 'krk_tx_totals_trunc'):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {name} ON transactions")
+                cursor.execute("DROP FUNCTION IF EXISTS krk_transaction_totals_apply()")
+                cursor.execute(f"DROP TABLE IF EXISTS {SUMMARY_TABLE}")
+                conn.commit()
+                cursor.close()
+            self.mark_structure_changed()
+            logging.info("Сводка по транзакциям отключена")
+            return True
+        except Exception as e:
+            logging.error(f"Ошибка отключения сводки транзакций: {str(e)}")
+            return False
+
+    @retry_on_connection_loss
+    def get_financial_report(self, period: str = 'month', point_id: Optional[int] = None,
+                             date_from=None, date_to=None) -> List[Dict[str, Any]]:
+        """Доходы/расходы по точкам в разрезе периодов (day/week/month), считается на сервере.
+
+        Одна запись на точку; значения — параллельные массивы по периодам:
+        {'point_id', 'address', 'periods', 'revenue', 'expenses', 'profit', 'running_profit', 'tx_count'}
+        """
+        if period not in REPORT_PERIODS:
+            logging.error(f"Неизвестный период отчёта: {period}")
+            return []
+
+        if self.is_transaction_summary_enabled():
+            source = f"SELECT point_id, date, type, total_amount AS amount, tx_count FROM {SUMMARY_TABLE}"
+        else:
+            source = "SELECT point_id, date, type, amount, 1 AS tx_count FROM transactions"
+
+        where = []
+        params: List[Any] = [period]
+        if point_id is not None:
+            where.append("point_id = %s")
+            params.append(point_id)
+        if date_from is not None:
+            where.append("date >= %s")
+            params.append(date_from)
+        if date_to is not None:
+            where.append("date <= %s")
+            params.append(date_to)
+        where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+
+        sql = f"""
+            WITH buckets AS (
+                SELECT point_id,
+                       date_trunc(%s, date)::date AS period,
+                       COALESCE(SUM(amount) FILTER (WHERE type = 'Доход'), 0) AS revenue,
+                       COALESCE(SUM(amount) FILTER (WHERE type = 'Расход'), 0) AS expenses,
+                       SUM(tx_count) AS tx_count
+                FROM ({source}) AS src
+                {where_sql}
+                GROUP BY point_id, period
+            ), series AS (
+                SELECT b.*,
+                       revenue - expenses AS profit,
+                       SUM(revenue - expenses) OVER (PARTITION BY point_id ORDER BY period) AS running_profit
+                FROM buckets b
+            )
+            SELECT s.point_id,
+                   p.address,
+                   array_agg(s.period ORDER BY s.period),
+                   array_agg(s.revenue ORDER BY s.period),
+                   array_agg(s.expenses ORDER BY s.period),
+                   array_agg(s.profit ORDER BY s.period),
+                   array_agg(s.running_profit ORDER BY s.period),
+                   array_agg(s.tx_count ORDER BY s.period)
+            FROM series s
+            LEFT JOIN points p ON p.point_id = s.point_id
+            GROUP BY s.point_id, p.address
+            ORDER BY s.point_id
+        """
+        try:
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, tuple(params))
+                rows = cursor.fetchall()
+                cursor.close()
+            keys = ('point_id', 'address', 'periods', 'revenue', 'expenses', 'profit', 'running_profit', 'tx_count')
+            return [dict(zip(keys, row)) for row in rows]
+        except Exception as e:
+            logging.error(f"Ошибка построения финансового отчёта: {str(e)}")
+            return []
+
     def get_logs(self) -> List[str]:
         try:
-            with open('app.log', 'r', encoding='utf-8') as f:
+            with open(app_file('app.log'), 'r', encoding='utf-8') as f:
                 return f.readlines()
         except Exception as e:
             logging.error(f"Ошибка чтения логов: {str(e)}")
             return ["Логи не найдены"]
 
+    @retry_on_connection_loss
     def check_data_exists(self) -> Dict[str, bool]:
         result = {
             'points': False,
@@ -595,25 +1832,22 @@ class DatabaseManager:
         }
         
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return result
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
             
-            cursor = self.connection.cursor()
+                cursor.execute("SELECT EXISTS(SELECT 1 FROM points LIMIT 1)")
+                result['points'] = cursor.fetchone()[0]
             
-            cursor.execute("SELECT EXISTS(SELECT 1 FROM points LIMIT 1)")
-            result['points'] = cursor.fetchone()[0]
+                cursor.execute("SELECT EXISTS(SELECT 1 FROM employees LIMIT 1)")
+                result['employees'] = cursor.fetchone()[0]
             
-            cursor.execute("SELECT EXISTS(SELECT 1 FROM employees LIMIT 1)")
-            result['employees'] = cursor.fetchone()[0]
+                cursor.execute("SELECT EXISTS(SELECT 1 FROM products LIMIT 1)")
+                result['products'] = cursor.fetchone()[0]
             
-            cursor.execute("SELECT EXISTS(SELECT 1 FROM products LIMIT 1)")
-            result['products'] = cursor.fetchone()[0]
+                cursor.execute("SELECT EXISTS(SELECT 1 FROM transactions LIMIT 1)")
+                result['transactions'] = cursor.fetchone()[0]
             
-            cursor.execute("SELECT EXISTS(SELECT 1 FROM transactions LIMIT 1)")
-            result['transactions'] = cursor.fetchone()[0]
-            
-            cursor.close()
+                cursor.close()
             
         except Exception as e:
             logging.error(f"Ошибка проверки данных: {str(e)}")
@@ -622,153 +1856,132 @@ class DatabaseManager:
 
     def update_point(self, point_id: int, address: str, phone_number: str = None) -> bool:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
-                
             if not self.is_valid_phone(phone_number) or not self.is_valid_ru_letters(address):
                 logging.error("Неверный формат")
                 return False
-            
-            cursor = self.connection.cursor()
-            cursor.execute(
-                "UPDATE points SET address = %s, phone_number = %s WHERE point_id = %s",
-                (address, phone_number, point_id)
-            )
-            self.connection.commit()
-            cursor.close()
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                self._execute_prepared(
+                    conn, cursor, "UPDATE points SET address = %s, phone_number = %s WHERE point_id = %s",
+                    (address, phone_number, point_id)
+                )
+                conn.commit()
+                cursor.close()
+            self.invalidate_result_cache(['points'])
             logging.info(f"Обновлена точка ID: {point_id}")
             return True
         except Exception as e:
             logging.error(f"Ошибка обновления точки: {str(e)}")
-            if self.connection:
-                self.connection.rollback()
             return False
 
     def update_employee(self, employee_id: int, full_name: str, position: str, salary: float, schedule: str, point_id: int) -> bool:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
             if not self.is_valid_ru_letters(full_name) or not self.is_valid_schedule(schedule) or not self.is_valid_ru_letters(position):
                 logging.error('Ошибка добавления сотрудника')
                 return False
-            
-            cursor = self.connection.cursor()
-            cursor.execute(
-                "UPDATE employees SET full_name = %s, position = %s, salary = %s, schedule = %s, point_id = %s WHERE employee_id = %s",
-                (full_name, position, salary, schedule, point_id, employee_id)
-            )
-            self.connection.commit()
-            cursor.close()
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                self._execute_prepared(
+                    conn, cursor, "UPDATE employees SET full_name = %s, position = %s, salary = %s, schedule = %s, point_id = %s WHERE employee_id = %s",
+                    (full_name, position, salary, schedule, point_id, employee_id)
+                )
+                conn.commit()
+                cursor.close()
+            self.invalidate_result_cache(['employees'])
             logging.info(f"Обновлен сотрудник ID: {employee_id}")
             return True
         except Exception as e:
             logging.error(f"Ошибка обновления сотрудника: {str(e)}")
-            if self.connection:
-                self.connection.rollback()
             return False
 
     def update_product(self, product_id: int, name: str, category: str, cost_price: float, selling_price: float) -> bool:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
             if not self.is_valid_ru_letters(name) or not self.is_valid_ru_letters(category):
                 logging.error("Ошибка добавления продукта")
                 return False
-            
-            cursor = self.connection.cursor()
-            cursor.execute(
-                "UPDATE products SET name = %s, category = %s, cost_price = %s, selling_price = %s WHERE product_id = %s",
-                (name, category, cost_price, selling_price, product_id)
-            )
-            self.connection.commit()
-            cursor.close()
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                self._execute_prepared(
+                    conn, cursor, "UPDATE products SET name = %s, category = %s, cost_price = %s, selling_price = %s WHERE product_id = %s",
+                    (name, category, cost_price, selling_price, product_id)
+                )
+                conn.commit()
+                cursor.close()
+            self.invalidate_result_cache(['products'])
             logging.info(f"Обновлен продукт ID: {product_id}")
             return True
         except Exception as e:
             logging.error(f"Ошибка обновления продукта: {str(e)}")
-            if self.connection:
-                self.connection.rollback()
             return False
 
     def update_transaction(self, transaction_id: int, point_id: int, type: str, amount: float, date: str, description: str = None) -> bool:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
             if not self.is_valid_ru_letters(description):
                 logging.error(f'Неверный формат:{description}')
                 return False
-            
-            cursor = self.connection.cursor()
-            cursor.execute(
-                "UPDATE transactions SET point_id = %s, type = %s, amount = %s, date = %s, description = %s WHERE transaction_id = %s",
-                (point_id, type, amount, date, description, transaction_id)
-            )
-            self.connection.commit()
-            cursor.close()
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                self._execute_prepared(
+                    conn, cursor, "UPDATE transactions SET point_id = %s, type = %s, amount = %s, date = %s, description = %s WHERE transaction_id = %s",
+                    (point_id, type, amount, date, description, transaction_id)
+                )
+                conn.commit()
+                cursor.close()
+            self.invalidate_result_cache(['transactions'])
             logging.info(f"Обновлена финансовая операция ID: {transaction_id}")
             return True
         except Exception as e:
             logging.error(f"Ошибка обновления финансовой операции: {str(e)}")
-            if self.connection:
-                self.connection.rollback()
             return False
 
+    @retry_on_connection_loss
     def get_point_by_id(self, point_id: int) -> Tuple:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return None
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT * FROM points WHERE point_id = %s", (point_id,))
-            result = cursor.fetchone()
-            cursor.close()
-            return result
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                self._execute_prepared(conn, cursor, "SELECT * FROM points WHERE point_id = %s", (point_id,))
+                result = cursor.fetchone()
+                cursor.close()
+                return result
         except Exception as e:
             logging.error(f"Ошибка получения точки: {str(e)}")
             return None
 
+    @retry_on_connection_loss
     def get_employee_by_id(self, employee_id: int) -> Tuple:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return None
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT * FROM employees WHERE employee_id = %s", (employee_id,))
-            result = cursor.fetchone()
-            cursor.close()
-            return result
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                self._execute_prepared(conn, cursor, "SELECT * FROM employees WHERE employee_id = %s", (employee_id,))
+                result = cursor.fetchone()
+                cursor.close()
+                return result
         except Exception as e:
             logging.error(f"Ошибка получения сотрудника: {str(e)}")
             return None
 
+    @retry_on_connection_loss
     def get_product_by_id(self, product_id: int) -> Tuple:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return None
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT * FROM products WHERE product_id = %s", (product_id,))
-            result = cursor.fetchone()
-            cursor.close()
-            return result
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                self._execute_prepared(conn, cursor, "SELECT * FROM products WHERE product_id = %s", (product_id,))
+                result = cursor.fetchone()
+                cursor.close()
+                return result
         except Exception as e:
             logging.error(f"Ошибка получения продукта: {str(e)}")
             return None
 
+    @retry_on_connection_loss
     def get_transaction_by_id(self, transaction_id: int) -> Tuple:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return None
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT * FROM transactions WHERE transaction_id = %s", (transaction_id,))
-            result = cursor.fetchone()
-            cursor.close()
-            return result
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                self._execute_prepared(conn, cursor, "SELECT * FROM transactions WHERE transaction_id = %s", (transaction_id,))
+                result = cursor.fetchone()
+                cursor.close()
+                return result
         except Exception as e:
             logging.error(f"Ошибка получения финансовой операции: {str(e)}")
             return None
@@ -784,9 +1997,11 @@ class DatabaseManager:
             return False
         return True
 
-    def mark_structure_changed(self):
+    def mark_structure_changed(self, table: Optional[str] = None):
         """Пометить что структура БД была изменена"""
         self.structure_changed = True
+        self.invalidate_schema_cache(table)
+        self.invalidate_result_cache([table] if table else None)
 
     def clear_structure_changed(self):
         """Сбросить флаг изменений"""
@@ -796,42 +2011,317 @@ class DatabaseManager:
         """Проверить были ли изменения структуры"""
         return self.structure_changed
 
-    def list_tables(self) -> List[str]:
+    # --- Кэш схемы: (таблица, вид) -> (время, значение); список таблиц хранится под таблицей None ---
+    def _schema_cache_get(self, table: Optional[str], kind: str):
+        self._poll_schema_notifications()
+        with self._schema_lock:
+            entry = self._schema_cache.get((table, kind))
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.schema_cache_ttl:
+                del self._schema_cache[(table, kind)]
+                return None
+        return copy.deepcopy(value)
+
+    def _schema_cache_put(self, table: Optional[str], kind: str, value):
+        with self._schema_lock:
+            self._schema_cache[(table, kind)] = (time.monotonic(), copy.deepcopy(value))
+
+    def invalidate_schema_cache(self, table: Optional[str] = None):
+        """Сбросить кэш схемы целиком или только для одной таблицы"""
+        with self._schema_lock:
+            # подготовленные запросы соединения сбросят себя при следующем использовании
+            self._prepared_generation += 1
+            if table is None:
+                self._schema_cache.clear()
+                return
+            for key in [k for k in self._schema_cache if k[0] in (table, None)]:
+                del self._schema_cache[key]
+
+    # --- Кэш результатов чтения: (SQL, параметры) -> результат, сбрасывается записью в прочитанные таблицы ---
+    def set_result_cache_enabled(self, enabled: bool):
+        self.result_cache_enabled = bool(enabled)
+        # и при включении: пока кэш был выключен, записи не отмечались, начатые тогда чтения не сохраняем
+        self.result_cache.clear()
+
+    def result_cache_stats(self) -> Dict[str, int]:
+        """Попадания, промахи, вытеснения и сбросы кэша результатов"""
+        return self.result_cache.stats()
+
+    def is_cacheable(self, sql: str) -> bool:
+        return bool(READ_RE.match(sql)) and not WRITE_WORD_RE.search(sql) and not VOLATILE_RE.search(sql)
+
+    def cached_result(self, sql: str, params: Optional[Tuple] = None) -> Optional[Tuple[List[str], List[Tuple]]]:
+        """(колонки, строки) из кэша или None, если кэш выключен или записи нет"""
+        if not self.result_cache_enabled or not self.is_cacheable(sql):
+            return None
+        return self.result_cache.get(sql, params)
 
-        try:
-            if not self.is_connected():
-                if not self.connect():
-                    return []
-            cursor = self.connection.cursor()
-            cursor.execute("""
-                SELECT table_name
-                FROM information_schema.tables
-                WHERE table_schema = 'public'
-                ORDER BY table_name
-            """)
+    def result_generation(self) -> int:
+        """Снять перед чтением результата, который потом передаётся в cache_result(since=...)"""
+        return self.result_cache.generation()
+
+    def cache_result(self, sql: str, params: Optional[Tuple], columns: List[str], rows: List[Tuple],
+                     since: Optional[int] = None) -> bool:
+        """Запомнить полностью прочитанный результат запроса.
+
+        since — result_generation() до начала чтения: запись в прочитанные таблицы
+        во время чтения отменяет сохранение.
+        """
+        if not self.result_cache_enabled or not self.is_cacheable(sql):
+            return False
+        tables = self._read_tables(sql)
+        if not tables:
+            # без известных таблиц запись нечем будет сбросить
+            return False
+        return self.result_cache.put(sql, params, columns, rows, tables, since)
+
+    def fetch_all_cached(self, sql: str, params: Optional[Tuple] = None) -> Tuple[List[str], List[Tuple]]:
+        """Результат запроса целиком: из кэша, а при промахе — с сервера с сохранением в кэш"""
+        cached = self.cached_result(sql, params)
+        if cached is not None:
+            return cached
+        since = self.result_generation()
+        with self.borrow_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            columns = [d[0] for d in cursor.description or []]
             rows = cursor.fetchall()
             cursor.close()
-            return [r[0] for r in rows]
+            conn.rollback()
+        self.cache_result(sql, params, columns, rows, since)
+        return columns, rows
+
+    def _note_committed(self, sql: str):
+        if DDL_RE.match(sql):
+            self.invalidate_schema_cache()
+        self.note_write(sql)
+
+    def note_write(self, sql: str):
+        """Сбросить кэшированные результаты, которые могла изменить выполненная команда"""
+        if not self.result_cache_enabled or (READ_RE.match(sql) and not WRITE_WORD_RE.search(sql)):
+            return
+        if DDL_RE.match(sql):
+            self.result_cache.clear()
+            return
+        self.invalidate_result_cache(self._read_tables(sql))
+
+    def invalidate_result_cache(self, tables: Optional[List[str]] = None):
+        """Сбросить результаты, читавшие указанные таблицы (или весь кэш)"""
+        if not self.result_cache_enabled:
+            return
+        if tables is None:
+            self.result_cache.clear()
+            return
+        graph = self._relation_graph()
+        # каскадные внешние ключи и триггер сводки меняют и соседние таблицы
+        affected, pending = set(), list(tables)
+        while pending:
+            table = pending.pop()
+            if table in affected:
+                continue
+            affected.add(table)
+            pending.extend(graph['children'].get(table, ()))
+            if table == 'transactions':
+                pending.append(SUMMARY_TABLE)
+        self.result_cache.invalidate_tables(affected)
+
+    def _read_tables(self, sql: str) -> set:
+        """Отношения, упомянутые в запросе; представления раскрываются до базовых таблиц"""
+        graph = self._relation_graph()
+        words = {quoted.replace('""', '"') if quoted else plain.lower() for quoted, plain in IDENT_RE.findall(sql)}
+        result, pending = set(), [w for w in words if w in graph['relations']]
+        while pending:
+            name = pending.pop()
+            if name in result:
+                continue
+            result.add(name)
+            pending.extend(graph['views'].get(name, ()))
+        return result
+
+    def _relation_graph(self) -> Dict[str, Any]:
+        cached = self._schema_cache_get(None, 'relation_graph')
+        if cached is not None:
+            return cached
+        graph = {'relations': set(), 'views': {}, 'children': {}}
+        try:
+            with self.borrow_connection() as conn:
+                cur = conn.cursor()
+                cur.execute("""
+                    SELECT c.relname FROM pg_class c
+                    JOIN pg_namespace n ON n.oid = c.relnamespace
+                    WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p', 'v', 'm', 'f')
+                """)
+                graph['relations'] = {r[0] for r in cur.fetchall()}
+                cur.execute("""
+                    SELECT DISTINCT v.relname, t.relname
+                    FROM pg_depend d
+                    JOIN pg_rewrite r ON r.oid = d.objid
+                    JOIN pg_class v ON v.oid = r.ev_class
+                    JOIN pg_class t ON t.oid = d.refobjid
+                    JOIN pg_namespace n ON n.oid = v.relnamespace
+                    WHERE d.classid = 'pg_rewrite'::regclass AND d.refclassid = 'pg_class'::regclass
+                      AND v.relkind = 'v' AND t.oid <> v.oid AND n.nspname = 'public'
+                """)
+                for view, table in cur.fetchall():
+                    graph['views'].setdefault(view, set()).add(table)
+                cur.execute("""
+                    SELECT DISTINCT p.relname, c.relname
+                    FROM pg_constraint con
+                    JOIN pg_class c ON c.oid = con.conrelid
+                    JOIN pg_class p ON p.oid = con.confrelid
+                    JOIN pg_namespace n ON n.oid = c.relnamespace
+                    WHERE con.contype = 'f' AND n.nspname = 'public'
+                """)
+                for parent, child in cur.fetchall():
+                    graph['children'].setdefault(parent, set()).add(child)
+                cur.close()
+                conn.rollback()
+        except Exception as e:
+            logging.error(f"Ошибка чтения зависимостей таблиц: {str(e)}")
+            return graph
+        self._schema_cache_put(None, 'relation_graph', graph)
+        return graph
+
+    def install_schema_change_trigger(self) -> bool:
+        """Создать event trigger, оповещающий через NOTIFY о DDL от любых клиентов (нужен суперпользователь)"""
+        try:
+            with self.borrow_connection() as conn:
+                cur = conn.cursor()
+                cur.execute("""
+                    CREATE OR REPLACE FUNCTION krk_notify_schema_change() RETURNS event_trigger
+                    LANGUAGE plpgsql AS $$
+                    DECLARE
+                        changed text;
+                    BEGIN
+                        -- временные таблицы (например, промежуточная таблица import_csv) схему не меняют
+                        SELECT object_identity INTO changed
+                        FROM pg_event_trigger_ddl_commands()
+                        WHERE coalesce(schema_name, '') NOT LIKE 'pg\\_temp%'
+                        LIMIT 1;
+                        IF changed IS NOT NULL THEN
+                            PERFORM pg_notify('krk_schema_changed', tg_tag || ' ' || changed);
+                        END IF;
+                    END
+                    $$
+                """)
+                # для DROP pg_event_trigger_ddl_commands() пуст — удалённые объекты видны только в sql_drop
+                cur.execute("""
+                    CREATE OR REPLACE FUNCTION krk_notify_schema_drop() RETURNS event_trigger
+                    LANGUAGE plpgsql AS $$
+                    DECLARE
+                        dropped text;
+                    BEGIN
+                        SELECT object_identity INTO dropped
+                        FROM pg_event_trigger_dropped_objects()
+                        WHERE NOT is_temporary
+                        LIMIT 1;
+                        IF dropped IS NOT NULL THEN
+                            PERFORM pg_notify('krk_schema_changed', tg_tag || ' ' || dropped);
+                        END IF;
+                    END
+                    $$
+                """)
+                cur.execute("DROP EVENT TRIGGER IF EXISTS krk_schema_changed")
+                cur.execute("""
+                    CREATE EVENT TRIGGER krk_schema_changed ON ddl_command_end
+                    EXECUTE FUNCTION krk_notify_schema_change()
+                """)
+                cur.execute("DROP EVENT TRIGGER IF EXISTS krk_schema_dropped")
+                cur.execute("""
+                    CREATE EVENT TRIGGER krk_schema_dropped ON sql_drop
+                    EXECUTE FUNCTION krk_notify_schema_drop()
+                """)
+                conn.commit()
+                cur.close()
+                logging.info("Установлен триггер оповещения об изменениях схемы")
+                return True
+        except Exception as e:
+            logging.error(f"Не удалось установить триггер изменений схемы: {str(e)}")
+            return False
+
+    def start_schema_listener(self):
+        self.stop_schema_listener()
+        try:
+            listener = psycopg2.connect(**self.connection_params)
+            listener.autocommit = True
+            cur = listener.cursor()
+            cur.execute("LISTEN krk_schema_changed")
+            cur.close()
+            self._schema_listener = listener
+        except Exception as e:
+            logging.error(f"Не удалось подписаться на изменения схемы: {str(e)}")
+
+    def stop_schema_listener(self):
+        listener, self._schema_listener = self._schema_listener, None
+        if listener is not None:
+            try:
+                listener.close()
+            except Exception:
+                pass
+
+    def _poll_schema_notifications(self):
+        # poll() только читает уже пришедшие данные из сокета и не делает запроса к серверу
+        listener = self._schema_listener
+        if listener is None:
+            return
+        try:
+            listener.poll()
+        except Exception as e:
+            logging.warning(f"Канал изменений схемы недоступен: {str(e)}")
+            self.stop_schema_listener()
+            self.invalidate_schema_cache()
+            return
+        if listener.notifies:
+            logging.info(f"Изменение схемы другим клиентом: {listener.notifies[-1].payload}")
+            listener.notifies.clear()
+            self.invalidate_schema_cache()
+
+    @retry_on_connection_loss
+    def list_tables(self) -> List[str]:
+        """Пользовательские таблицы; служебная сводка SUMMARY_TABLE не показывается"""
+        cached = self._schema_cache_get(None, 'tables')
+        if cached is not None:
+            return cached
+        try:
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT table_name
+                    FROM information_schema.tables
+                    WHERE table_schema = 'public' AND table_name <> %s
+                    ORDER BY table_name
+                """, (SUMMARY_TABLE,))
+                rows = cursor.fetchall()
+                cursor.close()
+                tables = [r[0] for r in rows]
+            self._schema_cache_put(None, 'tables', tables)
+            return tables
         except Exception as e:
             logging.error(f"Ошибка получения списка таблиц: {str(e)}")
             return []
 
+    @retry_on_connection_loss
     def get_columns(self, table_name: str) -> List[str]:
-
+        cached = self._schema_cache_get(table_name, 'columns')
+        if cached is not None:
+            return cached
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return []
-            cursor = self.connection.cursor()
-            cursor.execute("""
-                SELECT column_name
-                FROM information_schema.columns
-                WHERE table_name = %s
-                ORDER BY ordinal_position
-            """, (table_name,))
-            rows = cursor.fetchall()
-            cursor.close()
-            return [r[0] for r in rows]
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT column_name
+                    FROM information_schema.columns
+                    WHERE table_name = %s
+                    ORDER BY ordinal_position
+                """, (table_name,))
+                rows = cursor.fetchall()
+                cursor.close()
+                columns = [r[0] for r in rows]
+            if columns:
+                self._schema_cache_put(table_name, 'columns', columns)
+            return columns
         except Exception as e:
             logging.error(f"Ошибка получения колонок для таблицы {table_name}: {str(e)}")
             return []
@@ -851,370 +2341,445 @@ class DatabaseManager:
 
     def execute(self, sql: str, params: Optional[Tuple] = None):
 
-        try:
-            if not self.is_connected():
-                if not self.connect():
-                    return None
-            cursor = self.connection.cursor()
-            if params is not None:
-                cursor.execute(sql, params)
-            else:
-                cursor.execute(sql)
-            return cursor
-        except Exception as e:
-            logging.error(f"Ошибка выполнения запроса через DBManager.execute: {e}\nSQL: {sql}")
-            try:
-                cursor.close()
-            except Exception:
-                pass
-            return None
-
-    def get_column_metadata(self, table_name: str, column_name: str) -> Dict[str, Any]:
-
-        try:
-            if not self.is_connected():
-                if not self.connect():
-                    return {}
-            cur = self.connection.cursor()
-            cur.execute("""
-                SELECT
-                  column_name, data_type, is_nullable, column_default, udt_name
-                FROM information_schema.columns
-                WHERE table_schema = 'public' AND table_name = %s AND column_name = %s
-                LIMIT 1
-            """, (table_name, column_name))
-            row = cur.fetchone()
-            meta = {}
-            if row:
-                meta['table'] = table_name
-                meta['column'] = row[0]
-                meta['data_type'] = row[1]
-                meta['is_nullable'] = (row[2] == 'YES')
-                meta['column_default'] = row[3]
-                meta['udt_name'] = row[4]  # внутреннее имя типа (важно для enum)
-            else:
-                try:
-                    cur.close()
-                except Exception:
-                    pass
-                return {}
-
-            # primary key?
-            cur.execute("""
-                SELECT kcu.column_name
-                FROM information_schema.table_constraints tc
-                JOIN information_schema.key_column_usage kcu
-                  ON tc.constraint_name = kcu.constraint_name AND tc.table_schema = kcu.table_schema
-                WHERE tc.table_schema = 'public' AND tc.table_name = %s AND tc.constraint_type = 'PRIMARY KEY'
-                  AND kcu.column_name = %s
-            """, (table_name, column_name))
-            meta['is_primary'] = bool(cur.fetchone())
-
-            cur.execute("""
-                SELECT tc.constraint_name, array_agg(kcu.column_name ORDER BY kcu.ordinal_position)
-                FROM information_schema.table_constraints tc
-                JOIN information_schema.key_column_usage kcu
-                  ON tc.constraint_name = kcu.constraint_name AND tc.table_schema = kcu.table_schema
-                WHERE tc.table_schema = 'public' AND tc.table_name = %s AND tc.constraint_type = 'UNIQUE'
-                  AND kcu.column_name = %s
-                GROUP BY tc.constraint_name
-            """, (table_name, column_name))
-            uniqs = []
-            for cname, cols in cur.fetchall():
-                uniqs.append({'name': cname, 'columns': cols})
-            meta['unique_constraints'] = uniqs
-
-            # check constraints that reference this column in expression (best-effort)
-            cur.execute("""
-                SELECT con.conname,
-                       pg_get_constraintdef(con.oid) as consrc
-                FROM pg_constraint con
-                JOIN pg_class rel ON rel.oid = con.conrelid
-                JOIN pg_namespace nsp ON nsp.oid = con.connamespace
-                WHERE nsp.nspname = 'public' AND rel.relname = %s AND con.contype = 'c'
-                  AND pg_get_constraintdef(con.oid) ILIKE %s
-            """, (table_name, f'%{column_name}%'))
-            checks = []
-            for cname, expr in cur.fetchall():
-                checks.append({'name': cname, 'expr': expr})
-            meta['check_constraints'] = checks
-
-            # foreign keys involving this column (best-effort)
-            cur.execute("""
-                SELECT
-                  tc.constraint_name,
-                  kcu.column_name,
-                  ccu.table_name AS foreign_table_name,
-                  ccu.column_name AS foreign_column_name
-                FROM information_schema.table_constraints tc
-                JOIN information_schema.key_column_usage kcu
-                  ON tc.constraint_name = kcu.constraint_name AND tc.table_schema = kcu.table_schema
-                JOIN information_schema.constraint_column_usage ccu
-                  ON tc.constraint_name = ccu.constraint_name AND tc.table_schema = ccu.constraint_schema
-                WHERE tc.constraint_type = 'FOREIGN KEY' AND tc.table_schema = 'public' AND tc.table_name = %s
-                  AND kcu.column_name = %s
-            """, (table_name, column_name))
-            fks = []
-            for cname, coln, rtable, rcol in cur.fetchall():
-                fks.append({'name': cname, 'columns': [coln], 'ref_table': rtable, 'ref_columns': [rcol]})
-            meta['foreign_keys'] = fks
-
-            enum_vals = []
+        for attempt in range(2):
+            cursor = None
             try:
-                udt = meta.get('udt_name')
-                if udt:
-                    # проверим тип в pg_type: typtype = 'e' (enum)
-                    cur.execute("""
-                        SELECT t.typtype
-                        FROM pg_type t
-                        JOIN pg_namespace nsp ON nsp.oid = t.typnamespace
-                        WHERE t.typname = %s AND nsp.nspname = 'public'
-                        LIMIT 1
-                    """, (udt,))
-                    trow = cur.fetchone()
-                    if trow and trow[0] == 'e':
-                        cur.execute("""
-                            SELECT e.enumlabel
-                            FROM pg_type t
-                            JOIN pg_enum e ON t.oid = e.enumtypid
-                            WHERE t.typname = %s
-                            ORDER BY e.enumsortorder
-                        """, (udt,))
-                        enum_vals = [r[0] for r in cur.fetchall()]
-            except Exception:
-                # best-effort, не ломаем основной вывод
+                if not self.is_connected():
+                    if not self.connect():
+                        return None
+                # прошлый запрос мог оставить транзакцию прерванной — иначе любой следующий упадёт
+                if self.connection.info.transaction_status == TRANSACTION_STATUS_INERROR:
+                    self.connection.rollback()
+                cursor = self.connection.cursor()
+                if params is not None:
+                    cursor.execute(sql, params)
+                else:
+                    cursor.execute(sql)
+                # вызывающий код фиксирует транзакцию сам через connection.commit();
+                # до этого другие соединения пула видят старые данные и не должны перекэшировать их
+                if self.connection.autocommit:
+                    self._note_committed(sql)
+                else:
+                    self.connection.pending_writes.append(sql)
+                return cursor
+            except Exception as e:
                 try:
-                    logging.exception("Не удалось получить enum values")
+                    cursor.close()
                 except Exception:
                     pass
+                lost = isinstance(e, psycopg2.OperationalError) and self.connection is not None and self.connection.closed
+                if lost and attempt == 0:
+                    logging.warning(f"Соединение с БД потеряно, повторное подключение: {e}")
+                    continue
+                logging.error(f"Ошибка выполнения запроса через DBManager.execute: {e}\nSQL: {sql}")
+                return None
 
-            meta['enum_values'] = enum_vals
+    @retry_on_connection_loss
+    def get_table_metadata(self, table_name: str) -> Dict[str, Dict[str, Any]]:
+        """Метаданные всех колонок таблицы за два запроса к pg_catalog (колонка -> meta)"""
+        cached = self._schema_cache_get(table_name, 'metadata')
+        if cached is not None:
+            return cached
+        try:
+            with self.borrow_connection() as conn:
+                cur = conn.cursor()
+                self._execute_prepared(conn, cur, TABLE_COLUMNS_SQL, (table_name,))
+                columns = cur.fetchall()
 
-            try:
+                self._execute_prepared(conn, cur, TABLE_CONSTRAINTS_SQL, (table_name,))
+                constraints = cur.fetchall()
                 cur.close()
-            except Exception:
-                pass
-            return meta
         except Exception as e:
-            logging.exception(f"get_column_metadata error: {e}")
-            try:
-                cur.close()
-            except Exception:
-                pass
+            logging.exception(f"get_table_metadata error: {e}")
             return {}
 
+        result = build_table_metadata(table_name, columns, constraints)
+        if result:
+            self._schema_cache_put(table_name, 'metadata', result)
+        return result
+
+    def get_column_metadata(self, table_name: str, column_name: str) -> Dict[str, Any]:
+        return self.get_table_metadata(table_name).get(column_name, {})
+
+    def open_table_pager(self, table_name: str, batch_size: int = 500) -> TablePager:
+        return TablePager(self, table_name, batch_size)
+
+    def count_table_rows(self, table_name: str, estimate: bool = False) -> Optional[int]:
+        """COUNT(*) по таблице; estimate=True — оценка pg_class.reltuples без чтения таблицы"""
+        if estimate:
+            sql = "SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = to_regclass(%s)"
+            params = (self._quote_ident(table_name),)
+        else:
+            sql, params = f"SELECT COUNT(*) FROM {self._quote_ident(table_name)}", None
+        try:
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, params)
+                row = cursor.fetchone()
+                conn.rollback()
+                cursor.close()
+            return row[0] if row else None
+        except Exception as e:
+            logging.error(f"Ошибка подсчёта строк {table_name}: {str(e)}")
+            return None
+
     def _quote_ident(self, name: str) -> str:
-        return f'"{name.replace("\"", "\"\"")}"'
+        return '"' + name.replace('"', '""') + '"'
 
     def alter_add_column(self, table: str, column: str, data_type: str,
                          nullable: bool = True, default: Optional[str] = None,
                          unique: bool = False, constraint_name: Optional[str] = None) -> bool:
 
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
-            parts = [f'ALTER TABLE {self._quote_ident(table)} ADD COLUMN {self._quote_ident(column)} {data_type}']
-            if default is not None and default != "":
-                parts.append(f"DEFAULT %s")
-                params = [default]
-            else:
-                params = []
-
-            if not nullable:
-                parts.append("NOT NULL")
-            sql = " ".join(parts)
-            cur = self.connection.cursor()
-            if params:
-                cur.execute(sql, tuple(params))
-            else:
-                cur.execute(sql)
-            # unique
-            if unique:
-                cname = constraint_name or f"uniq_{table}_{column}"
-                cur.execute(
-                    f"ALTER TABLE {self._quote_ident(table)} ADD CONSTRAINT {self._quote_ident(cname)} UNIQUE ({self._quote_ident(column)})")
-            self.connection.commit()
-            cur.close()
-            try:
-                self.mark_structure_changed()
-            except Exception:
-                pass
-            return True
+            with self.borrow_connection() as conn:
+                parts = [f'ALTER TABLE {self._quote_ident(table)} ADD COLUMN {self._quote_ident(column)} {data_type}']
+                if default is not None and default != "":
+                    parts.append(f"DEFAULT %s")
+                    params = [default]
+                else:
+                    params = []
+
+                if not nullable:
+                    parts.append("NOT NULL")
+                sql = " ".join(parts)
+                cur = conn.cursor()
+                if params:
+                    cur.execute(sql, tuple(params))
+                else:
+                    cur.execute(sql)
+                # unique
+                if unique:
+                    cname = constraint_name or f"uniq_{table}_{column}"
+                    cur.execute(
+                        f"ALTER TABLE {self._quote_ident(table)} ADD CONSTRAINT {self._quote_ident(cname)} UNIQUE ({self._quote_ident(column)})")
+                conn.commit()
+                cur.close()
+                try:
+                    self.mark_structure_changed(table)
+                except Exception:
+                    pass
+                return True
         except Exception as e:
             logging.exception(f"alter_add_column error: {e}")
-            try:
-                self.connection.rollback()
-            except Exception:
-                pass
             return False
 
     def alter_drop_column(self, table: str, column: str, cascade: bool = True) -> bool:
 
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
-            cur = self.connection.cursor()
-            sql = f"ALTER TABLE {self._quote_ident(table)} DROP COLUMN {self._quote_ident(column)}"
-            if cascade:
-                sql += " CASCADE"
-            cur.execute(sql)
-            self.connection.commit()
-            cur.close()
-            try:
-                self.mark_structure_changed()
-            except Exception:
-                pass
-            return True
+            with self.borrow_connection() as conn:
+                cur = conn.cursor()
+                sql = f"ALTER TABLE {self._quote_ident(table)} DROP COLUMN {self._quote_ident(column)}"
+                if cascade:
+                    sql += " CASCADE"
+                cur.execute(sql)
+                conn.commit()
+                cur.close()
+                try:
+                    self.mark_structure_changed(table)
+                except Exception:
+                    pass
+                return True
         except Exception as e:
             logging.exception(f"alter_drop_column error: {e}")
-            try:
-                self.connection.rollback()
-            except Exception:
-                pass
             return False
 
     def alter_rename_table(self, old_name: str, new_name: str) -> bool:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
-            cur = self.connection.cursor()
-            cur.execute(f"ALTER TABLE {self._quote_ident(old_name)} RENAME TO {self._quote_ident(new_name)}")
-            self.connection.commit()
-            cur.close()
-            try:
-                self.mark_structure_changed()
-            except Exception:
-                pass
-            return True
+            with self.borrow_connection() as conn:
+                cur = conn.cursor()
+                cur.execute(f"ALTER TABLE {self._quote_ident(old_name)} RENAME TO {self._quote_ident(new_name)}")
+                conn.commit()
+                cur.close()
+                try:
+                    self.mark_structure_changed()
+                except Exception:
+                    pass
+                return True
         except Exception as e:
             logging.exception(f"alter_rename_table error: {e}")
-            try:
-                self.connection.rollback()
-            except Exception:
-                pass
             return False
 
     def alter_rename_column(self, table: str, old_col: str, new_col: str) -> bool:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
-            cur = self.connection.cursor()
-            cur.execute(
-                f"ALTER TABLE {self._quote_ident(table)} RENAME COLUMN {self._quote_ident(old_col)} TO {self._quote_ident(new_col)}")
-            self.connection.commit()
-            cur.close()
-            try:
-                self.mark_structure_changed()
-            except Exception:
-                pass
-            return True
+            with self.borrow_connection() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    f"ALTER TABLE {self._quote_ident(table)} RENAME COLUMN {self._quote_ident(old_col)} TO {self._quote_ident(new_col)}")
+                conn.commit()
+                cur.close()
+                try:
+                    self.mark_structure_changed()
+                except Exception:
+                    pass
+                return True
         except Exception as e:
             logging.exception(f"alter_rename_column error: {e}")
-            try:
-                self.connection.rollback()
-            except Exception:
-                pass
             return False
 
 
     def alter_add_constraint(self, table: str, constraint_type: str, details: Dict[str, Any]) -> bool:
 
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
-            cur = self.connection.cursor()
-            if constraint_type == 'NOT NULL':
-                col = details.get('column')
-                cur.execute(f"ALTER TABLE {self._quote_ident(table)} ALTER COLUMN {self._quote_ident(col)} SET NOT NULL")
-            elif constraint_type == 'DEFAULT':
-                col = details.get('column');
-                val = details.get('default')
-                cur.execute(f"ALTER TABLE {self._quote_ident(table)} ALTER COLUMN {self._quote_ident(col)} SET DEFAULT %s",
-                            (val,))
-            elif constraint_type == 'UNIQUE':
-                cols = details.get('columns', [])
-                cname = details.get('name') or f"uniq_{table}_{'_'.join(cols)}"
-                cols_list = ", ".join([self._quote_ident(c) for c in cols])
-                cur.execute(
-                    f"ALTER TABLE {self._quote_ident(table)} ADD CONSTRAINT {self._quote_ident(cname)} UNIQUE ({cols_list})")
-            elif constraint_type == 'CHECK':
-                expr = details.get('expr')
-                cname = details.get('name') or f"chk_{table}"
-                cur.execute(f"ALTER TABLE {self._quote_ident(table)} ADD CONSTRAINT {self._quote_ident(cname)} CHECK ({expr})")
-            elif constraint_type == 'FOREIGN KEY':
-                cols = details.get('columns', [])
-                ref_table = details.get('ref_table')
-                ref_cols = details.get('ref_columns', [])
-                cname = details.get('name') or f"fk_{table}_{'_'.join(cols)}"
-                cols_list = ", ".join([self._quote_ident(c) for c in cols])
-                ref_cols_list = ", ".join([self._quote_ident(c) for c in ref_cols])
-                cur.execute(
-                    f"ALTER TABLE {self._quote_ident(table)} ADD CONSTRAINT {self._quote_ident(cname)} FOREIGN KEY ({cols_list}) REFERENCES {self._quote_ident(ref_table)} ({ref_cols_list})")
-            else:
-                logging.warning(f"Unknown constraint type: {constraint_type}")
-            self.connection.commit()
-            cur.close()
-            try:
-                self.mark_structure_changed()
-            except Exception:
-                pass
-            return True
+            with self.borrow_connection() as conn:
+                cur = conn.cursor()
+                if constraint_type == 'NOT NULL':
+                    col = details.get('column')
+                    cur.execute(f"ALTER TABLE {self._quote_ident(table)} ALTER COLUMN {self._quote_ident(col)} SET NOT NULL")
+                elif constraint_type == 'DEFAULT':
+                    col = details.get('column');
+                    val = details.get('default')
+                    cur.execute(f"ALTER TABLE {self._quote_ident(table)} ALTER COLUMN {self._quote_ident(col)} SET DEFAULT %s",
+                                (val,))
+                elif constraint_type == 'UNIQUE':
+                    cols = details.get('columns', [])
+                    cname = details.get('name') or f"uniq_{table}_{'_'.join(cols)}"
+                    cols_list = ", ".join([self._quote_ident(c) for c in cols])
+                    cur.execute(
+                        f"ALTER TABLE {self._quote_ident(table)} ADD CONSTRAINT {self._quote_ident(cname)} UNIQUE ({cols_list})")
+                elif constraint_type == 'CHECK':
+                    expr = details.get('expr')
+                    cname = details.get('name') or f"chk_{table}"
+                    cur.execute(f"ALTER TABLE {self._quote_ident(table)} ADD CONSTRAINT {self._quote_ident(cname)} CHECK ({expr})")
+                elif constraint_type == 'FOREIGN KEY':
+                    cols = details.get('columns', [])
+                    ref_table = details.get('ref_table')
+                    ref_cols = details.get('ref_columns', [])
+                    cname = details.get('name') or f"fk_{table}_{'_'.join(cols)}"
+                    cols_list = ", ".join([self._quote_ident(c) for c in cols])
+                    ref_cols_list = ", ".join([self._quote_ident(c) for c in ref_cols])
+                    cur.execute(
+                        f"ALTER TABLE {self._quote_ident(table)} ADD CONSTRAINT {self._quote_ident(cname)} FOREIGN KEY ({cols_list}) REFERENCES {self._quote_ident(ref_table)} ({ref_cols_list})")
+                else:
+                    logging.warning(f"Unknown constraint type: {constraint_type}")
+                conn.commit()
+                cur.close()
+                try:
+                    self.mark_structure_changed(table)
+                except Exception:
+                    pass
+                return True
         except Exception as e:
             logging.exception(f"alter_add_constraint error: {e}")
-            try:
-                self.connection.rollback()
-            except Exception:
-                pass
             return False
 
     def alter_drop_constraint(self, table: str, constraint_name: str) -> bool:
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
-            cur = self.connection.cursor()
-            cur.execute(f"ALTER TABLE {self._quote_ident(table)} DROP CONSTRAINT {self._quote_ident(constraint_name)} CASCADE")
-            self.connection.commit()
-            cur.close()
-            try:
-                self.mark_structure_changed()
-            except Exception:
-                pass
-            return True
+            with self.borrow_connection() as conn:
+                cur = conn.cursor()
+                cur.execute(f"ALTER TABLE {self._quote_ident(table)} DROP CONSTRAINT {self._quote_ident(constraint_name)} CASCADE")
+                conn.commit()
+                cur.close()
+                try:
+                    self.mark_structure_changed(table)
+                except Exception:
+                    pass
+                return True
         except Exception as e:
             logging.exception(f"alter_drop_constraint error: {e}")
-            try:
-                self.connection.rollback()
-            except Exception:
-                pass
             return False
 
-    def clear_column_values(self, table: str, column: str) -> bool:
+    def get_index_overview(self) -> Dict[str, Any]:
+        """Индексы, внешние ключи и счётчики сканирований таблиц схемы public.
 
+        {'tables': {таблица: {'seq_scan', 'idx_scan', 'n_live_tup'}},
+         'indexes': {таблица: [[столбцы индекса], ...]}, 'foreign_keys': [(таблица, [столбцы])]}
+        """
+        overview = {'tables': {}, 'indexes': {}, 'foreign_keys': []}
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False
-            cur = self.connection.cursor()
-            cur.execute(f'UPDATE "{table}" SET "{column}" = NULL')
-            self.connection.commit()
-            cur.close()
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT relname, coalesce(seq_scan, 0), coalesce(idx_scan, 0), n_live_tup
+                    FROM pg_stat_user_tables
+                    WHERE schemaname = 'public'
+                """)
+                for table, seq_scan, idx_scan, live_rows in cursor.fetchall():
+                    overview['tables'][table] = {'seq_scan': seq_scan, 'idx_scan': idx_scan, 'n_live_tup': live_rows}
+                # столбцы индекса по порядку; у выражений attnum = 0 — они обрывают список
+                cursor.execute("""
+                    SELECT t.relname, array_agg(a.attname ORDER BY k.ord)
+                    FROM pg_index i
+                    JOIN pg_class t ON t.oid = i.indrelid
+                    JOIN pg_namespace n ON n.oid = t.relnamespace AND n.nspname = 'public'
+                    CROSS JOIN LATERAL unnest(i.indkey::int2[]) WITH ORDINALITY AS k(attnum, ord)
+                    LEFT JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+                    WHERE i.indisvalid
+                    GROUP BY t.relname, i.indexrelid
+                """)
+                for table, columns in cursor.fetchall():
+                    leading = list(itertools.takewhile(lambda c: c is not None, columns))
+                    overview['indexes'].setdefault(table, []).append(leading)
+                cursor.execute("""
+                    SELECT t.relname, array_agg(a.attname ORDER BY k.ord)
+                    FROM pg_constraint c
+                    JOIN pg_class t ON t.oid = c.conrelid
+                    JOIN pg_namespace n ON n.oid = t.relnamespace AND n.nspname = 'public'
+                    CROSS JOIN LATERAL unnest(c.conkey) WITH ORDINALITY AS k(attnum, ord)
+                    JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+                    WHERE c.contype = 'f'
+                    GROUP BY t.relname, c.oid
+                """)
+                overview['foreign_keys'] = [(table, list(columns)) for table, columns in cursor.fetchall()]
+                conn.rollback()
+                cursor.close()
+        except Exception as e:
+            logging.error(f"Ошибка получения сведений об индексах: {str(e)}")
+        return overview
+
+    def create_index_sql(self, table: str, columns: Optional[List[str]] = None, name: Optional[str] = None,
+                         concurrently: bool = True, method: str = 'btree', expressions: Optional[List[str]] = None,
+                         include: Optional[List[str]] = None, where: Optional[str] = None,
+                         unique: bool = False) -> str:
+        """Текст CREATE INDEX; ключ индекса — столбцы columns, затем выражения expressions.
+
+        ValueError — если метод доступа не поддерживает запрошенные возможности.
+        """
+        columns, expressions, include = list(columns or []), list(expressions or []), list(include or [])
+        method = method.lower()
+        if method not in INDEX_METHODS:
+            raise ValueError(f"Неизвестный метод индекса: {method}")
+        if not columns and not expressions:
+            raise ValueError("Нужен хотя бы один столбец или выражение")
+        if method == 'hash' and len(columns) + len(expressions) > 1:
+            raise ValueError("Индекс hash строится только по одному столбцу или выражению")
+        if unique and method != 'btree':
+            raise ValueError("UNIQUE поддерживает только btree")
+        if include and method not in INCLUDE_METHODS:
+            raise ValueError(f"INCLUDE поддерживают только {', '.join(INCLUDE_METHODS)}")
+        name = self._index_name(table, columns, method, name)
+        keys = [self._quote_ident(c) for c in columns] + [f"({e})" for e in expressions]
+        # без IF NOT EXISTS: занятое имя — ошибка, а не молча пропущенная команда
+        sql = (f"CREATE {'UNIQUE ' if unique else ''}INDEX {'CONCURRENTLY ' if concurrently else ''}"
+               f"{self._quote_ident(name)} ON {self._quote_ident(table)} USING {method} ({', '.join(keys)})")
+        if include:
+            sql += f" INCLUDE ({', '.join(self._quote_ident(c) for c in include)})"
+        if where:
+            sql += f" WHERE {where}"
+        return sql
+
+    @staticmethod
+    def _index_name(table: str, columns: List[str], method: str = 'btree', name: Optional[str] = None) -> str:
+        if not name:
+            name = f"idx_{table}_{'_'.join(columns or []) or 'expr'}" + (f"_{method}" if method != 'btree' else "")
+        # имена объектов PostgreSQL не длиннее 63 байт
+        return name.encode('utf-8')[:63].decode('utf-8', 'ignore')
+
+    def _execute_autocommit(self, sql: str):
+        """Команда вне транзакции: CREATE/DROP INDEX CONCURRENTLY нельзя выполнять в блоке транзакции"""
+        with self.borrow_connection() as conn:
+            # autocommit можно включить только вне транзакции
+            conn.rollback()
+            conn.autocommit = True
+            cur = conn.cursor()
             try:
-                self.mark_structure_changed()
+                cur.execute(sql)
+            finally:
+                conn.autocommit = False
+                cur.close()
+
+    def alter_create_index(self, table: str, columns: Optional[List[str]] = None, name: Optional[str] = None,
+                           concurrently: bool = True, **options) -> Tuple[bool, str]:
+        """CREATE INDEX; с concurrently таблица не блокируется на запись, но команда идёт вне транзакции.
+
+        options — method, expressions, include, where, unique (см. create_index_sql).
+        """
+        try:
+            sql = self.create_index_sql(table, columns, name, concurrently, **options)
+        except ValueError as e:
+            return False, str(e)
+        index_name = self._index_name(table, columns, options.get('method', 'btree').lower(), name)
+        try:
+            # иначе откат неудачного CONCURRENTLY ниже мог бы удалить чужой невалидный индекс с тем же именем
+            if self._relation_exists(index_name):
+                return False, f"Имя {index_name} уже занято таблицей, индексом или другим отношением"
+            try:
+                self._execute_autocommit(sql)
             except Exception:
-                pass
-            return True
+                # прерванный CREATE INDEX CONCURRENTLY оставляет невалидный индекс — убираем его
+                if concurrently and self._index_is_invalid(index_name):
+                    self._execute_autocommit(f"DROP INDEX CONCURRENTLY IF EXISTS {self._quote_ident(index_name)}")
+                raise
+            self.mark_structure_changed(table)
+            logging.info(f"Создан индекс {index_name} на {table}")
+            return True, ""
+        except Exception as e:
+            logging.error(f"Ошибка создания индекса {index_name}: {str(e)}")
+            return False, str(e).strip()
+
+    def _relation_exists(self, name: str) -> bool:
+        with self.borrow_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL", (self._quote_ident(name),))
+            row = cur.fetchone()
+            conn.rollback()
+            cur.close()
+        return bool(row and row[0])
+
+    def _index_is_invalid(self, index_name: str) -> bool:
+        with self.borrow_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)",
+                        (self._quote_ident(index_name),))
+            row = cur.fetchone()
+            conn.rollback()
+            cur.close()
+        return bool(row and row[0])
+
+    def alter_drop_index(self, table: str, index_name: str, concurrently: bool = True) -> Tuple[bool, str]:
+        """DROP INDEX; индекс первичного ключа или UNIQUE удаляется вместе с ограничением («Удалить ограничение»)"""
+        sql = f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {self._quote_ident(index_name)}"
+        try:
+            self._execute_autocommit(sql)
+            self.mark_structure_changed(table)
+            logging.info(f"Удалён индекс {index_name}")
+            return True, ""
+        except Exception as e:
+            logging.error(f"Ошибка удаления индекса {index_name}: {str(e)}")
+            return False, str(e).strip()
+
+    def get_table_indexes(self, table: str) -> List[Dict[str, Any]]:
+        """Индексы таблицы с размером и счётчиками pg_stat_user_indexes"""
+        try:
+            with self.borrow_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT c.relname, am.amname, pg_relation_size(i.indexrelid), coalesce(s.idx_scan, 0),
+                           coalesce(s.idx_tup_read, 0), coalesce(s.idx_tup_fetch, 0),
+                           i.indisunique, i.indisprimary, i.indisvalid, con.conname,
+                           pg_get_indexdef(i.indexrelid)
+                    FROM pg_index i
+                    JOIN pg_class c ON c.oid = i.indexrelid
+                    JOIN pg_am am ON am.oid = c.relam
+                    LEFT JOIN pg_stat_user_indexes s ON s.indexrelid = i.indexrelid
+                    LEFT JOIN pg_constraint con ON con.conindid = i.indexrelid AND con.contype IN ('p', 'u', 'x')
+                    WHERE i.indrelid = to_regclass(%s)
+                    ORDER BY c.relname
+                """, (self._quote_ident(table),))
+                rows = cursor.fetchall()
+                conn.rollback()
+                cursor.close()
+            keys = ('name', 'method', 'size', 'idx_scan', 'tup_read', 'tup_fetch',
+                    'unique', 'primary', 'valid', 'constraint', 'definition')
+            return [dict(zip(keys, row)) for row in rows]
+        except Exception as e:
+            logging.error(f"Ошибка получения индексов таблицы {table}: {str(e)}")
+            return []
+
+    def clear_column_values(self, table: str, column: str) -> bool:
+
+        try:
+            with self.borrow_connection() as conn:
+                cur = conn.cursor()
+                cur.execute(f'UPDATE "{table}" SET "{column}" = NULL')
+                conn.commit()
+                cur.close()
+                try:
+                    self.mark_structure_changed(table)
+                except Exception:
+                    pass
+                return True
         except Exception as e:
             logging.exception(f"clear_column_values error: {e}")
-            try:
-                self.connection.rollback()
-            except Exception:
-                pass
             return False
 
     def alter_change_type(self, table: str, column: str, new_type: str,
@@ -1225,100 +2790,97 @@ class DatabaseManager:
                           drop_constraints_first: bool = True) -> (bool, str):
 
         try:
-            if not self.is_connected():
-                if not self.connect():
-                    return False, "Нет подключения к базе."
-
             meta = {}
             try:
                 meta = self.get_column_metadata(table, column) or {}
             except Exception:
                 meta = {}
 
-            cur = self.connection.cursor()
-
-            if drop_constraints_first:
+            with self.borrow_connection() as conn:
+                cur = conn.cursor()
+
+                if drop_constraints_first:
+                    try:
+                        for fk in meta.get('foreign_keys', []) or []:
+                            try:
+                                cur.execute(f'ALTER TABLE "{table}" DROP CONSTRAINT "{fk["name"]}" CASCADE')
+                            except Exception:
+                                logging.debug("Не удалось удалить FK %s", fk.get('name'))
+                        for uq in meta.get('unique_constraints', []) or []:
+                            try:
+                                cur.execute(f'ALTER TABLE "{table}" DROP CONSTRAINT "{uq["name"]}" CASCADE')
+                            except Exception:
+                                logging.debug("Не удалось удалить UNIQUE %s", uq.get('name'))
+                        for chk in meta.get('check_constraints', []) or []:
+                            try:
+                                cur.execute(f'ALTER TABLE "{table}" DROP CONSTRAINT "{chk["name"]}" CASCADE')
+                            except Exception:
+                                logging.debug("Не удалось удалить CHECK %s", chk.get('name'))
+                        if not meta.get('is_nullable', True):
+                            try:
+                                cur.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{column}" DROP NOT NULL')
+                            except Exception:
+                                logging.debug("Не удалось снять NOT NULL")
+                        if meta.get('column_default') is not None:
+                            try:
+                                cur.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{column}" DROP DEFAULT')
+                            except Exception:
+                                logging.debug("Не удалось снять DEFAULT")
+                    except Exception:
+                        logging.exception("Ошибка при удалении ограничений (best-effort)")
+
+                # Attempt change type
                 try:
-                    for fk in meta.get('foreign_keys', []) or []:
-                        try:
-                            cur.execute(f'ALTER TABLE "{table}" DROP CONSTRAINT "{fk["name"]}" CASCADE')
-                        except Exception:
-                            logging.debug("Не удалось удалить FK %s", fk.get('name'))
-                    for uq in meta.get('unique_constraints', []) or []:
-                        try:
-                            cur.execute(f'ALTER TABLE "{table}" DROP CONSTRAINT "{uq["name"]}" CASCADE')
-                        except Exception:
-                            logging.debug("Не удалось удалить UNIQUE %s", uq.get('name'))
-                    for chk in meta.get('check_constraints', []) or []:
-                        try:
-                            cur.execute(f'ALTER TABLE "{table}" DROP CONSTRAINT "{chk["name"]}" CASCADE')
-                        except Exception:
-                            logging.debug("Не удалось удалить CHECK %s", chk.get('name'))
-                    if not meta.get('is_nullable', True):
-                        try:
-                            cur.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{column}" DROP NOT NULL')
-                        except Exception:
-                            logging.debug("Не удалось снять NOT NULL")
-                    if meta.get('column_default') is not None:
-                        try:
-                            cur.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{column}" DROP DEFAULT')
-                        except Exception:
-                            logging.debug("Не удалось снять DEFAULT")
-                except Exception:
-                    logging.exception("Ошибка при удалении ограничений (best-effort)")
+                    # USING expression: "col"::new_type  (без пробела после ::)
+                    using_expr = f'"{column}"::{new_type}'
+                    cur.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{column}" TYPE {new_type} USING {using_expr}')
+                except Exception as e:
+                    # Commit nothing, return message so UI может предложить игру очистки колонки
+                    err = str(e)
+                    try:
+                        cur.close()
+                    except Exception:
+                        pass
+                    logging.exception("alter_change_type failed: %s", err)
+                    return False, err
+
+                # Apply new options
+                try:
+                    if new_default is not None:
+                        # new_default: raw literal (user must provide correct SQL literal)
+                        cur.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{column}" SET DEFAULT {new_default}')
+                    if new_not_null:
+                        cur.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{column}" SET NOT NULL')
+                    if new_unique:
+                        cname = f'uniq_{table}_{column}'
+                        cur.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{cname}" UNIQUE ("{column}")')
+                    if new_fk:
+                        ref_table = new_fk.get('ref_table')
+                        ref_cols = new_fk.get('ref_columns') or []
+                        cname = new_fk.get('constraint_name') or f'fk_{table}_{column}'
+                        if ref_table and ref_cols:
+                            cur.execute(
+                                f'ALTER TABLE "{table}" ADD CONSTRAINT "{cname}" FOREIGN KEY ("{column}") REFERENCES "{ref_table}" ("{ref_cols[0]}")')
+                except Exception as e:
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        pass
+                    logging.exception("apply post-type-change options failed: %s", e)
+                    return False, str(e)
 
-            # Attempt change type
-            try:
-                # USING expression: "col"::new_type  (без пробела после ::)
-                using_expr = f'"{column}"::{new_type}'
-                cur.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{column}" TYPE {new_type} USING {using_expr}')
-            except Exception as e:
-                # Commit nothing, return message so UI может предложить игру очистки колонки
-                err = str(e)
                 try:
-                    cur.close()
-                except Exception:
-                    pass
-                logging.exception("alter_change_type failed: %s", err)
-                return False, err
+                    conn.commit()
+                except Exception as e:
+                    logging.exception("commit failed after type change: %s", e)
+                    return False, str(e)
 
-            # Apply new options
-            try:
-                if new_default is not None:
-                    # new_default: raw literal (user must provide correct SQL literal)
-                    cur.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{column}" SET DEFAULT {new_default}')
-                if new_not_null:
-                    cur.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{column}" SET NOT NULL')
-                if new_unique:
-                    cname = f'uniq_{table}_{column}'
-                    cur.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{cname}" UNIQUE ("{column}")')
-                if new_fk:
-                    ref_table = new_fk.get('ref_table')
-                    ref_cols = new_fk.get('ref_columns') or []
-                    cname = new_fk.get('constraint_name') or f'fk_{table}_{column}'
-                    if ref_table and ref_cols:
-                        cur.execute(
-                            f'ALTER TABLE "{table}" ADD CONSTRAINT "{cname}" FOREIGN KEY ("{column}") REFERENCES "{ref_table}" ("{ref_cols[0]}")')
-            except Exception as e:
                 try:
-                    self.connection.rollback()
+                    self.mark_structure_changed(table)
                 except Exception:
                     pass
-                logging.exception("apply post-type-change options failed: %s", e)
-                return False, str(e)
 
-            try:
-                self.connection.commit()
-            except Exception as e:
-                logging.exception("commit failed after type change: %s", e)
-                return False, str(e)
-
-            try:
-                self.mark_structure_changed()
-            except Exception:
-                pass
-
-            return True, ""
+                return True, ""
 
         except Exception as e:  # Добавлен внешний except
             logging.exception("Unexpected error in alter_change_type: %s", e)
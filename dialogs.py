@@ -1,20 +1,25 @@
+import asyncio
 from typing import List, Tuple, Any, Optional, Dict
 
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout,
                                QLineEdit, QPushButton, QLabel, QTextEdit, QComboBox,
-                               QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
+                               QTableView, QMessageBox,
                                QTabWidget, QWidget, QGroupBox, QInputDialog, QDoubleSpinBox, QCheckBox, QDateEdit,
                                QDateTimeEdit, QTimeEdit, QSpinBox)
 from PySide6.QtCore import Qt, QDate, QDateTime, QTime
 import logging
 
+from export_dialog import export_query_to_file
+from result_model import create_result_view
+from query_executor import QueryExecutor
+
 
 class ConnectionDialog(QDialog):
     def __init__(self, db_manager, parent=None):
         super().__init__(parent)
         self.db_manager = db_manager
         self.setWindowTitle("Подключение к Базе Данных")
-        self.setFixedSize(600, 350)
+        self.setFixedSize(600, 410)
         self.setup_ui()
         self.load_current_params()
 
@@ -51,6 +56,17 @@ class ConnectionDialog(QDialog):
 
         layout.addLayout(buttons_layout)
 
+        self.summary_check = QCheckBox("Сводка по транзакциям (итоги без пересчёта всей таблицы)")
+        self.summary_check.setToolTip("Таблица итогов по точкам и дням, обновляемая триггерами на transactions")
+        self.summary_check.setEnabled(False)
+        self.summary_check.toggled.connect(self.on_summary_toggled)
+        layout.addWidget(self.summary_check)
+
+        self.cache_check = QCheckBox("Кэшировать результаты запросов на чтение")
+        self.cache_check.setChecked(self.db_manager.result_cache_enabled)
+        self.cache_check.toggled.connect(self.on_cache_toggled)
+        layout.addWidget(self.cache_check)
+
         self.status_label = QLabel("Не подключено")
         self.status_label.setAlignment(Qt.AlignCenter)
         self.status_label.setStyleSheet("color: #d9534f; font-weight: bold;")
@@ -65,6 +81,35 @@ class ConnectionDialog(QDialog):
         self.dbname_input.setText(params.get('dbname'))
         self.user_input.setText(params.get('user'))
         self.password_input.setText(params.get('password'))
+        self._load_summary_state()
+        self._update_cache_stats()
+
+    def on_cache_toggled(self, checked: bool):
+        self.db_manager.set_result_cache_enabled(checked)
+        self._update_cache_stats()
+
+    def _update_cache_stats(self):
+        stats = self.db_manager.result_cache_stats()
+        self.cache_check.setToolTip(
+            "Повторные запросы берутся из памяти; запись в таблицу через приложение сбрасывает её результаты.\n"
+            f"Попаданий: {stats['hits']}, промахов: {stats['misses']}, вытеснено: {stats['evictions']}, "
+            f"сброшено: {stats['invalidations']}, записей: {stats['entries']} ({stats['bytes'] / 1024:.0f} КБ)")
+
+    def _load_summary_state(self):
+        connected = self.db_manager.is_connected()
+        self.summary_check.blockSignals(True)
+        self.summary_check.setChecked(connected and self.db_manager.is_transaction_summary_enabled())
+        self.summary_check.blockSignals(False)
+        self.summary_check.setEnabled(connected)
+
+    def on_summary_toggled(self, checked: bool):
+        if checked:
+            ok = self.db_manager.enable_transaction_summary()
+        else:
+            ok = self.db_manager.disable_transaction_summary()
+        if not ok:
+            QMessageBox.warning(self, "Ошибка", "Не удалось изменить режим сводки по транзакциям")
+        self._load_summary_state()
 
     def connect(self):
         params = {
@@ -83,6 +128,7 @@ class ConnectionDialog(QDialog):
         else:
             self.status_label.setText("Ошибка подключения")
             self.status_label.setStyleSheet("color: #d9534f; font-weight: bold;")
+        self._load_summary_state()
 
     def recreate_tables(self):
         dialog = RecreateTablesDialog(self.db_manager, self)
@@ -239,12 +285,14 @@ class EditDataDialog(QDialog):
             except Exception:
                 pass
 
+        try:
+            table_meta = self.db_manager.get_table_metadata(self.current_table) or {}
+        except Exception:
+            logging.exception("get_table_metadata failed for %s", self.current_table)
+            table_meta = {}
+
         for col in cols:
-            try:
-                meta = self.db_manager.get_column_metadata(self.current_table, col) or {}
-            except Exception:
-                logging.exception("get_column_metadata failed for %s.%s", self.current_table, col)
-                meta = {}
+            meta = table_meta.get(col) or {}
 
             is_pk = bool(meta.get('is_primary'))
 
@@ -555,14 +603,29 @@ class EditDataDialog(QDialog):
 
 
 class DataViewDialog(QDialog):
-    def __init__(self, db_manager, parent=None):
+    def __init__(self, db_manager, parent=None, async_db=None):
 
         super().__init__(parent)
         self.db_manager = db_manager
+        # AsyncDatabaseManager (если запущен qasync): строки открытой вкладки считаются корутиной, без потока
+        self.async_db = async_db
+        self._count_tasks = set()
         self.setWindowTitle("Просмотр данных")
         self.setMinimumSize(900, 700)
 
         self.schema = {}
+        # порционная загрузка: каждая порция — короткий запрос на соединении из пула (TablePager),
+        # первая порция и подсчёт строк выполняются в потоках QueryExecutor
+        self.batch_size = 500
+        self.streams = {}
+        self.row_totals = {}
+        self.page_size = 100
+        self.pages = {}
+        self.executor = QueryExecutor(db_manager, self)
+        # вкладки, чья первая порция ещё читается: таблица -> номер загрузки
+        self._loading = {}
+        self._load_seq = 0
+        self._counting = set()
 
         self.setup_ui()
         try:
@@ -614,14 +677,19 @@ class DataViewDialog(QDialog):
         refresh_structure_btn.clicked.connect(self.refresh_table_structure)
         refresh_btn = QPushButton("Обновить данные")
         refresh_btn.clicked.connect(self.load_data)
+        refresh_tab_btn = QPushButton("Обновить вкладку")
+        refresh_tab_btn.setToolTip("Перечитать данные только текущей таблицы")
+        refresh_tab_btn.clicked.connect(lambda: self.refresh_tab())
 
         top_row.addWidget(refresh_structure_btn)
         top_row.addWidget(refresh_btn)
+        top_row.addWidget(refresh_tab_btn)
         top_row.addStretch()
         layout.addLayout(top_row)
 
         # Вкладки с таблицами
         self.tabs = QTabWidget()
+        self.tabs.currentChanged.connect(self.on_tab_changed)
         layout.addWidget(self.tabs)
 
     # --- Создание вкладки для таблицы ---
@@ -636,18 +704,114 @@ class DataViewDialog(QDialog):
         edit_btn = QPushButton("Редактировать")
         edit_btn.clicked.connect(lambda: self.open_edit_dialog(table_name))
         header_layout.addWidget(edit_btn)
+        export_btn = QPushButton("Экспорт CSV")
+        export_btn.setToolTip("Выгрузить всю таблицу в CSV через COPY")
+        export_btn.clicked.connect(lambda: export_query_to_file(
+            self, self.db_manager, f"SELECT * FROM {_quote_ident(table_name)}", table_name))
+        header_layout.addWidget(export_btn)
         header_layout.addStretch()
+        rows_label = QLabel("")
+        rows_label.setObjectName("rows_label")
+        header_layout.addWidget(rows_label)
         vlay.addLayout(header_layout)
 
-        table = QTableWidget(0, len(headers))
-        table.setHorizontalHeaderLabels(headers)
-        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        table = create_result_view(placeholder="Нет данных", stretch=True)
         table.verticalHeader().setDefaultSectionSize(28)
+        table.model().set_result([], headers)
+        table.model().fetch_runner = self.executor.run_call
+        table.model().batch_fetched.connect(lambda _count: self.on_batch_fetched(table_name))
 
         vlay.addWidget(table)
 
+        # постраничный просмотр по ключу
+        pager = QHBoxLayout()
+        paging_check = QCheckBox("Постранично")
+        paging_check.setObjectName("paging_check")
+        paging_check.toggled.connect(lambda checked: self.on_paging_toggled(table_name, checked))
+        page_size = QSpinBox()
+        page_size.setObjectName("page_size")
+        page_size.setRange(10, 10000)
+        page_size.setValue(self.page_size)
+        page_size.setSuffix(" строк")
+        prev_btn = QPushButton("◀ Назад")
+        prev_btn.setObjectName("prev_page_btn")
+        prev_btn.setEnabled(False)
+        prev_btn.clicked.connect(lambda: self.prev_page(table_name))
+        next_btn = QPushButton("Вперёд ▶")
+        next_btn.setObjectName("next_page_btn")
+        next_btn.setEnabled(False)
+        next_btn.clicked.connect(lambda: self.next_page(table_name))
+        pager.addWidget(paging_check)
+        pager.addWidget(page_size)
+        pager.addStretch()
+        pager.addWidget(prev_btn)
+        pager.addWidget(next_btn)
+        vlay.addLayout(pager)
+
         return widget
 
+    def on_paging_toggled(self, table_name: str, checked: bool):
+        if not checked:
+            self.pages.pop(table_name, None)
+            self._update_pager(table_name)
+            self.refresh_tab(table_name)
+            return
+
+        if not self.db_manager.get_primary_key(table_name):
+            QMessageBox.information(self, "Постраничный просмотр",
+                                    f"У таблицы '{table_name}' нет первичного ключа — постраничный просмотр недоступен.")
+            index = self._tab_index(table_name)
+            check = self.tabs.widget(index).findChild(QCheckBox, "paging_check")
+            check.blockSignals(True)
+            check.setChecked(False)
+            check.blockSignals(False)
+            return
+
+        stream = self.streams.get(table_name)
+        if stream is not None:
+            stream.close()
+        # None в streams — вкладка загружена, но без серверного курсора
+        self.streams[table_name] = None
+        self.pages[table_name] = {'keys': [None], 'next': None}
+        self.load_page(table_name)
+
+    def load_page(self, table_name: str):
+        state = self.pages.get(table_name)
+        index = self._tab_index(table_name)
+        if state is None or index < 0:
+            return
+        tab = self.tabs.widget(index)
+        limit = tab.findChild(QSpinBox, "page_size").value()
+        cols, rows, next_key = self.db_manager.fetch_page(table_name, state['keys'][-1], limit)
+        state['next'] = next_key
+        tab.findChild(QTableView).model().set_result(rows, cols or self.schema.get(table_name) or [])
+        self._update_pager(table_name)
+
+    def next_page(self, table_name: str):
+        state = self.pages.get(table_name)
+        if state is None or state['next'] is None:
+            return
+        state['keys'].append(state['next'])
+        self.load_page(table_name)
+
+    def prev_page(self, table_name: str):
+        state = self.pages.get(table_name)
+        if state is None or len(state['keys']) < 2:
+            return
+        state['keys'].pop()
+        self.load_page(table_name)
+
+    def _update_pager(self, table_name: str):
+        index = self._tab_index(table_name)
+        if index < 0:
+            return
+        tab = self.tabs.widget(index)
+        state = self.pages.get(table_name)
+        tab.findChild(QPushButton, "prev_page_btn").setEnabled(bool(state) and len(state['keys']) > 1)
+        tab.findChild(QPushButton, "next_page_btn").setEnabled(bool(state) and state['next'] is not None)
+        if state:
+            tab.findChild(QLabel, "rows_label").setText(f"Страница {len(state['keys'])}")
+
     def open_edit_dialog(self, table_name: str):
 
         cols = self.schema.get(table_name) or []
@@ -663,12 +827,9 @@ class DataViewDialog(QDialog):
 
         pk_columns = []
         try:
+            table_meta = self.db_manager.get_table_metadata(table_name) or {}
             for c in cols:
-                try:
-                    meta = self.db_manager.get_column_metadata(table_name, c) or {}
-                except Exception:
-                    meta = {}
-                if meta.get('is_primary'):
+                if (table_meta.get(c) or {}).get('is_primary'):
                     pk_columns.append(c)
         except Exception:
             pk_columns = []
@@ -728,9 +889,9 @@ class DataViewDialog(QDialog):
                                 action_type, row_id = dlg.get_action_info()
                                 self.handle_table_action(table_name, action_type, row_id)
                             except Exception:
-                                self.load_data()
+                                self.refresh_tab(table_name)
                         else:
-                            self.load_data()
+                            self.refresh_tab(table_name)
                     return
                 except Exception:
                     logging.exception("Запуск EditDataDialog завершился ошибкой, fallback к просмотру")
@@ -771,110 +932,246 @@ class DataViewDialog(QDialog):
 
                 if deleted:
                     QMessageBox.information(self, "Успех", f"Строка {row_id} удалена из таблицы '{table_name}'")
-                    self.load_data()
+                    self.refresh_tab(table_name)
                 else:
                     QMessageBox.warning(self, "Ошибка", f"Не удалось удалить строку {row_id} из таблицы '{table_name}'")
 
             elif action_type == 'edit':
-                self.load_data()
+                self.refresh_tab(table_name)
 
         except Exception as e:
             logging.exception(f"Ошибка обработки действия: {e}")
             QMessageBox.warning(self, "Ошибка", f"Ошибка: {e}")
 
     def load_data(self):
-
+        """Создаёт вкладки по списку таблиц; данные вкладки читаются при её первом открытии"""
         try:
             try:
                 tables = self.db_manager.list_tables() or []
             except Exception:
                 tables = []
 
-            self.tabs.clear()
-            self.schema = {}
-
-            for table_name in tables:
-                # получаем колонки
-                try:
-                    cols = self.db_manager.get_columns(table_name) or []
-                except Exception:
-                    # попытка через get_table()
-                    try:
-                        tobj = self.db_manager.get_table(table_name)
-                        cols = [c.name for c in getattr(tobj, "columns", [])] if tobj is not None else []
-                    except Exception:
-                        cols = []
-
-                # если нет колонок — пропустить
-                if not cols:
-                    cols = []
+            self.tabs.blockSignals(True)
+            try:
+                self.tabs.clear()
+                self.schema = {}
+                self.pages = {}
+                self.close_streams()
 
-                # сохраняем в схеме
-                self.schema[table_name] = cols
+                for table_name in tables:
+                    self.tabs.addTab(self.create_table_tab(table_name, []), table_name)
+            finally:
+                self.tabs.blockSignals(False)
 
-                # создаём вкладку и таблицу
-                tab = self.create_table_tab(table_name, cols)
-                self.tabs.addTab(tab, table_name)
+            self.on_tab_changed(self.tabs.currentIndex())
 
-                # находим QTableWidget внутри вкладки и наполняем данными
-                table_widget = tab.findChild(QTableWidget)
-                if table_widget is None:
-                    continue
+        except Exception as e:
+            logging.exception(f"Ошибка загрузки данных: {e}")
+            QMessageBox.warning(self, "Ошибка", f"Не удалось загрузить данные: {e}")
 
-                # получить данные
-                rows = []
-                try:
-                    cur = self.db_manager.execute(f"SELECT * FROM {table_name}")
-                    if cur:
-                        try:
-                            rows = cur.fetchall()
-                            desc = getattr(cur, "description", None)
-                            if desc and (not cols):
-                                cols = [d[0] for d in desc]
-                                # обновим заголовки в виджете
-                                table_widget.setColumnCount(len(cols))
-                                table_widget.setHorizontalHeaderLabels(cols)
-                                self.schema[table_name] = cols
-                        except Exception:
-                            rows = []
-                        finally:
-                            try:
-                                cur.close()
-                            except Exception:
-                                pass
-                except Exception:
-                    rows = []
+    def start_row_count(self, table_name: str):
+        """COUNT(*) для вкладки; вызывается только для открытой вкладки, а не для всех таблиц сразу"""
+        if table_name in self.row_totals or table_name in self._counting:
+            return
+        self._counting.add(table_name)
+        if self.async_db is None:
+            self._count_in_pool(table_name)
+            return
+        task = asyncio.ensure_future(self._count_rows_async(table_name))
+        self._count_tasks.add(task)
+        task.add_done_callback(self._count_tasks.discard)
 
-                # наполнение таблицы
-                self.load_table_data(table_widget, rows, cols)
+    def _count_in_pool(self, table_name: str):
+        self.executor.run_call(lambda: self.db_manager.count_table_rows(table_name),
+                               finished=lambda total, t=table_name: self.on_row_counted(t, total),
+                               error=lambda _msg, t=table_name: self._counting.discard(t))
 
+    async def _count_rows_async(self, table_name: str):
+        try:
+            total = await self.async_db.count_rows(table_name)
         except Exception as e:
-            logging.exception(f"Ошибка загрузки данных: {e}")
-            QMessageBox.warning(self, "Ошибка", f"Не удалось загрузить данные: {e}")
+            logging.error(f"Ошибка асинхронного подсчёта строк {table_name}: {str(e)}")
+            total = None
+        if total is None and table_name in self._counting:
+            # асинхронный пул недоступен — считаем в потоке пула
+            self._count_in_pool(table_name)
+            return
+        self.on_row_counted(table_name, total)
 
-    def load_table_data(self, table: QTableWidget, data: List[Tuple], columns: List[str]):
+    def on_row_counted(self, table_name: str, total: Optional[int]):
+        if table_name not in self._counting:
+            # диалог перезагружен или закрыт, пока шёл подсчёт
+            return
+        self._counting.discard(table_name)
+        if total is not None:
+            self.row_totals[table_name] = total
+            self._update_rows_label(table_name)
 
-        table.verticalHeader().setDefaultSectionSize(28)
-        if not data:
-            table.setRowCount(1)
-            if table.columnCount() == 0:
-                table.setColumnCount(max(1, len(columns)))
-            no_item = QTableWidgetItem("Нет данных")
-            no_item.setFlags(no_item.flags() & ~Qt.ItemIsEditable)
-            table.setItem(0, 0, no_item)
+    def on_tab_changed(self, index: int):
+        if index < 0:
+            return
+        self.ensure_tab_loaded(index)
+        if self.streams.get(self.tabs.tabText(index)) is not None:
+            self.start_row_count(self.tabs.tabText(index))
+        # соседняя вкладка читается в фоне, пока пользователь смотрит текущую
+        self.ensure_tab_loaded(index + 1)
+
+    def _tab_index(self, table_name: str) -> int:
+        for i in range(self.tabs.count()):
+            if self.tabs.tabText(i) == table_name:
+                return i
+        return -1
+
+    def refresh_tab(self, table_name: Optional[str] = None):
+        """Перечитать данные одной вкладки (по умолчанию текущей)"""
+        if table_name is None:
+            table_name = self.tabs.tabText(self.tabs.currentIndex())
+        index = self._tab_index(table_name)
+        if index < 0:
+            return
+        if table_name in self.pages:
+            self.load_page(table_name)
+            return
+        stream = self.streams.pop(table_name, None)
+        if stream is not None:
+            stream.close()
+        self._loading.pop(table_name, None)
+        self._counting.discard(table_name)
+        self.row_totals.pop(table_name, None)
+        self.ensure_tab_loaded(index)
+
+    def ensure_tab_loaded(self, index: int):
+        if index < 0 or index >= self.tabs.count():
+            return
+        table_name = self.tabs.tabText(index)
+        if table_name in self.streams or table_name in self._loading:
+            return
+
+        table_widget = self.tabs.widget(index).findChild(QTableView)
+        if table_widget is None:
             return
 
-        if table.columnCount() != len(columns):
-            table.setColumnCount(len(columns))
-            table.setHorizontalHeaderLabels(columns)
+        # получаем колонки
+        try:
+            cols = self.db_manager.get_columns(table_name) or []
+        except Exception:
+            cols = []
+
+        sql = f"SELECT * FROM {_quote_ident(table_name)}"
+        cached = self.db_manager.cached_result(sql)
+        if cached is not None:
+            cached_cols, rows = cached
+            self.streams[table_name] = None
+            self.row_totals[table_name] = len(rows)
+            self.schema[table_name] = cols or cached_cols
+            table_widget.model().set_result(rows, self.schema[table_name])
+            self._update_rows_label(table_name)
+            return
 
-        table.setRowCount(len(data))
-        for row_idx, row in enumerate(data):
-            for col_idx in range(len(columns)):
-                val = row[col_idx] if col_idx < len(row) else None
-                item = QTableWidgetItem(str(val) if val is not None else "")
-                item.setFlags(item.flags() & ~Qt.ItemIsEditable)
-                table.setItem(row_idx, col_idx, item)
+        # первая порция читается в потоке пула, окно остаётся отзывчивым
+        self._load_seq += 1
+        self._loading[table_name] = self._load_seq
+        self.schema[table_name] = cols
+        label = self.tabs.widget(index).findChild(QLabel, "rows_label")
+        if label is not None:
+            label.setText("Загрузка...")
+
+        def load():
+            pager = self.db_manager.open_table_pager(table_name, self.batch_size)
+            return pager, pager.fetch_batch()
+
+        seq = self._load_seq
+        self.executor.run_call(load,
+                               finished=lambda result, t=table_name: self.on_first_batch(t, seq, *result),
+                               error=lambda msg, t=table_name: self.on_first_batch_failed(t, seq, msg))
+
+    def on_first_batch(self, table_name: str, seq: int, pager, rows: List[Tuple]):
+        if self._loading.get(table_name) != seq:
+            # вкладку успели перечитать или диалог закрыт
+            pager.close()
+            return
+        del self._loading[table_name]
+        index = self._tab_index(table_name)
+        if index < 0:
+            pager.close()
+            return
+        cols = self.schema.get(table_name) or pager.columns
+        self.streams[table_name] = pager
+        self.schema[table_name] = cols
+
+        # следующие порции модель запросит сама при прокрутке
+        model = self.tabs.widget(index).findChild(QTableView).model()
+        model.set_result(rows, cols, pager)
+        self._update_rows_label(table_name)
+        self._cache_if_complete(table_name)
+        if pager.exhausted:
+            self.row_totals.setdefault(table_name, pager.fetched)
+            self._update_rows_label(table_name)
+        elif index == self.tabs.currentIndex():
+            # COUNT(*) только для вкладки, которую смотрят; соседняя посчитается при переходе на неё
+            self.start_row_count(table_name)
+
+    def on_first_batch_failed(self, table_name: str, seq: int, message: str):
+        if self._loading.get(table_name) != seq:
+            return
+        del self._loading[table_name]
+        index = self._tab_index(table_name)
+        if index < 0:
+            return
+        self.streams[table_name] = None
+        label = self.tabs.widget(index).findChild(QLabel, "rows_label")
+        if label is not None:
+            label.setText(f"Ошибка чтения: {message}")
+
+    def on_batch_fetched(self, table_name: str):
+        self._update_rows_label(table_name)
+        self._cache_if_complete(table_name)
+
+    def _cache_if_complete(self, table_name: str):
+        # в кэш попадает только таблица, прочитанная до конца и без записей в неё с первой порции
+        stream = self.streams.get(table_name)
+        if stream is None or not stream.exhausted:
+            return
+        index = self._tab_index(table_name)
+        model = self.tabs.widget(index).findChild(QTableView).model()
+        self.db_manager.cache_result(f"SELECT * FROM {_quote_ident(table_name)}", None, model.columns(), model.rows(),
+                                     stream.generation)
+
+    def _update_rows_label(self, table_name: str):
+        index = self._tab_index(table_name)
+        if index < 0:
+            return
+        label = self.tabs.widget(index).findChild(QLabel, "rows_label")
+        stream = self.streams.get(table_name)
+        total = self.row_totals.get(table_name)
+        if label is None or table_name in self.pages:
+            return
+        if total is None:
+            if stream is not None:
+                label.setText(f"Загружено {stream.fetched}")
+            return
+        if stream is not None:
+            label.setText(f"Загружено {stream.fetched} из {total}")
+        elif table_name in self.streams:
+            label.setText(f"Загружено {total} из {total} (из кэша)")
+        else:
+            label.setText(f"Строк: {total}")
+
+    def close_streams(self):
+        for stream in self.streams.values():
+            if stream is not None:
+                stream.close()
+        self.streams = {}
+        self.row_totals = {}
+        # результаты фоновых загрузок и подсчётов, ещё не вернувшихся из пула, будут отброшены
+        self._loading = {}
+        self._counting = set()
+
+    def done(self, result):
+        for task in list(self._count_tasks):
+            task.cancel()
+        self.close_streams()
+        super().done(result)
 
 def _quote_ident(name: str) -> str:
     return '"' + name.replace('"', '""') + '"'
@@ -947,12 +1244,14 @@ class AddDataDialog(QDialog):
             logging.exception("get_columns failed: %s", e)
             cols = []
 
+        try:
+            table_meta = self.db_manager.get_table_metadata(table_name) or {}
+        except Exception:
+            logging.exception("get_table_metadata failed for %s", table_name)
+            table_meta = {}
+
         for col in cols:
-            try:
-                meta = self.db_manager.get_column_metadata(table_name, col) or {}
-            except Exception:
-                logging.exception("get_column_metadata failed for %s.%s", table_name, col)
-                meta = {}
+            meta = table_meta.get(col) or {}
 
             if meta.get('is_primary'):
                 continue
@@ -0,0 +1,101 @@
+import logging
+import os
+
+from PySide6.QtWidgets import QFileDialog, QMessageBox, QProgressDialog
+from PySide6.QtCore import Qt, QObject, QRunnable, QThreadPool, Signal
+
+
+class ExportSignals(QObject):
+    progress = Signal(object)
+    finished = Signal(dict)
+
+
+class ExportWorker(QRunnable):
+    """Запускает DatabaseManager.export_query в потоке пула"""
+
+    def __init__(self, db_manager, sql: str, path: str, params=None):
+        super().__init__()
+        self.db_manager = db_manager
+        self.sql = sql
+        self.path = path
+        self.params = params
+        self.signals = ExportSignals()
+
+    def run(self):
+        step = 1024 * 1024
+        last = [0]
+
+        def on_progress(written: int):
+            # COPY пишет построчно — сигнал не чаще раза на мегабайт
+            if written - last[0] >= step:
+                last[0] = written
+                self.signals.progress.emit(written)
+
+        try:
+            result = self.db_manager.export_query(self.sql, self.path, self.params, progress=on_progress)
+        except Exception as e:
+            logging.exception(f"Ошибка экспорта: {e}")
+            result = {'rows': 0, 'bytes': 0, 'error': str(e)}
+        self.signals.finished.emit(result)
+
+
+class ExportController(QObject):
+    """Выбор файла, фоновая выгрузка и окно прогресса для одного экспорта"""
+
+    def __init__(self, parent, db_manager, sql: str, suggested_name: str, params=None):
+        super().__init__(parent)
+        self.parent_widget = parent
+        self.db_manager = db_manager
+        self.sql = sql
+        self.suggested_name = suggested_name
+        self.params = params
+        self.worker = None
+        self.progress_dialog = None
+
+    def start(self) -> bool:
+        path, selected = QFileDialog.getSaveFileName(
+            self.parent_widget, "Экспорт в CSV", f"{self.suggested_name}.csv",
+            "CSV (*.csv);;CSV, сжатый gzip (*.csv.gz)")
+        if not path:
+            self.deleteLater()
+            return False
+        if "gzip" in selected and not path.lower().endswith(".gz"):
+            path += ".gz"
+
+        self.progress_dialog = QProgressDialog("Выгрузка...", None, 0, 0, self.parent_widget)
+        self.progress_dialog.setWindowTitle("Экспорт")
+        self.progress_dialog.setWindowModality(Qt.WindowModal)
+        self.progress_dialog.setMinimumDuration(300)
+
+        self.worker = ExportWorker(self.db_manager, self.sql, path, self.params)
+        self.worker.signals.progress.connect(self.on_progress)
+        self.worker.signals.finished.connect(self.on_finished)
+        QThreadPool.globalInstance().start(self.worker)
+        return True
+
+    def on_progress(self, written: int):
+        if self.progress_dialog is not None:
+            self.progress_dialog.setLabelText(f"Выгрузка... {written / (1024 * 1024):.1f} МБ")
+
+    def on_finished(self, result: dict):
+        if self.progress_dialog is not None:
+            self.progress_dialog.close()
+            self.progress_dialog = None
+        path = self.worker.path
+        self.worker = None
+        if result.get('error'):
+            QMessageBox.warning(self.parent_widget, "Ошибка экспорта", result['error'])
+        else:
+            QMessageBox.information(
+                self.parent_widget, "Экспорт завершён",
+                f"Выгружено строк: {result['rows']}\nФайл: {os.path.basename(path)} "
+                f"({result['bytes'] / 1024:.1f} КБ)")
+        self.deleteLater()
+
+
+def export_query_to_file(parent, db_manager, sql: str, suggested_name: str = "export", params=None):
+    """Экспорт результата запроса целиком через COPY, минуя таблицу на экране"""
+    if not sql or not sql.strip():
+        QMessageBox.warning(parent, "Экспорт", "Нет запроса для экспорта")
+        return
+    ExportController(parent, db_manager, sql, suggested_name, params).start()
@@ -0,0 +1,159 @@
+import logging
+import os
+
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QPushButton,
+    QComboBox, QLineEdit, QCheckBox, QProgressBar, QFileDialog, QMessageBox, QTextEdit
+)
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+class CsvImportSignals(QObject):
+    progress = Signal(int)
+    finished = Signal(dict)
+
+
+class CsvImportWorker(QRunnable):
+    """Запускает DatabaseManager.import_csv в потоке пула"""
+
+    def __init__(self, db_manager, table_name: str, path: str, **options):
+        super().__init__()
+        self.db_manager = db_manager
+        self.table_name = table_name
+        self.path = path
+        self.options = options
+        self.signals = CsvImportSignals()
+
+    def run(self):
+        last = [-1]
+
+        def on_progress(done: int, total: int):
+            percent = int(done * 100 / total) if total else 100
+            if percent != last[0]:
+                last[0] = percent
+                self.signals.progress.emit(percent)
+
+        try:
+            result = self.db_manager.import_csv(self.table_name, self.path, progress=on_progress, **self.options)
+        except Exception as e:
+            logging.exception(f"Ошибка импорта: {e}")
+            result = {'rows': 0, 'errors': [str(e)]}
+        self.signals.finished.emit(result)
+
+
+class CsvImportDialog(QDialog):
+    DELIMITERS = [("Запятая (,)", ","), ("Точка с запятой (;)", ";"), ("Табуляция (TSV)", "\t"), ("Вертикальная черта (|)", "|")]
+    ENCODINGS = ["utf-8", "cp1251"]
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.worker = None
+        self.setWindowTitle("Импорт из CSV")
+        self.setMinimumSize(600, 450)
+        self.setup_ui()
+        self.load_tables()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        form = QFormLayout()
+        file_row = QHBoxLayout()
+        self.path_edit = QLineEdit()
+        browse_btn = QPushButton("Обзор...")
+        browse_btn.clicked.connect(self.choose_file)
+        file_row.addWidget(self.path_edit)
+        file_row.addWidget(browse_btn)
+        form.addRow("Файл:", file_row)
+
+        self.table_combo = QComboBox()
+        form.addRow("Таблица:", self.table_combo)
+
+        self.delimiter_combo = QComboBox()
+        for title, value in self.DELIMITERS:
+            self.delimiter_combo.addItem(title, value)
+        form.addRow("Разделитель:", self.delimiter_combo)
+
+        self.encoding_combo = QComboBox()
+        self.encoding_combo.addItems(self.ENCODINGS)
+        form.addRow("Кодировка:", self.encoding_combo)
+
+        self.upsert_check = QCheckBox("Обновлять существующие строки (по первичному ключу)")
+        form.addRow("", self.upsert_check)
+        layout.addLayout(form)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
+        layout.addWidget(self.progress_bar)
+
+        self.report = QTextEdit()
+        self.report.setReadOnly(True)
+        layout.addWidget(self.report)
+
+        buttons = QHBoxLayout()
+        self.import_btn = QPushButton("Импортировать")
+        self.import_btn.clicked.connect(self.start_import)
+        self.close_btn = QPushButton("Закрыть")
+        self.close_btn.clicked.connect(self.reject)
+        buttons.addStretch()
+        buttons.addWidget(self.import_btn)
+        buttons.addWidget(self.close_btn)
+        layout.addLayout(buttons)
+
+    def load_tables(self):
+        self.table_combo.clear()
+        self.table_combo.addItems(self.db_manager.list_tables())
+
+    def choose_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Выберите файл", "", "CSV/TSV (*.csv *.tsv *.txt);;Все файлы (*)")
+        if not path:
+            return
+        self.path_edit.setText(path)
+        if path.lower().endswith(".tsv"):
+            self.delimiter_combo.setCurrentIndex(2)
+        # таблица с тем же именем, что и файл, выбирается автоматически
+        index = self.table_combo.findText(os.path.splitext(os.path.basename(path))[0])
+        if index >= 0:
+            self.table_combo.setCurrentIndex(index)
+
+    def start_import(self):
+        path = self.path_edit.text().strip()
+        table_name = self.table_combo.currentText()
+        if not path or not os.path.isfile(path):
+            QMessageBox.warning(self, "Ошибка", "Выберите существующий файл")
+            return
+        if not table_name:
+            QMessageBox.warning(self, "Ошибка", "Выберите таблицу")
+            return
+
+        self.import_btn.setEnabled(False)
+        self.close_btn.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.report.setPlainText(f"Загрузка {os.path.basename(path)} в {table_name}...")
+
+        self.worker = CsvImportWorker(
+            self.db_manager, table_name, path,
+            delimiter=self.delimiter_combo.currentData(),
+            encoding=self.encoding_combo.currentText(),
+            upsert=self.upsert_check.isChecked(),
+        )
+        self.worker.signals.progress.connect(self.progress_bar.setValue)
+        self.worker.signals.finished.connect(self.on_import_finished)
+        QThreadPool.globalInstance().start(self.worker)
+
+    def reject(self):
+        # пока идёт COPY окно не закрываем: результат придёт в этот диалог
+        if self.worker is not None:
+            return
+        super().reject()
+
+    def on_import_finished(self, result: dict):
+        self.import_btn.setEnabled(True)
+        self.close_btn.setEnabled(True)
+        self.worker = None
+        if result.get('errors'):
+            self.report.setPlainText("Импорт не выполнен:\n" + "\n".join(result['errors']))
+            return
+        self.progress_bar.setValue(100)
+        self.report.setPlainText(f"Загружено строк: {result.get('rows', 0)}")
@@ -0,0 +1,152 @@
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple
+
+from app_paths import app_file
+
+# вес использования столбца в разных частях запроса при ранжировании рекомендаций
+KIND_WEIGHTS = {'where': 3, 'join': 3, 'order': 2, 'group': 1}
+KIND_LABELS = {'where': 'WHERE', 'join': 'JOIN', 'order': 'ORDER BY', 'group': 'GROUP BY'}
+# внешний ключ без индекса замедляет JOIN и удаление строк родительской таблицы
+FK_WEIGHT = 5
+# в таблицах меньше такого числа строк Seq Scan дешевле индекса
+SMALL_TABLE_ROWS = 1000
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_COLUMN_REF_RE = re.compile(r'"?\b([A-Za-z_]\w*)"?\."?([A-Za-z_]\w*)\b"?')
+
+
+def _column_refs(expression: str, schema: Dict[str, List[str]]) -> Set[Tuple[str, str]]:
+    """Ссылки table.column на известные столбцы схемы; литералы в кавычках пропускаются"""
+    refs = set()
+    for table, column in _COLUMN_REF_RE.findall(_STRING_RE.sub("''", expression or "")):
+        if column in schema.get(table, ()):
+            refs.add((table, column))
+    return refs
+
+
+def builder_usage(schema: Dict[str, List[str]], where_conditions: Iterable[str], joins: Iterable[Dict[str, str]],
+                  group_by: Iterable[str], order_by: Iterable[str]) -> Dict[Tuple[str, str], Set[str]]:
+    """Столбцы запроса конструктора SELECT: (таблица, столбец) -> {'where', 'join', 'group', 'order'}"""
+    usage = {}
+
+    def add(refs, kind):
+        for ref in refs:
+            usage.setdefault(ref, set()).add(kind)
+
+    for condition in where_conditions:
+        add(_column_refs(condition, schema), 'where')
+    for join in joins:
+        add({(join.get('left'), join.get('lf')), (join.get('right'), join.get('rf'))}
+            & {(t, c) for t in schema for c in schema[t]}, 'join')
+    for expression in group_by:
+        add(_column_refs(expression, schema), 'group')
+    for expression in order_by:
+        add(_column_refs(expression, schema), 'order')
+    return usage
+
+
+class IndexUsageStore:
+    """Накопленная статистика использования столбцов в запросах конструктора, хранится в JSON-файле"""
+
+    def __init__(self, path: str = app_file('index_usage.json')):
+        self.path = path
+        self._counts = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, int]]:
+        if self._counts is None:
+            self._counts = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, encoding='utf-8') as f:
+                        self._counts = json.load(f)
+                except Exception as e:
+                    logging.error(f"Ошибка чтения статистики столбцов {self.path}: {str(e)}")
+        return self._counts
+
+    def _save(self):
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self._counts, f, ensure_ascii=False, indent=1, sort_keys=True)
+        except Exception as e:
+            logging.error(f"Ошибка записи статистики столбцов {self.path}: {str(e)}")
+
+    def record(self, usage: Dict[Tuple[str, str], Set[str]]):
+        if not usage:
+            return
+        with self._lock:
+            counts = self._load()
+            for (table, column), kinds in usage.items():
+                entry = counts.setdefault(f"{table}.{column}", {})
+                for kind in kinds:
+                    entry[kind] = entry.get(kind, 0) + 1
+            self._save()
+
+    def columns(self) -> Dict[Tuple[str, str], Dict[str, int]]:
+        with self._lock:
+            return {tuple(key.split('.', 1)): dict(kinds) for key, kinds in self._load().items()}
+
+    def reset(self):
+        with self._lock:
+            self._counts = {}
+            self._save()
+
+
+def _is_covered(columns: List[str], indexes: List[List[str]]) -> bool:
+    """Есть индекс, начинающийся с этих столбцов (в любом порядке внутри префикса)"""
+    return any(set(index[:len(columns)]) == set(columns) for index in indexes)
+
+
+def suggest_indexes(usage: Dict[Tuple[str, str], Dict[str, int]], overview: Dict[str, Any],
+                    create_index_sql: Callable[[str, List[str]], str]) -> List[Dict[str, Any]]:
+    """Рекомендации CREATE INDEX по статистике конструктора и внешним ключам без индексов.
+
+    overview — результат DatabaseManager.get_index_overview(), create_index_sql — обычно
+    DatabaseManager.create_index_sql, чтобы SQL и имя индекса совпадали с окном ALTER TABLE.
+    Возвращает список словарей table, columns, score, reason, sql, отсортированный по убыванию score.
+    """
+    tables = overview.get('tables', {})
+    indexes = overview.get('indexes', {})
+    candidates = {}
+
+    for (table, column), kinds in usage.items():
+        if table not in tables:
+            continue
+        candidates[(table, (column,))] = {'kinds': kinds, 'fk': False}
+    for table, columns in overview.get('foreign_keys', []):
+        if table in tables:
+            candidates.setdefault((table, tuple(columns)), {'kinds': {}, 'fk': False})['fk'] = True
+
+    suggestions = []
+    for (table, columns), entry in candidates.items():
+        columns = list(columns)
+        if _is_covered(columns, indexes.get(table, [])):
+            continue
+        stats = tables[table]
+        score = sum(KIND_WEIGHTS.get(kind, 1) * count for kind, count in entry['kinds'].items())
+        reasons = [f"{KIND_LABELS.get(kind, kind)} ×{count}" for kind, count in sorted(entry['kinds'].items())]
+        if entry['fk']:
+            score += FK_WEIGHT
+            reasons.append("внешний ключ без индекса")
+        seq_scan, idx_scan, live_rows = stats['seq_scan'], stats['idx_scan'], stats['n_live_tup']
+        reasons.append(f"seq_scan {seq_scan} / idx_scan {idx_scan}, ~{live_rows} строк")
+        # таблицу читают в основном последовательно — индекс нужнее
+        if seq_scan > idx_scan:
+            score *= 2
+        if live_rows < SMALL_TABLE_ROWS:
+            score /= 2
+            reasons.append("таблица маленькая, выигрыш будет заметен только с ростом данных")
+        suggestions.append({
+            'table': table, 'columns': columns, 'score': score, 'reason': "; ".join(reasons),
+            'sql': create_index_sql(table, columns),
+        })
+    suggestions.sort(key=lambda s: (s['score'], tables[s['table']]['seq_scan']), reverse=True)
+    return suggestions
+
+
+# общее хранилище процесса: конструкторы SELECT пишут в него при каждом выполнении запроса
+USAGE = IndexUsageStore()
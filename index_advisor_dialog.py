@@ -0,0 +1,87 @@
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QMessageBox,
+    QHeaderView, QApplication, QAbstractItemView
+)
+
+from alter import AlterTableDialog
+from index_advisor import USAGE, suggest_indexes
+from result_model import create_result_view
+
+
+class IndexAdvisorDialog(QDialog):
+    """Рекомендации индексов по столбцам из запросов конструктора SELECT и статистике сканирований"""
+
+    COLUMNS = ["Таблица", "Столбцы", "Оценка", "Причина", "SQL"]
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.suggestions = []
+        self.setWindowTitle("Советник индексов")
+        self.resize(1000, 500)
+        self.setup_ui()
+        self.load_suggestions()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel("Столбцы из WHERE / JOIN / GROUP BY / ORDER BY выполненных запросов "
+                                "и внешние ключи, по которым нет индекса:"))
+
+        self.table = create_result_view(self, "Рекомендаций нет")
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        layout.addWidget(self.table)
+
+        btn_row = QHBoxLayout()
+        self.btn_create = QPushButton("Создать индекс...")
+        self.btn_create.clicked.connect(self.create_selected)
+        self.btn_copy = QPushButton("Копировать SQL")
+        self.btn_copy.clicked.connect(self.copy_selected_sql)
+        self.btn_refresh = QPushButton("Обновить")
+        self.btn_refresh.clicked.connect(self.load_suggestions)
+        self.btn_reset = QPushButton("Сбросить статистику")
+        self.btn_reset.clicked.connect(self.reset_usage)
+        btn_close = QPushButton("Закрыть")
+        btn_close.clicked.connect(self.reject)
+        for btn in (self.btn_create, self.btn_copy, self.btn_refresh, self.btn_reset):
+            btn_row.addWidget(btn)
+        btn_row.addStretch()
+        btn_row.addWidget(btn_close)
+        layout.addLayout(btn_row)
+
+    def load_suggestions(self):
+        overview = self.db_manager.get_index_overview()
+        self.suggestions = suggest_indexes(USAGE.columns(), overview, self.db_manager.create_index_sql)
+        rows = [(s['table'], ", ".join(s['columns']), f"{s['score']:g}", s['reason'], s['sql'])
+                for s in self.suggestions]
+        self.table.model().set_result(rows, self.COLUMNS)
+        self.table.resizeColumnsToContents()
+        # секции заголовка появляются только после set_result
+        self.table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+
+    def _selected(self):
+        row = self.table.currentIndex().row()
+        if row < 0 or row >= len(self.suggestions):
+            QMessageBox.information(self, "Советник индексов", "Выберите рекомендацию")
+            return None
+        return self.suggestions[row]
+
+    def create_selected(self):
+        suggestion = self._selected()
+        if suggestion is None:
+            return
+        dialog = AlterTableDialog(self.db_manager, self)
+        dialog.preset_create_index(suggestion['table'], suggestion['columns'])
+        if dialog.exec():
+            self.load_suggestions()
+
+    def copy_selected_sql(self):
+        suggestion = self._selected()
+        if suggestion is not None:
+            QApplication.clipboard().setText(suggestion['sql'] + ";")
+
+    def reset_usage(self):
+        if QMessageBox.question(self, "Советник индексов",
+                                "Сбросить накопленную статистику использования столбцов?") == QMessageBox.Yes:
+            USAGE.reset()
+            self.load_suggestions()
@@ -1,15 +1,28 @@
+import startup_timing
+from app_paths import app_file
+
+import asyncio
 import sys
 import logging
-from PySide6.QtWidgets import QApplication
-from PySide6.QtGui import QIcon
-from mainwindow import MainWindow
+
+with startup_timing.measure("import PySide6"):
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtGui import QIcon
+with startup_timing.measure("import mainwindow"):
+    from mainwindow import MainWindow
+
+try:
+    with startup_timing.measure("import qasync"):
+        import qasync
+except ImportError:  # без qasync асинхронные запросы недоступны, работает обычный цикл Qt
+    qasync = None
 
 def main():
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(levelname)s - %(message)s',
         handlers=[
-            logging.FileHandler('app.log', encoding='utf-8'),
+            logging.FileHandler(app_file('app.log'), encoding='utf-8'),
             logging.StreamHandler(sys.stdout)
         ]
     )
@@ -24,11 +37,25 @@ def main():
     except:
         pass
     
-    window = MainWindow()
+    with startup_timing.measure("создание главного окна"):
+        window = MainWindow()
+    # подключение с сохранёнными параметрами сразу после запуска — только по явному флагу
+    window.auto_connect = "--auto-connect" in sys.argv[1:]
     window.show()
 
     logging.info("Приложение 'Крошка Картошка' запущено")
-    sys.exit(app.exec())
+    if qasync is None:
+        sys.exit(app.exec())
+
+    # цикл asyncio поверх цикла Qt: корутины AsyncDatabaseManager выполняются в потоке интерфейса
+    loop = qasync.QEventLoop(app)
+    asyncio.set_event_loop(loop)
+    with loop:
+        # run_forever возвращает код app.exec(), с ним процесс и завершается
+        exit_code = loop.run_forever()
+        if window.async_db_manager is not None:
+            loop.run_until_complete(window.async_db_manager.disconnect())
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,28 +1,54 @@
 import logging
+import time
 
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QMessageBox, QGridLayout, QDialog, QTextEdit)
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, Signal
 from PySide6.QtGui import QFont
 
+import startup_timing
 from database import DatabaseManager
-from dialogs import ConnectionDialog,AddFinanceDialog,  EditFinanceDialog, LoggerDialog, DataViewDialog, AddDataDialog, AddPointDialog, AddEmployeeDialog, AddProductDialog
 from styles import STYLES
-from advanced_features import ( TextSearchDialog,
-    StringFunctionsDialog
-)
-from select import AdvancedSelectDialog
-from alter import AlterTableDialog
-from typesdialog import UserTypesDialog
-from viewsdialog import ViewsDialog
-from cte_builder import CteBuilderDialog
 
 
+def _dialog(module_name: str, class_name: str):
+    """Класс диалога; его модуль импортируется при первом открытии, а не при запуске"""
+    return getattr(startup_timing.import_module(module_name), class_name)
+
+
+class ConnectSignals(QObject):
+    finished = Signal(bool)
+
+
+class ConnectWorker(QRunnable):
+    """Первое подключение к БД в потоке пула, чтобы окно появилось, не дожидаясь сервера"""
+
+    def __init__(self, db_manager):
+        super().__init__()
+        self.db_manager = db_manager
+        self.signals = ConnectSignals()
+        self.elapsed_ms = 0.0
+
+    def run(self):
+        start = time.perf_counter()
+        ok = self.db_manager.connect()
+        self.elapsed_ms = (time.perf_counter() - start) * 1000
+        self.signals.finished.emit(ok)
+
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.db_manager = DatabaseManager()
+        # True — счётчики строк по pg_class.reltuples вместо COUNT(*) (для очень больших таблиц)
+        self.dashboard_estimate_counts = False
+        self.async_db_manager = None
+        # True — подключение с сохранёнными параметрами после первой отрисовки окна (main.py --auto-connect)
+        self.auto_connect = False
+        # кнопки, открывающие работу с БД: недоступны, пока идёт фоновое подключение
+        self.db_buttons = []
+        self._connect_worker = None
+        self._first_paint_done = False
         self.setWindowTitle("Система управления 'Крошка Картошка'")
         self.setMinimumSize(900, 650)
         self.setup_ui()
@@ -66,6 +92,9 @@ class MainWindow(QMainWindow):
             btn.setMinimumHeight(60)
             btn.setMinimumWidth(180)
             grid_layout1.addWidget(btn, row, col)
+            # подключение остаётся доступным во время фонового подключения — его ждёт show_connection_dialog
+            if slot not in (self.show_logger, self.show_about, self.show_connection_dialog):
+                self.db_buttons.append(btn)
 
         layout.addLayout(grid_layout1)
 
@@ -81,6 +110,9 @@ class MainWindow(QMainWindow):
             ("CTE", self.opencte, 1, 0),
             ("Текстовый поиск", self.open_text_search, 1, 1),
             ("Строковые функции", self.open_string_functions, 1, 2),
+            ("Импорт CSV", self.open_csv_import, 2, 0),
+            ("Финансовый отчёт", self.open_financial_report, 2, 1),
+            ("Производительность", self.open_performance, 2, 2),
         ]
 
         for text, slot, row, col in advancedbuttonsinfo:
@@ -90,6 +122,7 @@ class MainWindow(QMainWindow):
             btn.setMinimumHeight(50)
             btn.setMinimumWidth(160)
             grid_layout2.addWidget(btn, row, col)
+            self.db_buttons.append(btn)
 
         layout.addLayout(grid_layout2)
 
@@ -100,6 +133,39 @@ class MainWindow(QMainWindow):
 
         self.update_status()
 
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self._first_paint_done:
+            return
+        self._first_paint_done = True
+        startup_timing.mark("первая отрисовка окна")
+        # отчёт и подключение — уже после того, как окно показано
+        QTimer.singleShot(0, self.after_first_paint)
+
+    def after_first_paint(self):
+        startup_timing.report()
+        if self.auto_connect and not self.db_manager.is_connected():
+            self.start_background_connect()
+
+    def start_background_connect(self):
+        self.status_label.setText("Статус: Подключение к БД...")
+        self.status_label.setStyleSheet("color: #fda601; font-weight: bold;")
+        self.set_db_buttons_enabled(False)
+        self._connect_worker = ConnectWorker(self.db_manager)
+        self._connect_worker.signals.finished.connect(self.on_background_connect_finished)
+        QThreadPool.globalInstance().start(self._connect_worker)
+
+    def on_background_connect_finished(self, ok: bool):
+        logging.info(f"Фоновое подключение к БД: {'успешно' if ok else 'не удалось'}, "
+                     f"{self._connect_worker.elapsed_ms:.0f} мс")
+        self._connect_worker = None
+        self.set_db_buttons_enabled(True)
+        self.update_status()
+
+    def set_db_buttons_enabled(self, enabled: bool):
+        for btn in self.db_buttons:
+            btn.setEnabled(enabled)
+
     def update_status(self):
         try:
             if self.db_manager.is_connected():
@@ -113,11 +179,14 @@ class MainWindow(QMainWindow):
             self.status_label.setStyleSheet("color: #d9534f; font-weight: bold;")
 
     def show_logger(self):
-        dialog = LoggerDialog(self.db_manager, self)
+        dialog = _dialog("dialogs", "LoggerDialog")(self.db_manager, self)
         dialog.exec()
 
     def show_connection_dialog(self):
-        dialog = ConnectionDialog(self.db_manager, self)
+        if self._connect_worker is not None:
+            QMessageBox.information(self, "Подключение", "Идёт подключение к БД, подождите несколько секунд")
+            return
+        dialog = _dialog("dialogs", "ConnectionDialog")(self.db_manager, self)
         dialog.exec()
         self.update_status()
 
@@ -126,7 +195,7 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Ошибка", "Сначала подключитесь к базе данных")
             return
         
-        dialog = AddDataDialog(self.db_manager, self)
+        dialog = _dialog("dialogs", "AddDataDialog")(self.db_manager, self)
         if dialog.exec() == QDialog.Accepted:
             data_type = dialog.get_data_type()
             if data_type == 'point':
@@ -143,15 +212,26 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Ошибка", "Сначала подключитесь к базе данных")
             return
         
-        dialog = DataViewDialog(self.db_manager, self)
+        dialog = _dialog("dialogs", "DataViewDialog")(self.db_manager, self, async_db=self.get_async_db_manager())
         dialog.exec()
 
+    def get_async_db_manager(self):
+        """AsyncDatabaseManager с текущими параметрами подключения; None без psycopg 3 или qasync"""
+        async_database = startup_timing.import_module("async_database")
+        if not async_database.async_available():
+            return None
+        if self.async_db_manager is None:
+            self.async_db_manager = async_database.AsyncDatabaseManager.from_manager(self.db_manager)
+        else:
+            self.async_db_manager.set_connection_params(self.db_manager.get_connection_params())
+        return self.async_db_manager
+
     def show_types_data(self):
         if not self.db_manager.is_connected():
             QMessageBox.warning(self, "Ошибка", "Сначала подключитесь к базе данных")
             return
 
-        dialog = UserTypesDialog(self.db_manager, self)
+        dialog = _dialog("typesdialog", "UserTypesDialog")(self.db_manager, self)
         dialog.exec()
 
     def refresh_all(self):
@@ -160,14 +240,16 @@ class MainWindow(QMainWindow):
             return
         
         try:
-            points_count = self.db_manager.get_points_count()
-            employees_count = self.db_manager.get_employees_count()
-            products_count = self.db_manager.get_products_count()
-            total_revenue = self.db_manager.get_total_revenue()
-            total_expenses = self.db_manager.get_total_expenses()
+            stats = self.db_manager.get_dashboard_stats(self.dashboard_estimate_counts)
+            approx = "≈ " if stats['estimated'] else ""
+            points_count = f"{approx}{stats['points_count']}"
+            employees_count = f"{approx}{stats['employees_count']}"
+            products_count = f"{approx}{stats['products_count']}"
+            total_revenue = stats['total_revenue']
+            total_expenses = stats['total_expenses']
             profit = total_revenue - total_expenses
             
-            data_exists = self.db_manager.check_data_exists()
+            data_exists = stats['data_exists']
 
             stats_text = f"""
             <h2>📊 Статистика системы</h2>
@@ -250,7 +332,7 @@ class MainWindow(QMainWindow):
         QMessageBox.about(self, "О программе", about_text)
 
     def add_point(self):
-        dialog = AddPointDialog(self)
+        dialog = _dialog("dialogs", "AddPointDialog")(self)
         if dialog.exec() == QDialog.Accepted:
             data = dialog.get_data()
             if data['address']:
@@ -262,7 +344,7 @@ class MainWindow(QMainWindow):
                 QMessageBox.warning(self, "Ошибка", "Адрес обязателен для заполнения")
 
     def add_employee(self):
-        dialog = AddEmployeeDialog(self)
+        dialog = _dialog("dialogs", "AddEmployeeDialog")(self)
         if dialog.exec() == QDialog.Accepted:
             data = dialog.get_data()
             if all([data['full_name'], data['position'], data['salary'], data['schedule'], data['point_id']]):
@@ -279,7 +361,7 @@ class MainWindow(QMainWindow):
                 QMessageBox.warning(self, "Ошибка", "Все поля обязательны для заполнения")
 
     def add_product(self):
-        dialog = AddProductDialog(self)
+        dialog = _dialog("dialogs", "AddProductDialog")(self)
         if dialog.exec() == QDialog.Accepted:
             data = dialog.get_data()
             if all([data['name'], data['category'], data['cost_price'], data['selling_price']]):
@@ -296,7 +378,7 @@ class MainWindow(QMainWindow):
                 QMessageBox.warning(self, "Ошибка", "Все поля обязательны для заполнения")
                 
     def add_finance(self):
-        dialog = AddFinanceDialog(self.db_manager, self)
+        dialog = _dialog("dialogs", "AddFinanceDialog")(self.db_manager, self)
         if dialog.exec() == QDialog.Accepted:
             data = dialog.get_data()
             if all([data['point_id'], data['amount'], data['date']]):
@@ -322,40 +404,58 @@ class MainWindow(QMainWindow):
         if not self.db_manager.is_connected():
             QMessageBox.warning(self, "Ошибка", "Сначала подключитесь к базе данных")
             return
-        dialog = AlterTableDialog(self.db_manager, self)
+        dialog = _dialog("alter", "AlterTableDialog")(self.db_manager, self)
         dialog.exec()
 
     def open_advanced_select(self):
         if not self.db_manager.is_connected():
             QMessageBox.warning(self, "Ошибка", "Сначала подключитесь к базе данных")
             return
-        dialog = AdvancedSelectDialog(self.db_manager, self)
+        dialog = _dialog("select_dialog", "AdvancedSelectDialog")(self.db_manager, self)
         dialog.exec()
 
     def open_text_search(self):
         if not self.db_manager.is_connected():
             QMessageBox.warning(self, "Ошибка", "Сначала подключитесь к базе данных")
             return
-        dialog = TextSearchDialog(self.db_manager, self)
+        dialog = _dialog("advanced_features", "TextSearchDialog")(self.db_manager, self)
         dialog.exec()
 
     def open_string_functions(self):
         if not self.db_manager.is_connected():
             QMessageBox.warning(self, "Ошибка", "Сначала подключитесь к базе данных")
             return
-        dialog = StringFunctionsDialog(self.db_manager, self)
+        dialog = _dialog("advanced_features", "StringFunctionsDialog")(self.db_manager, self)
         dialog.exec()
     def openviews(self):
         if not self.db_manager.is_connected():
             QMessageBox.warning(self, "Нет подключения", "Сначала подключитесь к базе данных.")
             return
-        dialog = ViewsDialog(self.db_manager, self)
+        dialog = _dialog("viewsdialog", "ViewsDialog")(self.db_manager, self)
+        dialog.exec()
+
+    def open_csv_import(self):
+        if not self.db_manager.is_connected():
+            QMessageBox.warning(self, "Ошибка", "Сначала подключитесь к базе данных")
+            return
+        dialog = _dialog("import_dialog", "CsvImportDialog")(self.db_manager, self)
+        dialog.exec()
+
+    def open_financial_report(self):
+        if not self.db_manager.is_connected():
+            QMessageBox.warning(self, "Ошибка", "Сначала подключитесь к базе данных")
+            return
+        dialog = _dialog("reports", "FinancialReportDialog")(self.db_manager, self)
+        dialog.exec()
+
+    def open_performance(self):
+        dialog = _dialog("performance_dialog", "PerformanceDialog")(self.db_manager, self)
         dialog.exec()
 
     def opencte(self):
         if not self.db_manager.is_connected():
             QMessageBox.warning(self, "Нет подключения", "Сначала подключитесь к базе данных.")
             return
-        dialog = CteBuilderDialog(self.db_manager, self)
+        dialog = _dialog("cte_builder", "CteBuilderDialog")(self.db_manager, self)
         dialog.exec()
 
@@ -0,0 +1,97 @@
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QSpinBox, QCheckBox
+)
+
+from query_stats import histogram_labels
+from result_model import create_result_view
+
+
+class PerformanceDialog(QDialog):
+    """Самые затратные запросы по суммарному времени (статистика query_stats)"""
+
+    COLUMNS = ["Запрос", "Вызовов", "Всего, мс", "Среднее, мс", "Макс, мс", "Строк",
+               "Параметров", "Источник", "Гистограмма"]
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.stats = db_manager.query_stats
+        self.setWindowTitle("Производительность")
+        self.resize(1100, 600)
+        self.setup_ui()
+        self.load_stats()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Показать первые:"))
+        self.top_spin = QSpinBox()
+        self.top_spin.setRange(5, 500)
+        self.top_spin.setValue(20)
+        self.top_spin.valueChanged.connect(self.load_stats)
+        controls.addWidget(self.top_spin)
+
+        controls.addWidget(QLabel("Медленный запрос от, мс:"))
+        self.slow_spin = QSpinBox()
+        self.slow_spin.setRange(0, 600000)
+        self.slow_spin.setSingleStep(100)
+        self.slow_spin.setSpecialValueText("не писать")
+        self.slow_spin.setValue(int(self.stats.slow_ms or 0))
+        self.slow_spin.setToolTip(f"Запросы дольше порога пишутся в {self.stats.slow_log_path}")
+        self.slow_spin.valueChanged.connect(self.on_slow_changed)
+        controls.addWidget(self.slow_spin)
+
+        self.enabled_check = QCheckBox("Собирать статистику")
+        self.enabled_check.setChecked(self.stats.enabled)
+        self.enabled_check.toggled.connect(self.on_enabled_toggled)
+        controls.addWidget(self.enabled_check)
+        controls.addStretch()
+
+        self.btn_refresh = QPushButton("Обновить")
+        self.btn_refresh.clicked.connect(self.load_stats)
+        controls.addWidget(self.btn_refresh)
+        self.btn_reset = QPushButton("Сбросить")
+        self.btn_reset.clicked.connect(self.reset_stats)
+        controls.addWidget(self.btn_reset)
+        layout.addLayout(controls)
+
+        self.result_view = create_result_view(self, "Запросов ещё не было")
+        layout.addWidget(self.result_view)
+
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+    def on_slow_changed(self, value: int):
+        self.stats.slow_ms = value
+
+    def on_enabled_toggled(self, checked: bool):
+        self.stats.enabled = checked
+
+    def reset_stats(self):
+        self.stats.reset()
+        self.load_stats()
+
+    def load_stats(self):
+        labels = histogram_labels()
+        rows = []
+        total_ms = 0.0
+        for entry in self.stats.top(self.top_spin.value()):
+            total_ms += entry['total_ms']
+            sources = sorted(entry['sources'].items(), key=lambda item: item[1], reverse=True)
+            histogram = ", ".join(f"{label}: {count}" for label, count in zip(labels, entry['histogram']) if count)
+            rows.append((
+                entry['fingerprint'],
+                entry['calls'],
+                round(entry['total_ms'], 1),
+                round(entry['total_ms'] / entry['calls'], 2),
+                round(entry['max_ms'], 1),
+                entry['rows'],
+                entry['params'],
+                ", ".join(name or "—" for name, _ in sources[:3]),
+                histogram,
+            ))
+        self.result_view.model().set_result(rows, self.COLUMNS)
+        self.result_view.resizeColumnsToContents()
+        self.result_view.setColumnWidth(0, min(self.result_view.columnWidth(0), 450))
+        self.summary_label.setText(f"Показано запросов: {len(rows)}, суммарно {total_ms:.0f} мс")
@@ -0,0 +1,161 @@
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QMessageBox,
+    QTreeWidget, QTreeWidgetItem, QHeaderView
+)
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+from PySide6.QtGui import QColor
+
+# Seq Scan по таблице от такого размера подсвечивается
+LARGE_TABLE_ROWS = 10000
+LARGE_TABLE_PAGES = 1000
+# во сколько раз фактическое число строк должно отличаться от оценки, чтобы узел подсветился
+MISESTIMATE_FACTOR = 10
+MISESTIMATE_MIN_ROWS = 100
+
+SEQ_SCAN_COLOR = QColor("#f8d7da")
+MISESTIMATE_COLOR = QColor("#fff3cd")
+
+
+class ExplainSignals(QObject):
+    finished = Signal(dict)
+
+
+class ExplainWorker(QRunnable):
+    """Запускает DatabaseManager.explain_analyze в потоке пула"""
+
+    def __init__(self, db_manager, sql: str, params=None, statement_timeout_ms: int = 0):
+        super().__init__()
+        self.db_manager = db_manager
+        self.sql = sql
+        self.params = params
+        self.statement_timeout_ms = statement_timeout_ms
+        self.signals = ExplainSignals()
+
+    def run(self):
+        self.signals.finished.emit(
+            self.db_manager.explain_analyze(self.sql, self.params, self.statement_timeout_ms))
+
+
+def node_title(node: dict) -> str:
+    title = node['Node Type']
+    if node.get('Parallel Aware'):
+        title = f"Parallel {title}"
+    if 'Join Type' in node and node['Join Type'] != 'Inner':
+        title = f"{title} ({node['Join Type']})"
+    if 'Strategy' in node and node['Node Type'] == 'Aggregate':
+        title = f"{title} ({node['Strategy']})"
+    if 'Index Name' in node:
+        title += f" using {node['Index Name']}"
+    if 'Relation Name' in node:
+        title += f" on {node['Relation Name']}"
+        if node.get('Alias') and node['Alias'] != node['Relation Name']:
+            title += f" {node['Alias']}"
+    elif 'CTE Name' in node:
+        title += f" on {node['CTE Name']}"
+    return title
+
+
+def node_warnings(node: dict, tables: dict) -> list:
+    """Замечания к узлу: Seq Scan по большой таблице и сильный промах оценки строк"""
+    warnings = []
+    if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') in tables:
+        rows, pages = tables[node['Relation Name']]
+        if rows >= LARGE_TABLE_ROWS or pages >= LARGE_TABLE_PAGES:
+            warnings.append((SEQ_SCAN_COLOR, f"Seq Scan по большой таблице (~{rows} строк)"))
+    if node.get('Actual Loops'):
+        actual, planned = node['Actual Rows'], node['Plan Rows']
+        if max(actual, planned) >= MISESTIMATE_MIN_ROWS:
+            ratio = max(actual, 1) / max(planned, 1)
+            if ratio >= MISESTIMATE_FACTOR or ratio <= 1 / MISESTIMATE_FACTOR:
+                warnings.append((MISESTIMATE_COLOR, f"Оценка строк: {planned}, факт: {actual}"))
+    return warnings
+
+
+class PlanViewerDialog(QDialog):
+    """План EXPLAIN ANALYZE в виде дерева; запрос выполняется в откатываемой транзакции"""
+
+    COLUMNS = ["Узел", "Время, мс", "Строк (факт)", "Строк (оценка)", "Циклов", "Буферы hit / read", "Замечания"]
+
+    def __init__(self, db_manager, sql: str, parent=None, params=None, statement_timeout_ms: int = 0):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.sql = sql
+        self.setWindowTitle("План запроса (EXPLAIN ANALYZE)")
+        self.resize(1100, 600)
+        self.setup_ui()
+
+        self._worker = ExplainWorker(db_manager, sql, params, statement_timeout_ms)
+        self._worker.signals.finished.connect(self.on_explain_finished)
+        QThreadPool.globalInstance().start(self._worker)
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        self.summary_label = QLabel("Выполняется EXPLAIN ANALYZE...")
+        layout.addWidget(self.summary_label)
+
+        self.tree = QTreeWidget()
+        self.tree.setColumnCount(len(self.COLUMNS))
+        self.tree.setHeaderLabels(self.COLUMNS)
+        self.tree.header().setSectionResizeMode(0, QHeaderView.Interactive)
+        layout.addWidget(self.tree)
+
+        legend = QLabel("Красным — Seq Scan по большой таблице, жёлтым — оценка строк ошиблась "
+                        f"больше чем в {MISESTIMATE_FACTOR} раз. Изменения данных запросом откатываются.")
+        legend.setWordWrap(True)
+        layout.addWidget(legend)
+
+        btn_row = QHBoxLayout()
+        btn_row.addStretch()
+        btn_close = QPushButton("Закрыть")
+        btn_close.clicked.connect(self.reject)
+        btn_row.addWidget(btn_close)
+        layout.addLayout(btn_row)
+
+    def on_explain_finished(self, result: dict):
+        self._worker = None
+        if result['error']:
+            self.summary_label.setStyleSheet("color: #c0392b;")
+            self.summary_label.setText(f"Ошибка EXPLAIN ANALYZE: {result['error']}")
+            return
+        plan = result['plan']
+        self.summary_label.setText(f"Планирование: {plan.get('Planning Time', 0):.2f} мс, "
+                                   f"выполнение: {plan.get('Execution Time', 0):.2f} мс")
+        self.tree.clear()
+        self._add_node(self.tree.invisibleRootItem(), plan['Plan'], result['tables'])
+        self.tree.expandAll()
+        for column in range(1, len(self.COLUMNS)):
+            self.tree.resizeColumnToContents(column)
+        self.tree.setColumnWidth(0, 420)
+
+    def _add_node(self, parent_item, node: dict, tables: dict):
+        loops = node.get('Actual Loops', 0)
+        if loops:
+            # Actual Total Time и Actual Rows даны на один цикл
+            total_ms = f"{node['Actual Total Time'] * loops:.2f}"
+            actual_rows = str(node['Actual Rows'] * loops)
+        else:
+            total_ms, actual_rows = "не выполнялся", "—"
+        buffers = f"{node.get('Shared Hit Blocks', 0)} / {node.get('Shared Read Blocks', 0)}"
+        warnings = node_warnings(node, tables)
+
+        item = QTreeWidgetItem(parent_item, [
+            node_title(node), total_ms, actual_rows, str(node['Plan Rows'] * max(loops, 1)),
+            str(loops), buffers, "; ".join(text for _, text in warnings),
+        ])
+        details = [f"{key}: {value}" for key, value in node.items() if key != 'Plans']
+        item.setToolTip(0, "\n".join(details))
+        if warnings:
+            color = warnings[0][0]
+            for column in range(len(self.COLUMNS)):
+                item.setBackground(column, color)
+        for child in node.get('Plans', ()):
+            self._add_node(item, child, tables)
+
+
+def show_query_plan(parent, db_manager, sql: str, statement_timeout_ms: int = 0, params=None):
+    """Открыть окно плана для SQL из конструктора запросов"""
+    if not sql or not sql.strip():
+        QMessageBox.warning(parent, "План запроса", "Нет запроса для анализа")
+        return
+    PlanViewerDialog(db_manager, sql, parent, params, statement_timeout_ms).exec()
@@ -0,0 +1,230 @@
+import logging
+import re
+import threading
+from typing import Any, Optional, Tuple
+
+from psycopg2 import errors
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+import query_stats
+
+ROWS_RE = re.compile(r'^\s*(SELECT|WITH|VALUES|TABLE)\b', re.IGNORECASE)
+
+
+class QueryWorkerSignals(QObject):
+    columns = Signal(list)
+    batch = Signal(list)
+    progress = Signal(int)
+    finished = Signal(int)
+    error = Signal(str)
+    cancelled = Signal()
+
+
+class QueryWorker(QRunnable):
+    """Выполняет один запрос в потоке пула на соединении из пула DatabaseManager.
+
+    Строки SELECT читаются серверным курсором и отдаются порциями (batch); finished
+    получает число прочитанных строк, а для команд без результата — rowcount.
+    """
+
+    def __init__(self, db_manager, sql: str, params: Optional[Tuple] = None,
+                 commit: bool = False, batch_size: int = 500, statement_timeout_ms: int = 0,
+                 source: str = ""):
+        super().__init__()
+        self.db_manager = db_manager
+        self.sql = sql
+        self.params = params
+        self.commit = commit
+        self.batch_size = batch_size
+        self.statement_timeout_ms = statement_timeout_ms
+        # кто запустил запрос — для статистики запросов
+        self.source = source
+        self.signals = QueryWorkerSignals()
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        self._cancelled = False
+
+    def cancel(self):
+        """Прервать запрос; безопасно вызывать из любого потока"""
+        with self._conn_lock:
+            self._cancelled = True
+            if self._conn is not None:
+                try:
+                    self._conn.cancel()
+                except Exception as e:
+                    logging.error(f"Ошибка отмены запроса: {str(e)}")
+
+    def run(self):
+        try:
+            with self.db_manager.borrow_connection() as conn:
+                with self._conn_lock:
+                    if self._cancelled:
+                        raise errors.QueryCanceled("canceling statement due to user request")
+                    self._conn = conn
+                try:
+                    with query_stats.caller(self.source):
+                        total = self._run_on(conn)
+                finally:
+                    # соединение уходит обратно в пул — cancel() больше не должен его трогать
+                    with self._conn_lock:
+                        self._conn = None
+        except errors.QueryCanceled as e:
+            if self._cancelled:
+                logging.info("Фоновый запрос отменён пользователем")
+                self.signals.cancelled.emit()
+            else:
+                logging.error(f"Фоновый запрос прерван по statement_timeout: {str(e)}")
+                self.signals.error.emit(
+                    f"Превышено время выполнения запроса ({self.statement_timeout_ms / 1000:g} с)")
+            return
+        except Exception as e:
+            logging.error(f"Ошибка фонового запроса: {str(e)}")
+            self.signals.error.emit(str(e))
+            return
+        self.signals.finished.emit(total)
+
+    def _run_on(self, conn) -> int:
+        self._apply_timeout(conn)
+        if ROWS_RE.match(self.sql):
+            try:
+                total = self._stream_rows(conn)
+            except errors.FeatureNotSupported:
+                # WITH ... INSERT/UPDATE нельзя объявить курсором — выполняем обычным
+                conn.rollback()
+                self._apply_timeout(conn)
+                total = self._execute_plain(conn)
+        else:
+            total = self._execute_plain(conn)
+        if self._cancelled:
+            raise errors.QueryCanceled("canceling statement due to user request")
+        if self.commit:
+            conn.commit()
+            self.db_manager.note_write(self.sql)
+        else:
+            conn.rollback()
+        return total
+
+    def _apply_timeout(self, conn):
+        if not self.statement_timeout_ms:
+            return
+        # SET LOCAL действует до конца транзакции и не переживает возврат соединения в пул
+        cur = conn.cursor()
+        cur.execute("SET LOCAL statement_timeout = %s", (int(self.statement_timeout_ms),))
+        cur.close()
+
+    def _stream_rows(self, conn) -> int:
+        cursor = conn.cursor(name=f"krk_worker_{id(self)}")
+        cursor.itersize = self.batch_size
+        total = 0
+        try:
+            cursor.execute(self.sql, self.params)
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if total == 0:
+                    self.signals.columns.emit([d[0] for d in cursor.description or []])
+                if not rows:
+                    break
+                total += len(rows)
+                self.signals.batch.emit(rows)
+                self.signals.progress.emit(total)
+                if len(rows) < self.batch_size or self._cancelled:
+                    break
+        finally:
+            cursor.close()
+        return total
+
+    def _execute_plain(self, conn) -> int:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(self.sql, self.params)
+            if cursor.description is None:
+                return cursor.rowcount
+            self.signals.columns.emit([d[0] for d in cursor.description])
+            total = 0
+            while not self._cancelled:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                total += len(rows)
+                self.signals.batch.emit(rows)
+                self.signals.progress.emit(total)
+            return total
+        finally:
+            cursor.close()
+
+
+class CallWorkerSignals(QObject):
+    finished = Signal(object)
+    error = Signal(str)
+
+
+class CallWorker(QRunnable):
+    """Выполняет в потоке пула функцию, которая сама берёт соединения у DatabaseManager
+    (подгрузка вкладки, подсчёт строк); finished получает её результат"""
+
+    def __init__(self, fn, source: str = ""):
+        super().__init__()
+        self.fn = fn
+        self.source = source
+        self.signals = CallWorkerSignals()
+
+    def run(self):
+        try:
+            with query_stats.caller(self.source):
+                result = self.fn()
+        except Exception as e:
+            logging.error(f"Ошибка фоновой задачи: {str(e)}")
+            self.signals.error.emit(str(e))
+            return
+        self.signals.finished.emit(result)
+
+
+class QueryExecutor(QObject):
+    """Запуск запросов вне UI-потока; слоты подключаются до старта, поэтому сигналы не теряются"""
+
+    def __init__(self, db_manager, parent=None, batch_size: int = 500):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        # 0 — без ограничения; задаётся отдельно для каждого диалога
+        self.statement_timeout_ms = 0
+        self.thread_pool = QThreadPool.globalInstance()
+        self._active = set()
+        self._calls = set()
+
+    def submit(self, sql: str, params: Optional[Tuple] = None, commit: bool = False, **slots: Any) -> QueryWorker:
+        """slots: columns=, batch=, progress=, finished=, error=, cancelled= — обработчики одноимённых сигналов"""
+        source = type(self.parent()).__name__ if self.parent() is not None else ""
+        worker = QueryWorker(self.db_manager, sql, params, commit, self.batch_size, self.statement_timeout_ms,
+                             source=source)
+        for name, slot in slots.items():
+            getattr(worker.signals, name).connect(slot)
+        # держим ссылку, пока поток не завершился, иначе сигналы соберёт сборщик мусора
+        self._active.add(worker)
+        worker.signals.finished.connect(lambda _total, w=worker: self._active.discard(w))
+        worker.signals.error.connect(lambda _msg, w=worker: self._active.discard(w))
+        worker.signals.cancelled.connect(lambda w=worker: self._active.discard(w))
+        self.thread_pool.start(worker)
+        return worker
+
+    def run_call(self, fn, finished=None, error=None) -> CallWorker:
+        """Выполнить fn() в потоке пула; finished(результат) и error(текст) вызываются в UI-потоке"""
+        source = type(self.parent()).__name__ if self.parent() is not None else ""
+        worker = CallWorker(fn, source)
+        if finished is not None:
+            worker.signals.finished.connect(finished)
+        if error is not None:
+            worker.signals.error.connect(error)
+        # задачи не считаются в is_busy(): это не запрос пользователя, который можно отменить
+        self._calls.add(worker)
+        worker.signals.finished.connect(lambda _result, w=worker: self._calls.discard(w))
+        worker.signals.error.connect(lambda _msg, w=worker: self._calls.discard(w))
+        self.thread_pool.start(worker)
+        return worker
+
+    def is_busy(self) -> bool:
+        return bool(self._active)
+
+    def cancel_all(self):
+        for worker in list(self._active):
+            worker.cancel()
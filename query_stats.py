@@ -0,0 +1,155 @@
+import logging
+import os
+import re
+import sys
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from app_paths import app_file
+
+# верхние границы корзин гистограммы, мс; последняя корзина — всё, что дольше
+HISTOGRAM_BOUNDS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w$])\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_INTERNAL_NAME_RE = re.compile(r"\b(krk_(?:ps|worker)_)\w+")
+_ROW_LIST_RE = re.compile(r"\((?:\s*(?:\?|%s|NULL|DEFAULT)\s*,)*\s*(?:\?|%s|NULL|DEFAULT)\s*\)"
+                          r"(?:\s*,\s*\((?:\s*(?:\?|%s|NULL|DEFAULT)\s*,)*\s*(?:\?|%s|NULL|DEFAULT)\s*\))+",
+                          re.IGNORECASE)
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+_WS_RE = re.compile(r"\s+")
+# модули, кадры которых пропускаются при поиске вызывающего диалога
+_INTERNAL_MODULES = ('database', 'query_stats', 'query_executor', 'result_model', 'psycopg2', 'contextlib')
+
+_context = threading.local()
+
+
+def fingerprint(sql) -> str:
+    """Текст запроса без литералов: одинаковые запросы с разными значениями дают один отпечаток"""
+    if isinstance(sql, (bytes, bytearray, memoryview)):
+        sql = bytes(sql).decode('utf-8', 'replace')
+    # пакеты execute_values бывают очень длинными — хвост на отпечаток не влияет
+    text = str(sql)[:4000]
+    text = _STRING_RE.sub('?', text)
+    text = _NUMBER_RE.sub('?', text)
+    text = _INTERNAL_NAME_RE.sub(r'\1?', text)
+    text = _ROW_LIST_RE.sub(lambda m: m.group(0)[:m.group(0).index(')') + 1] + ', ...', text)
+    text = _IN_LIST_RE.sub('IN (...)', text)
+    return _WS_RE.sub(' ', text).strip()
+
+
+def params_count(params) -> int:
+    if params is None:
+        return 0
+    if isinstance(params, dict):
+        return len(params)
+    try:
+        return len(params)
+    except TypeError:
+        return 1
+
+
+@contextmanager
+def caller(name: str):
+    """Явно указать источник запросов текущего потока (например, диалог фонового запроса)"""
+    previous = getattr(_context, 'caller', None)
+    _context.caller = name
+    try:
+        yield
+    finally:
+        _context.caller = previous
+
+
+def current_caller() -> str:
+    explicit = getattr(_context, 'caller', None)
+    if explicit:
+        return explicit
+    # первый кадр вне слоя БД: объект с методом — по имени класса (обычно диалог), иначе функция
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if not module.startswith(_INTERNAL_MODULES):
+            owner = frame.f_locals.get('self')
+            if owner is not None:
+                return f"{type(owner).__name__}.{frame.f_code.co_name}"
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return ""
+
+
+class QueryStats:
+    """Статистика запросов по отпечаткам: число вызовов, время, строки, гистограмма длительностей"""
+
+    def __init__(self, slow_ms: float = 500.0, slow_log_path: str = app_file('slow_queries.log')):
+        self.enabled = True
+        self.slow_ms = slow_ms
+        self.slow_log_path = slow_log_path
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._slow_logger = None
+
+    def record(self, sql, params, duration_ms: float, rows: Optional[int], source: str = None):
+        if not self.enabled:
+            return
+        key = fingerprint(sql)
+        source = source if source is not None else current_caller()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {
+                    'fingerprint': key, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+                    'params': params_count(params), 'histogram': [0] * (len(HISTOGRAM_BOUNDS) + 1),
+                    'sources': {},
+                }
+            entry['calls'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            if rows is not None and rows > 0:
+                entry['rows'] += rows
+            entry['histogram'][bisect_left(HISTOGRAM_BOUNDS, duration_ms)] += 1
+            entry['sources'][source] = entry['sources'].get(source, 0) + 1
+        if self.slow_ms and duration_ms >= self.slow_ms:
+            self._log_slow(key, params, duration_ms, rows, source)
+        return key
+
+    def add_rows(self, key: str, rows: int):
+        """Строки, прочитанные из серверного курсора уже после execute"""
+        if not self.enabled or not rows:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['rows'] += rows
+
+    def _log_slow(self, key: str, params, duration_ms: float, rows: Optional[int], source: str):
+        if self._slow_logger is None:
+            slow_logger = logging.getLogger('krk.slow_queries')
+            if self.slow_log_path and not slow_logger.handlers:
+                handler = logging.FileHandler(os.path.abspath(self.slow_log_path), encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+                slow_logger.addHandler(handler)
+            self._slow_logger = slow_logger
+        self._slow_logger.warning(
+            f"{duration_ms:.1f} мс, строк: {rows if rows is not None and rows >= 0 else '—'}, "
+            f"параметров: {params_count(params)}, источник: {source or '—'}\n    {key}")
+
+    def top(self, n: int = 20, order_by: str = 'total_ms') -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = [dict(e, histogram=list(e['histogram']), sources=dict(e['sources']))
+                       for e in self._entries.values()]
+        entries.sort(key=lambda e: e[order_by], reverse=True)
+        return entries[:n]
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def histogram_labels() -> List[str]:
+    return [f"≤{b} мс" for b in HISTOGRAM_BOUNDS] + [f">{HISTOGRAM_BOUNDS[-1]} мс"]
+
+
+# общая статистика процесса: курсоры создаются внутри psycopg2 и не знают своего DatabaseManager
+STATS = QueryStats()
@@ -0,0 +1,103 @@
+import logging
+
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
+    QComboBox, QDateEdit, QCheckBox, QMessageBox
+)
+from PySide6.QtCore import QDate
+
+from result_model import create_result_view
+
+
+class FinancialReportDialog(QDialog):
+    PERIODS = [("По дням", "day"), ("По неделям", "week"), ("По месяцам", "month")]
+    COLUMNS = ["Точка", "Адрес", "Период", "Доход", "Расход", "Прибыль", "Прибыль нарастающим итогом", "Операций"]
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.setWindowTitle("Финансовый отчёт по точкам")
+        self.setMinimumSize(1000, 650)
+        self.setup_ui()
+        self.load_points()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        filters = QHBoxLayout()
+        filters.addWidget(QLabel("Период:"))
+        self.period_combo = QComboBox()
+        for title, value in self.PERIODS:
+            self.period_combo.addItem(title, value)
+        self.period_combo.setCurrentIndex(2)
+        filters.addWidget(self.period_combo)
+
+        filters.addWidget(QLabel("Точка:"))
+        self.point_combo = QComboBox()
+        filters.addWidget(self.point_combo)
+
+        self.range_check = QCheckBox("С")
+        self.date_from = QDateEdit(QDate.currentDate().addYears(-1))
+        self.date_from.setCalendarPopup(True)
+        self.date_to = QDateEdit(QDate.currentDate())
+        self.date_to.setCalendarPopup(True)
+        self.range_check.toggled.connect(self.date_from.setEnabled)
+        self.range_check.toggled.connect(self.date_to.setEnabled)
+        self.date_from.setEnabled(False)
+        self.date_to.setEnabled(False)
+        filters.addWidget(self.range_check)
+        filters.addWidget(self.date_from)
+        filters.addWidget(QLabel("по"))
+        filters.addWidget(self.date_to)
+
+        self.build_btn = QPushButton("Построить")
+        self.build_btn.clicked.connect(self.build_report)
+        filters.addWidget(self.build_btn)
+        filters.addStretch()
+        layout.addLayout(filters)
+
+        self.result_table = create_result_view(placeholder="Нет данных за выбранный период")
+        layout.addWidget(self.result_table)
+
+        self.totals_label = QLabel("")
+        layout.addWidget(self.totals_label)
+
+        close_btn = QPushButton("Закрыть")
+        close_btn.clicked.connect(self.reject)
+        layout.addWidget(close_btn)
+
+    def load_points(self):
+        self.point_combo.clear()
+        self.point_combo.addItem("Все точки", None)
+        for point in self.db_manager.get_points():
+            self.point_combo.addItem(f"{point[0]} — {point[1]}", point[0])
+
+    def build_report(self):
+        date_from = date_to = None
+        if self.range_check.isChecked():
+            date_from = self.date_from.date().toPython()
+            date_to = self.date_to.date().toPython()
+
+        try:
+            report = self.db_manager.get_financial_report(
+                self.period_combo.currentData(), self.point_combo.currentData(), date_from, date_to)
+        except Exception as e:
+            logging.exception(f"Ошибка построения отчёта: {e}")
+            QMessageBox.warning(self, "Ошибка", f"Не удалось построить отчёт: {e}")
+            return
+
+        # сервер отдаёт массивы по точкам; строки таблицы — по одной на точку и период
+        rows = []
+        total_revenue = total_expenses = 0
+        for point in report:
+            series = zip(point['periods'], point['revenue'], point['expenses'],
+                         point['profit'], point['running_profit'], point['tx_count'])
+            for period, revenue, expenses, profit, running, count in series:
+                rows.append((point['point_id'], point['address'], period, revenue, expenses, profit, running, count))
+            total_revenue += sum(point['revenue'])
+            total_expenses += sum(point['expenses'])
+
+        self.result_table.model().set_result(rows, self.COLUMNS)
+        self.totals_label.setText(
+            f"Точек: {len(report)}    Доход: {total_revenue:,.2f} руб.    "
+            f"Расход: {total_expenses:,.2f} руб.    Прибыль: {total_revenue - total_expenses:,.2f} руб.")
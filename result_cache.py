@@ -0,0 +1,116 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def estimate_size(columns: List[str], rows: List[Tuple]) -> int:
+    """Приблизительный объём результата в памяти, байт"""
+    size = sys.getsizeof(rows) + sum(sys.getsizeof(c) for c in columns)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row:
+            size += sys.getsizeof(value)
+    return size
+
+
+class ResultCache:
+    """LRU-кэш результатов чтения: (SQL, параметры) -> (колонки, строки), ограниченный по памяти.
+
+    Каждая запись помнит таблицы, которые читал запрос; запись в любую из них
+    удаляет запись через invalidate_tables. Чтобы сброс, пришедший во время чтения,
+    не потерялся, перед запросом снимается generation(), и put(since=...) отказывается
+    сохранять результат, если прочитанные таблицы с тех пор сбрасывались.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entries: int = 256):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+        # счётчик сбросов: таблица -> номер последнего её сброса; clear() сбрасывает все таблицы сразу
+        self._generation = 0
+        self._table_generations = {}
+        self._cleared_generation = 0
+
+    @staticmethod
+    def make_key(sql: str, params: Optional[Iterable[Any]] = None) -> Tuple[str, Tuple]:
+        return sql.strip(), tuple(params or ())
+
+    def get(self, sql: str, params=None) -> Optional[Tuple[List[str], List[Tuple]]]:
+        key = self.make_key(sql, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            columns, rows = entry['columns'], entry['rows']
+        # строки — кортежи, поэтому достаточно копии списков
+        return list(columns), list(rows)
+
+    def generation(self) -> int:
+        """Отметка для put(since=...); снимается до выполнения запроса"""
+        with self._lock:
+            return self._generation
+
+    def put(self, sql: str, params, columns: List[str], rows: List[Tuple], tables: Iterable[str],
+            since: Optional[int] = None) -> bool:
+        """Сохранить результат; слишком большой для кэша результат не сохраняется.
+
+        since — generation(), снятый до чтения: если прочитанные таблицы после него
+        сбрасывались, результат мог устареть и не сохраняется.
+        """
+        tables = frozenset(tables)
+        size = estimate_size(columns, rows)
+        if size > self.max_bytes // 4:
+            return False
+        key = self.make_key(sql, params)
+        with self._lock:
+            if since is not None and (self._cleared_generation > since or
+                                      any(self._table_generations.get(t, 0) > since for t in tables)):
+                self.stale_puts += 1
+                return False
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old['size']
+            self._entries[key] = {'columns': list(columns), 'rows': list(rows),
+                                  'tables': tables, 'size': size}
+            self._bytes += size
+            while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted['size']
+                self.evictions += 1
+        return True
+
+    def invalidate_tables(self, tables: Iterable[str]) -> int:
+        tables = set(tables)
+        with self._lock:
+            self._generation += 1
+            for table in tables:
+                self._table_generations[table] = self._generation
+            stale = [key for key, entry in self._entries.items() if entry['tables'] & tables]
+            for key in stale:
+                self._bytes -= self._entries.pop(key)['size']
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._cleared_generation = self._generation
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'invalidations': self.invalidations, 'stale_puts': self.stale_puts, 'entries': len(self._entries), 'bytes': self._bytes}
@@ -0,0 +1,155 @@
+import logging
+from typing import Any, List, Tuple
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal
+from PySide6.QtWidgets import QTableView, QHeaderView
+
+
+class ResultTableModel(QAbstractTableModel):
+    """Модель результата запроса: строки хранятся кортежами, текст ячейки формируется только при отрисовке"""
+
+    batch_fetched = Signal(int)
+
+    def __init__(self, parent=None, placeholder: str = ""):
+        super().__init__(parent)
+        self._rows: List[Tuple] = []
+        self._columns: List[str] = []
+        self._source = None
+        self.placeholder = placeholder
+        # fetch_runner(fn, finished, error) — например, QueryExecutor.run_call: следующая порция
+        # читается в потоке пула; без него fetch_batch() вызывается прямо в fetchMore
+        self.fetch_runner = None
+        self._fetching = False
+
+    def set_result(self, rows: List[Tuple], columns: List[str], source=None):
+        """source — объект с fetch_batch() и exhausted (например, TablePager) для догрузки при прокрутке"""
+        self.beginResetModel()
+        self._rows = list(rows)
+        self._columns = list(columns)
+        self._source = source
+        self._fetching = False
+        self.endResetModel()
+
+    def set_columns(self, columns: List[str]):
+        """Начать новый результат: колонки известны, строки придут через append_rows"""
+        self.set_result([], columns)
+
+    def append_rows(self, rows: List[Tuple]):
+        if not rows:
+            return
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+
+    def clear(self):
+        self.set_result([], [])
+
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    def row(self, row: int) -> Tuple:
+        return self._rows[row]
+
+    def rows(self) -> List[Tuple]:
+        return list(self._rows)
+
+    def is_complete(self) -> bool:
+        """Все строки результата уже в модели"""
+        return self._source_exhausted()
+
+    def loaded_count(self) -> int:
+        return len(self._rows)
+
+    def _show_placeholder(self) -> bool:
+        return bool(self.placeholder) and not self._rows and self._source_exhausted()
+
+    def _source_exhausted(self) -> bool:
+        return self._source is None or getattr(self._source, "exhausted", True)
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        if self._show_placeholder():
+            return 1
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        if self._show_placeholder():
+            return max(1, len(self._columns))
+        return len(self._columns)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        if self._show_placeholder():
+            return self.placeholder if index.column() == 0 and role == Qt.DisplayRole else None
+        row = self._rows[index.row()]
+        col = index.column()
+        val = row[col] if col < len(row) else None
+        return "" if val is None else str(val)
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole) -> Any:
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self._columns[section] if section < len(self._columns) else None
+        return str(section + 1)
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlags:
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        if parent.isValid() or self._fetching:
+            return False
+        return not self._source_exhausted()
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._fetching or self._source_exhausted():
+            return
+        if self.fetch_runner is not None:
+            source = self._source
+            self._fetching = True
+            self.fetch_runner(source.fetch_batch,
+                              lambda rows: self._on_batch_loaded(source, rows),
+                              lambda message: self._on_batch_failed(source, message))
+            return
+        try:
+            rows = self._source.fetch_batch()
+        except Exception as e:
+            logging.error(f"Ошибка догрузки строк: {str(e)}")
+            self._source = None
+            return
+        self._on_batch_loaded(self._source, rows)
+
+    def _on_batch_failed(self, source, message: str):
+        if source is not self._source:
+            return
+        self._fetching = False
+        self._source = None
+
+    def _on_batch_loaded(self, source, rows: List[Tuple]):
+        if source is not self._source:
+            # пока порция читалась, модели задали другой результат
+            return
+        self._fetching = False
+        if rows:
+            self.append_rows(rows)
+        elif self._show_placeholder():
+            # источник иссяк без строк — показать заглушку
+            self.beginResetModel()
+            self.endResetModel()
+        self.batch_fetched.emit(len(self._rows))
+
+
+def create_result_view(parent=None, placeholder: str = "", stretch: bool = False) -> QTableView:
+    """QTableView с ResultTableModel; модель доступна через view.model()"""
+    view = QTableView(parent)
+    view.setModel(ResultTableModel(view, placeholder))
+    if stretch:
+        view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+    return view
@@ -3,13 +3,19 @@ import logging
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QFormLayout,
     QLineEdit, QPushButton, QLabel, QTextEdit, QComboBox,
-    QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
+    QHeaderView, QMessageBox,
     QTabWidget, QWidget, QGroupBox, QInputDialog, QCheckBox,
     QListWidget, QListWidgetItem, QSplitter, QFrame, QScrollArea,
     QSpinBox
 )
 from PySide6.QtCore import Qt, Signal
 
+from export_dialog import export_query_to_file
+from index_advisor import USAGE, builder_usage
+from plan_viewer import show_query_plan
+from query_executor import QueryExecutor
+from result_model import create_result_view
+
 
 class JoinDialog(QDialog):
     def __init__(self, schema, parent=None):
@@ -350,6 +356,9 @@ class AdvancedSelectDialog(QDialog):
         self.custom_expressions = []
         self.coalesce_rules = []
         self.schema = {}  # table -> [cols]
+        self.executor = QueryExecutor(db_manager, self)
+        self._running_sql = ""
+        self._running_generation = None
 
         self.setup_ui()
         self._load_schema()
@@ -562,15 +571,42 @@ class AdvancedSelectDialog(QDialog):
         self.execute_btn.clicked.connect(self.execute_query)
         self.clear_btn = QPushButton("Очистить форму")
         self.clear_btn.clicked.connect(self.clear_all)
+        self.export_btn = QPushButton("Экспорт CSV")
+        self.export_btn.clicked.connect(
+            lambda: export_query_to_file(self, self.db_manager, self.sql_preview.toPlainText(), "select"))
+        self.explain_btn = QPushButton("Explain")
+        self.explain_btn.setToolTip("EXPLAIN ANALYZE: план с фактическим временем, изменения откатываются")
+        self.explain_btn.clicked.connect(
+            lambda: show_query_plan(self, self.db_manager, self.sql_preview.toPlainText(),
+                                    self.timeout_spin.value() * 1000))
+        self.cancel_btn = QPushButton("Отменить")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_query)
         self.close_btn = QPushButton("Закрыть")
         self.close_btn.clicked.connect(self.reject)
         btns_row.addWidget(self.apply_btn)
         btns_row.addWidget(self.execute_btn)
+        btns_row.addWidget(self.cancel_btn)
+        btns_row.addWidget(self.export_btn)
+        btns_row.addWidget(self.explain_btn)
         btns_row.addWidget(self.clear_btn)
         btns_row.addWidget(self.close_btn)
         right_layout.addLayout(btns_row)
 
-        self.result_table = QTableWidget()
+        status_row = QHBoxLayout()
+        self.query_status = QLabel("")
+        status_row.addWidget(self.query_status, 1)
+        status_row.addWidget(QLabel("Таймаут:"))
+        self.timeout_spin = QSpinBox()
+        self.timeout_spin.setRange(0, 3600)
+        self.timeout_spin.setValue(60)
+        self.timeout_spin.setSuffix(" с")
+        self.timeout_spin.setSpecialValueText("без ограничения")
+        self.timeout_spin.setToolTip("statement_timeout для запросов этого окна")
+        status_row.addWidget(self.timeout_spin)
+        right_layout.addLayout(status_row)
+
+        self.result_table = create_result_view()
         right_layout.addWidget(self.result_table)
 
         # Добавляем прокручиваемую левую панель и правую панель в splitter
@@ -798,44 +834,63 @@ class AdvancedSelectDialog(QDialog):
         if not sql:
             QMessageBox.warning(self, "Пустой SQL", "Сначала составьте SQL.")
             return
+        # какие столбцы фильтруют, соединяют и сортируют — для советника индексов
+        USAGE.record(builder_usage(self.schema, self.where_conditions, self.joins, self.group_by, self.order_by))
+
+        model = self.result_table.model()
+        cached = self.db_manager.cached_result(sql)
+        if cached is not None:
+            columns, rows = cached
+            model.set_result(rows, columns)
+            self.query_status.setStyleSheet("")
+            self.query_status.setText(f"Готово, строк: {len(rows)} (из кэша)")
+            return
 
-        try:
-            cur = None
-            try:
-                cur = self.db_manager.execute(sql)
-                if not cur:
-                    QMessageBox.warning(self, "Ошибка", "DBManager.execute вернул None — запрос не выполнен.")
-                    return
-
-                try:
-                    rows = cur.fetchall()
-                except Exception:
-                    try:
-                        rows = []
-                    except Exception:
-                        rows = []
-
-                desc = getattr(cur, "description", None)
-                columns = [d[0] for d in desc] if desc else []
-
-                self.result_table.setRowCount(len(rows))
-                self.result_table.setColumnCount(len(columns))
-                if columns:
-                    self.result_table.setHorizontalHeaderLabels(columns)
-                for row_idx, row_data in enumerate(rows):
-                    for col_idx, cell_data in enumerate(row_data):
-                        item = QTableWidgetItem(str(cell_data) if cell_data is not None else "")
-                        self.result_table.setItem(row_idx, col_idx, item)
-            finally:
-                try:
-                    if cur is not None:
-                        cur.close()
-                except Exception:
-                    pass
-
-        except Exception as e:
-            logging.exception(f"Ошибка выполнения запроса: {e}")
-            QMessageBox.warning(self, "Ошибка", f"Ошибка выполнения запроса:\n{str(e)}")
+        # запрос выполняется в фоне; строки приходят в таблицу порциями
+        self._running_sql = sql
+        self._running_generation = self.db_manager.result_generation()
+        model.clear()
+        self.executor.statement_timeout_ms = self.timeout_spin.value() * 1000
+        self._set_query_running(True)
+        self.query_status.setStyleSheet("")
+        self.query_status.setText("Выполняется...")
+        self.executor.submit(sql, columns=model.set_columns, batch=model.append_rows,
+                             progress=self.on_query_progress, finished=self.on_query_finished,
+                             error=self.on_query_error, cancelled=self.on_query_cancelled)
+
+    def cancel_query(self):
+        self.cancel_btn.setEnabled(False)
+        self.query_status.setText("Отмена...")
+        self.executor.cancel_all()
+
+    def done(self, result):
+        # закрытие окна не должно оставлять запрос работать на сервере
+        self.executor.cancel_all()
+        super().done(result)
+
+    def _set_query_running(self, running: bool):
+        self.execute_btn.setEnabled(not running)
+        self.cancel_btn.setEnabled(running)
+
+    def on_query_progress(self, fetched: int):
+        self.query_status.setText(f"Выполняется... получено строк: {fetched}")
+
+    def on_query_finished(self, total: int):
+        self._set_query_running(False)
+        self.query_status.setText(f"Готово, строк: {total}")
+        model = self.result_table.model()
+        if model.columns() and model.loaded_count() == total:
+            self.db_manager.cache_result(self._running_sql, None, model.columns(), model.rows(),
+                                         self._running_generation)
+
+    def on_query_cancelled(self):
+        self._set_query_running(False)
+        self.query_status.setText(f"Запрос отменён, получено строк: {self.result_table.model().loaded_count()}")
+
+    def on_query_error(self, message: str):
+        self._set_query_running(False)
+        self.query_status.setStyleSheet("color: #c0392b;")
+        self.query_status.setText(f"Ошибка выполнения запроса: {message.strip()}")
 
     def on_columns_selection_changed(self):
         table = self.table_combo.currentText()
@@ -1430,8 +1485,7 @@ class AdvancedSelectDialog(QDialog):
         self.joins = []
         self.expr_list.clear()
         self.custom_expressions = []
-        self.result_table.setRowCount(0)
-        self.result_table.setColumnCount(0)
+        self.result_table.model().clear()
         self.sql_preview.clear()
         self.update_sql_preview()
     def addgroupby(self):
@@ -0,0 +1,57 @@
+import importlib
+import logging
+import sys
+import time
+from contextlib import contextmanager
+
+# отсчёт от импорта этого модуля — main.py импортирует его первым
+_started = time.perf_counter()
+_phases = []
+_reported = False
+
+
+def elapsed_ms() -> float:
+    return (time.perf_counter() - _started) * 1000
+
+
+def mark(label: str, duration_ms: float = None):
+    """Записать этап запуска: длительность этапа или момент от старта"""
+    _phases.append((label, duration_ms if duration_ms is not None else elapsed_ms(), duration_ms is None))
+
+
+@contextmanager
+def measure(label: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        mark(label, (time.perf_counter() - start) * 1000)
+
+
+def import_module(name: str):
+    """Импорт по требованию; время первого импорта попадает в отчёт (или сразу в лог после старта)"""
+    if name in sys.modules:
+        return sys.modules[name]
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    duration = (time.perf_counter() - start) * 1000
+    if _reported:
+        logging.info(f"Загружен модуль {name}: {duration:.0f} мс")
+    else:
+        mark(f"import {name}", duration)
+    return module
+
+
+def report():
+    """Один раз написать в лог сводку запуска"""
+    global _reported
+    if _reported:
+        return
+    _reported = True
+    lines = []
+    for label, value, since_start in _phases:
+        if since_start:
+            lines.append(f"  {label}: через {value:.0f} мс от старта")
+        else:
+            lines.append(f"  {label}: {value:.0f} мс")
+    logging.info("Время запуска:\n" + "\n".join(lines))
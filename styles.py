@@ -96,7 +96,7 @@ QLabel#title {
 }
 
 /* Таблицы */
-QTableWidget {
+QTableWidget, QTableView {
     background-color: #fefdfb;
     gridline-color: #fda601;
     border: 2px solid #fda601;
@@ -104,13 +104,13 @@ QTableWidget {
     alternate-background-color: #ffebb8;
 }
 
-QTableWidget::item {
+QTableWidget::item, QTableView::item {
     padding: 10px;
     border-bottom: 1px solid #fda601;
     color: #3d1908;
 }
 
-QTableWidget::item:selected {
+QTableWidget::item:selected, QTableView::item:selected {
     background-color: #90cb25;
     color: #fefdfb;
 }
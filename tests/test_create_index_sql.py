@@ -0,0 +1,60 @@
+import pytest
+
+from database import DatabaseManager
+
+
+@pytest.fixture
+def db():
+    return DatabaseManager()
+
+
+def test_plain_btree_index(db):
+    assert (db.create_index_sql('transactions', ['point_id', 'date'])
+            == 'CREATE INDEX CONCURRENTLY "idx_transactions_point_id_date" ON "transactions" '
+               'USING btree ("point_id", "date")')
+
+
+def test_no_if_not_exists_so_name_conflicts_surface(db):
+    assert 'IF NOT EXISTS' not in db.create_index_sql('points', ['address'], concurrently=False)
+
+
+def test_full_option_set(db):
+    sql = db.create_index_sql('transactions', ['point_id'], name='tx_income', concurrently=False,
+                              expressions=["date_trunc('day', date)"], include=['amount'],
+                              where="type = 'Доход'", unique=True)
+    assert sql == ('CREATE UNIQUE INDEX "tx_income" ON "transactions" USING btree '
+                   '("point_id", (date_trunc(\'day\', date))) INCLUDE ("amount") WHERE type = \'Доход\'')
+
+
+def test_method_suffix_in_generated_name(db):
+    assert '"idx_products_name_gin"' in db.create_index_sql('products', ['name'], method='GIN')
+    assert db._index_name('products', [], 'btree') == 'idx_products_expr'
+
+
+def test_generated_name_fits_identifier_limit(db):
+    name = db._index_name('t' * 40, ['столбец_' * 3])
+    assert len(name.encode('utf-8')) <= 63
+    name.encode('utf-8').decode('utf-8')
+
+
+def test_quotes_identifiers(db):
+    assert '"my ""table"""' in db.create_index_sql('my "table"', ['a'])
+
+
+@pytest.mark.parametrize('kwargs, message', [
+    ({'columns': ['a'], 'method': 'rtree'}, 'Неизвестный метод'),
+    ({'columns': []}, 'хотя бы один'),
+    ({'columns': ['a', 'b'], 'method': 'hash'}, 'hash'),
+    ({'columns': ['a'], 'expressions': ['lower(b)'], 'method': 'hash'}, 'hash'),
+    ({'columns': ['a'], 'method': 'gin', 'unique': True}, 'UNIQUE'),
+    ({'columns': ['a'], 'method': 'brin', 'include': ['b']}, 'INCLUDE'),
+])
+def test_unsupported_combinations_raise(db, kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        db.create_index_sql('t', **kwargs)
+
+
+def test_alter_create_index_reports_validation_error_without_db(db):
+    ok, message = db.alter_create_index('t', ['a', 'b'], method='hash')
+    assert not ok
+    assert 'hash' in message
@@ -0,0 +1,64 @@
+from database import DatabaseManager
+from index_advisor import FK_WEIGHT, KIND_WEIGHTS, IndexUsageStore, builder_usage, suggest_indexes
+
+SCHEMA = {'transactions': ['transaction_id', 'point_id', 'type', 'amount', 'date'],
+          'points': ['point_id', 'address']}
+
+
+def overview(seq_scan=50, idx_scan=5, live_rows=100000, indexes=None, foreign_keys=()):
+    return {
+        'tables': {'transactions': {'seq_scan': seq_scan, 'idx_scan': idx_scan, 'n_live_tup': live_rows},
+                   'points': {'seq_scan': 1, 'idx_scan': 100, 'n_live_tup': 10}},
+        'indexes': indexes if indexes is not None else {'transactions': [['transaction_id']],
+                                                        'points': [['point_id']]},
+        'foreign_keys': list(foreign_keys),
+    }
+
+
+def test_builder_usage_collects_columns_by_clause():
+    usage = builder_usage(SCHEMA,
+                          where_conditions=["transactions.date >= '2024-01-01'", "points.address = 'transactions.amount'"],
+                          joins=[{'left': 'transactions', 'lf': 'point_id', 'right': 'points', 'rf': 'point_id'}],
+                          group_by=["transactions.type"], order_by=["transactions.amount DESC"])
+    assert usage == {
+        ('transactions', 'date'): {'where'},
+        ('points', 'address'): {'where'},
+        ('transactions', 'point_id'): {'join'},
+        ('points', 'point_id'): {'join'},
+        ('transactions', 'type'): {'group'},
+        ('transactions', 'amount'): {'order'},
+    }
+
+
+def test_usage_store_accumulates_and_persists(tmp_path):
+    path = tmp_path / 'usage.json'
+    store = IndexUsageStore(str(path))
+    store.record({('transactions', 'date'): {'where', 'order'}})
+    store.record({('transactions', 'date'): {'where'}})
+    assert IndexUsageStore(str(path)).columns() == {('transactions', 'date'): {'where': 2, 'order': 1}}
+
+
+def test_suggestions_are_ranked_and_use_manager_sql():
+    usage = {('transactions', 'date'): {'where': 4}, ('transactions', 'type'): {'group': 1}}
+    suggestions = suggest_indexes(usage, overview(), DatabaseManager().create_index_sql)
+
+    assert [s['columns'] for s in suggestions] == [['date'], ['type']]
+    # seq_scan > idx_scan удваивает оценку
+    assert suggestions[0]['score'] == KIND_WEIGHTS['where'] * 4 * 2
+    assert suggestions[0]['sql'] == 'CREATE INDEX CONCURRENTLY "idx_transactions_date" ON "transactions" USING btree ("date")'
+
+
+def test_covered_columns_and_unknown_tables_are_skipped():
+    usage = {('transactions', 'point_id'): {'where': 3}, ('missing', 'id'): {'where': 3}}
+    indexes = {'transactions': [['point_id', 'date']]}
+    assert suggest_indexes(usage, overview(indexes=indexes), DatabaseManager().create_index_sql) == []
+
+
+def test_unindexed_foreign_key_and_small_table_penalty():
+    suggestions = suggest_indexes({}, overview(seq_scan=1, idx_scan=10, live_rows=10,
+                                               foreign_keys=[('transactions', ['point_id'])]),
+                                  DatabaseManager().create_index_sql)
+    assert len(suggestions) == 1
+    assert suggestions[0]['columns'] == ['point_id']
+    assert suggestions[0]['score'] == FK_WEIGHT / 2
+    assert "внешний ключ без индекса" in suggestions[0]['reason']
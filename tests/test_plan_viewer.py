@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip("PySide6")
+
+from plan_viewer import (LARGE_TABLE_ROWS, MISESTIMATE_COLOR, MISESTIMATE_FACTOR, MISESTIMATE_MIN_ROWS,
+                         SEQ_SCAN_COLOR, node_title, node_warnings)
+
+
+def scan(node_type='Seq Scan', relation='transactions', plan_rows=100, actual_rows=100, loops=1, **extra):
+    node = {'Node Type': node_type, 'Relation Name': relation, 'Plan Rows': plan_rows,
+            'Actual Rows': actual_rows, 'Actual Loops': loops}
+    node.update(extra)
+    return node
+
+
+def test_seq_scan_on_large_table_is_flagged():
+    warnings = node_warnings(scan(), {'transactions': (LARGE_TABLE_ROWS, 10)})
+    assert [color for color, _ in warnings] == [SEQ_SCAN_COLOR]
+
+
+def test_seq_scan_on_small_or_unknown_table_is_not_flagged():
+    assert node_warnings(scan(), {'transactions': (LARGE_TABLE_ROWS - 1, 10)}) == []
+    assert node_warnings(scan(), {}) == []
+    assert node_warnings(scan('Index Scan'), {'transactions': (10 ** 6, 10 ** 4)}) == []
+
+
+def test_row_misestimate_is_flagged_both_ways():
+    tables = {}
+    under = scan('Hash Join', None, plan_rows=MISESTIMATE_MIN_ROWS, actual_rows=MISESTIMATE_MIN_ROWS * MISESTIMATE_FACTOR)
+    over = scan('Hash Join', None, plan_rows=MISESTIMATE_MIN_ROWS * MISESTIMATE_FACTOR, actual_rows=0)
+    assert [color for color, _ in node_warnings(under, tables)] == [MISESTIMATE_COLOR]
+    assert [color for color, _ in node_warnings(over, tables)] == [MISESTIMATE_COLOR]
+
+
+def test_small_or_accurate_estimates_are_not_flagged():
+    assert node_warnings(scan('Sort', None, plan_rows=1, actual_rows=MISESTIMATE_MIN_ROWS - 1), {}) == []
+    assert node_warnings(scan('Sort', None, plan_rows=1000, actual_rows=5000), {}) == []
+
+
+def test_node_that_never_ran_is_not_a_misestimate():
+    assert node_warnings(scan('Sort', None, plan_rows=10 ** 6, actual_rows=0, loops=0), {}) == []
+
+
+def test_node_title():
+    node = scan('Index Scan', 'points', **{'Index Name': 'points_pkey', 'Alias': 'p'})
+    assert node_title(node) == "Index Scan using points_pkey on points p"
+    assert node_title({'Node Type': 'Hash Join', 'Join Type': 'Left'}) == "Hash Join (Left)"
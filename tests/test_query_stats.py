@@ -0,0 +1,54 @@
+from query_stats import QueryStats, caller, current_caller, fingerprint, histogram_labels
+
+
+def test_fingerprint_replaces_literals():
+    assert (fingerprint("SELECT * FROM points WHERE point_id = 42 AND address = 'ул. Ленина, 1'")
+            == "SELECT * FROM points WHERE point_id = ? AND address = ?")
+    assert fingerprint("SELECT amount * 1.5e3 FROM t") == "SELECT amount * ? FROM t"
+    # строка с удвоенной кавычкой — один литерал
+    assert fingerprint("SELECT 'it''s'") == "SELECT ?"
+
+
+def test_fingerprint_keeps_identifiers_with_digits():
+    assert fingerprint("SELECT col1, t2.x FROM tab_2024") == "SELECT col1, t2.x FROM tab_2024"
+
+
+def test_fingerprint_collapses_lists_and_whitespace():
+    assert fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3)") == fingerprint("SELECT * FROM t WHERE id IN (4,5)")
+    assert fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3)") == "SELECT * FROM t WHERE id IN (...)"
+    assert (fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)")
+            == "INSERT INTO t (a, b) VALUES (%s, %s), ...")
+    assert fingerprint("SELECT 1\n\n  FROM   t") == "SELECT ? FROM t"
+
+
+def test_fingerprint_merges_internal_statement_names_and_bytes():
+    assert fingerprint("EXECUTE krk_ps_17 (%s)") == fingerprint("EXECUTE krk_ps_3 (%s)") == "EXECUTE krk_ps_? (%s)"
+    assert fingerprint(b"SELECT 5") == "SELECT ?"
+
+
+def test_record_groups_by_fingerprint():
+    stats = QueryStats(slow_ms=0)
+    stats.record("SELECT * FROM t WHERE id = 1", (1,), 3.0, 1, source="A")
+    stats.record("SELECT * FROM t WHERE id = 2", (2,), 7.0, 1, source="B")
+    stats.record("SELECT now()", None, 600.0, 1, source="A")
+
+    top = stats.top()
+    assert [e['fingerprint'] for e in top] == ["SELECT now()", "SELECT * FROM t WHERE id = ?"]
+    entry = top[1]
+    assert (entry['calls'], entry['total_ms'], entry['max_ms'], entry['rows']) == (2, 10.0, 7.0, 2)
+    assert entry['sources'] == {'A': 1, 'B': 1}
+    assert len(entry['histogram']) == len(histogram_labels())
+    assert sum(entry['histogram']) == 2
+
+
+def test_disabled_stats_record_nothing():
+    stats = QueryStats(slow_ms=0)
+    stats.enabled = False
+    stats.record("SELECT 1", None, 1.0, 1, source="A")
+    assert stats.top() == []
+
+
+def test_explicit_caller_overrides_frame_lookup():
+    with caller("DataViewDialog"):
+        assert current_caller() == "DataViewDialog"
+    assert current_caller() != "DataViewDialog"
@@ -0,0 +1,166 @@
+import pytest
+
+from database import DatabaseManager, SUMMARY_TABLE
+from result_cache import ResultCache, estimate_size
+
+
+def put(cache, sql, tables=('points',), rows=((1, 'a'),)):
+    return cache.put(sql, None, ['id', 'name'], list(rows), tables)
+
+
+def test_lru_evicts_least_recently_used_entry():
+    cache = ResultCache(max_entries=2)
+    put(cache, "SELECT 1")
+    put(cache, "SELECT 2")
+    assert cache.get("SELECT 1") is not None
+    put(cache, "SELECT 3")
+
+    assert cache.get("SELECT 2") is None
+    assert cache.get("SELECT 1") is not None
+    assert cache.get("SELECT 3") is not None
+    assert cache.stats()['evictions'] == 1
+
+
+def test_byte_limit_evicts_and_keeps_accounting():
+    rows = [(i, 'x' * 50) for i in range(20)]
+    size = estimate_size(['id', 'name'], rows)
+    cache = ResultCache(max_bytes=size * 4, max_entries=100)
+    for i in range(6):
+        assert put(cache, f"SELECT {i}", rows=rows)
+
+    stats = cache.stats()
+    assert stats['entries'] == 4
+    assert stats['bytes'] <= cache.max_bytes
+    assert cache.get("SELECT 0") is None
+
+
+def test_result_larger_than_quarter_of_budget_is_not_cached():
+    rows = [(i, 'x' * 50) for i in range(20)]
+    cache = ResultCache(max_bytes=estimate_size(['id', 'name'], rows) * 3)
+    assert not put(cache, "SELECT big", rows=rows)
+    assert cache.stats()['entries'] == 0
+
+
+def test_replacing_entry_does_not_leak_bytes():
+    cache = ResultCache()
+    put(cache, "SELECT 1")
+    before = cache.stats()['bytes']
+    put(cache, " SELECT 1 ")
+    assert cache.stats()['entries'] == 1
+    assert cache.stats()['bytes'] == before
+
+
+def test_get_returns_copies():
+    cache = ResultCache()
+    put(cache, "SELECT 1")
+    columns, rows = cache.get("SELECT 1")
+    rows.append((2, 'b'))
+    columns.append('extra')
+    assert cache.get("SELECT 1") == (['id', 'name'], [(1, 'a')])
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    db = DatabaseManager()
+    db.set_result_cache_enabled(True)
+    graph = {
+        'relations': {'points', 'employees', 'products', 'transactions', SUMMARY_TABLE, 'staff_view'},
+        'views': {'staff_view': ['employees', 'points']},
+        # employees.point_id ссылается на points с ON DELETE CASCADE
+        'children': {'points': ['employees']},
+    }
+    monkeypatch.setattr(db, '_relation_graph', lambda: graph)
+    return db
+
+
+def test_read_tables_expands_views_and_quoted_names(manager):
+    assert manager._read_tables("SELECT * FROM staff_view") == {'staff_view', 'employees', 'points'}
+    assert manager._read_tables('SELECT * FROM "products" p JOIN Points USING (point_id)') == {'products', 'points'}
+    assert manager._read_tables("SELECT 1") == set()
+
+
+def test_note_write_invalidates_written_table_and_cascade_children(manager):
+    cache = manager.result_cache
+    put(cache, "SELECT * FROM points", tables=manager._read_tables("SELECT * FROM points"))
+    put(cache, "SELECT * FROM staff_view", tables=manager._read_tables("SELECT * FROM staff_view"))
+    put(cache, "SELECT * FROM employees", tables={'employees'})
+    put(cache, "SELECT * FROM products", tables={'products'})
+
+    manager.note_write("DELETE FROM points WHERE point_id = %s")
+
+    assert cache.get("SELECT * FROM points") is None
+    assert cache.get("SELECT * FROM staff_view") is None
+    assert cache.get("SELECT * FROM employees") is None
+    assert cache.get("SELECT * FROM products") is not None
+
+
+def test_note_write_on_transactions_invalidates_summary(manager):
+    put(manager.result_cache, f"SELECT * FROM {SUMMARY_TABLE}", tables={SUMMARY_TABLE})
+    manager.note_write("INSERT INTO transactions (amount) VALUES (%s)")
+    assert manager.result_cache.get(f"SELECT * FROM {SUMMARY_TABLE}") is None
+
+
+def test_note_write_ignores_reads_and_clears_on_ddl(manager):
+    put(manager.result_cache, "SELECT * FROM products", tables={'products'})
+    manager.note_write("SELECT * FROM products")
+    assert manager.result_cache.get("SELECT * FROM products") is not None
+
+    manager.note_write("ALTER TABLE employees ADD COLUMN note text")
+    assert manager.result_cache.stats()['entries'] == 0
+
+
+def test_note_write_is_noop_when_cache_disabled(manager):
+    put(manager.result_cache, "SELECT * FROM products", tables={'products'})
+    manager.result_cache_enabled = False
+    manager.note_write("DELETE FROM products")
+    assert manager.result_cache.stats()['entries'] == 1
+
+
+def test_put_refuses_result_read_before_invalidation():
+    cache = ResultCache()
+    since = cache.generation()
+    # запись в таблицу между чтением и сохранением
+    cache.invalidate_tables({'points'})
+    assert not cache.put("SELECT * FROM points", None, ['id'], [(1,)], {'points'}, since)
+    assert cache.get("SELECT * FROM points") is None
+    assert cache.stats()['stale_puts'] == 1
+
+    # запись в другую таблицу результату не мешает
+    since = cache.generation()
+    cache.invalidate_tables({'products'})
+    assert cache.put("SELECT * FROM points", None, ['id'], [(1,)], {'points'}, since)
+
+
+def test_put_refuses_result_read_before_clear():
+    cache = ResultCache()
+    since = cache.generation()
+    cache.clear()
+    assert not cache.put("SELECT 1 FROM points", None, ['x'], [(1,)], {'points'}, since)
+
+
+def test_fetch_all_cached_does_not_cache_rows_invalidated_mid_read(manager, monkeypatch):
+    from contextlib import contextmanager
+
+    class Cursor:
+        description = [('id',)]
+
+        def execute(self, sql, params=None):
+            # другой поток записал в points, пока запрос выполнялся
+            manager.note_write("UPDATE points SET address = 'x'")
+
+        def fetchall(self):
+            return [(1,)]
+
+        def close(self):
+            pass
+
+    class Conn:
+        def cursor(self):
+            return Cursor()
+
+        def rollback(self):
+            pass
+
+    monkeypatch.setattr(manager, 'borrow_connection', contextmanager(lambda: (yield Conn())))
+    assert manager.fetch_all_cached("SELECT * FROM points") == (['id'], [(1,)])
+    assert manager.cached_result("SELECT * FROM points") is None
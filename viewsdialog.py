@@ -1,12 +1,15 @@
 import logging
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
-    QListWidget, QListWidgetItem, QMessageBox, QTableWidget,
-    QTableWidgetItem, QHeaderView
+    QListWidget, QListWidgetItem, QMessageBox
 )
 from PySide6.QtCore import Qt
 
-from select import AdvancedSelectDialog
+from export_dialog import export_query_to_file
+from plan_viewer import show_query_plan
+from query_executor import QueryExecutor
+from result_model import create_result_view
+from select_dialog import AdvancedSelectDialog
 
 
 class ViewsDialog(QDialog):
@@ -15,6 +18,7 @@ class ViewsDialog(QDialog):
         self.dbmanager = dbmanager
         self.setWindowTitle("Представления (VIEW / MATERIALIZED VIEW)")
         self.resize(900, 600)
+        self.executor = QueryExecutor(dbmanager, self)
         self.setup_ui()
         self.load_views()
 
@@ -35,27 +39,35 @@ class ViewsDialog(QDialog):
         self.btn_refresh_mat_view = QPushButton("REFRESH MATERIALIZED VIEW")
         self.btn_drop = QPushButton("Удалить")
         self.btn_preview = QPushButton("Просмотреть данные")
+        self.btn_export = QPushButton("Экспорт CSV")
+        self.btn_explain = QPushButton("Explain")
 
         self.btn_create_view.clicked.connect(self.create_view)
         self.btn_create_mat_view.clicked.connect(self.create_materialized_view)
         self.btn_refresh_mat_view.clicked.connect(self.refresh_materialized_view)
         self.btn_drop.clicked.connect(self.drop_view)
         self.btn_preview.clicked.connect(self.preview_view)
+        self.btn_export.clicked.connect(self.export_view)
+        self.btn_explain.clicked.connect(self.explain_view)
 
         btn_row.addWidget(self.btn_create_view)
         btn_row.addWidget(self.btn_create_mat_view)
         btn_row.addWidget(self.btn_refresh_mat_view)
         btn_row.addWidget(self.btn_preview)
+        btn_row.addWidget(self.btn_export)
+        btn_row.addWidget(self.btn_explain)
         btn_row.addWidget(self.btn_drop)
         btn_row.addStretch()
         layout.addLayout(btn_row)
 
-        layout.addWidget(QLabel("Результат выборки:"))
+        result_row = QHBoxLayout()
+        result_row.addWidget(QLabel("Результат выборки:"))
+        self.status_label = QLabel("")
+        result_row.addWidget(self.status_label)
+        result_row.addStretch()
+        layout.addLayout(result_row)
 
-        self.result_table = QTableWidget()
-        self.result_table.setColumnCount(0)
-        self.result_table.setRowCount(0)
-        self.result_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.result_table = create_result_view(stretch=True)
         layout.addWidget(self.result_table)
 
     def load_views(self):
@@ -186,18 +198,23 @@ class ViewsDialog(QDialog):
         name = self._get_selected_view()
         if not name:
             return
-        try:
-            sql = f"REFRESH MATERIALIZED VIEW {name}"
-            self.dbmanager.execute(sql)
-            if getattr(self.dbmanager, "connection", None):
-                try:
-                    self.dbmanager.connection.commit()
-                except Exception:
-                    pass
-            QMessageBox.information(self, "Готово", f"{name} обновлено.")
-        except Exception as e:
-            logging.exception("refresh_materialized_view failed: %s", e)
-            QMessageBox.warning(self, "Ошибка", str(e))
+        # REFRESH может идти долго — выполняем в фоне и фиксируем на том же соединении
+        self._refreshing_view = name
+        self.btn_refresh_mat_view.setEnabled(False)
+        self.status_label.setText(f"Обновление {name}...")
+        self.executor.submit(f"REFRESH MATERIALIZED VIEW {name}", commit=True,
+                             finished=self.on_refresh_finished, error=self.on_refresh_error)
+
+    def on_refresh_finished(self, _count: int):
+        self.btn_refresh_mat_view.setEnabled(True)
+        self.status_label.setText("")
+        QMessageBox.information(self, "Готово", f"{self._refreshing_view} обновлено.")
+
+    def on_refresh_error(self, message: str):
+        self.btn_refresh_mat_view.setEnabled(True)
+        self.status_label.setText("")
+        logging.error("refresh_materialized_view failed: %s", message)
+        QMessageBox.warning(self, "Ошибка", message)
 
     def drop_view(self):
         name = self._get_selected_view()
@@ -232,26 +249,25 @@ class ViewsDialog(QDialog):
             return
         try:
             sql = f"SELECT * FROM {name} LIMIT 200"
-            cur = self.dbmanager.execute(sql)
-            if not cur:
-                return
-            rows = cur.fetchall()
-            desc = cur.description
-            cur.close()
-
-            columns = [d[0] for d in desc] if desc else []
-            self.result_table.setRowCount(len(rows))
-            self.result_table.setColumnCount(len(columns))
-            self.result_table.setHorizontalHeaderLabels(columns)
-
-            for i, row in enumerate(rows):
-                for j, val in enumerate(row):
-                    item = QTableWidgetItem("" if val is None else str(val))
-                    self.result_table.setItem(i, j, item)
+            columns, rows = self.dbmanager.fetch_all_cached(sql)
+            self.result_table.model().set_result(rows, columns)
         except Exception as e:
             logging.exception("preview_view failed: %s", e)
             QMessageBox.warning(self, "Ошибка", str(e))
 
+    def export_view(self):
+        name = self._get_selected_view()
+        if not name:
+            return
+        # выгружается всё представление, а не 200 строк предпросмотра
+        export_query_to_file(self, self.dbmanager, f"SELECT * FROM {name}", name.replace(".", "_"))
+
+    def explain_view(self):
+        name = self._get_selected_view()
+        if not name:
+            return
+        show_query_plan(self, self.dbmanager, f"SELECT * FROM {name}")
+
     def _ask_view_name(self):
         from PySide6.QtWidgets import QInputDialog
         name, ok = QInputDialog.getText(